@@ -1,48 +1,106 @@
 import os
-from fastapi import FastAPI
+import asyncio
+import logging
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
+from typing import Literal
 
-from backend.agents.PromptAnalyzerAgent import PromptAnalyzerAgent
-from backend.agents.CodeAgent import CodeAgent
-from backend.agents.TestingAgent import TestingAgent
-from backend.agents.DependencyAgent import DependencyAgent
-from backend.utils import save_file
+from backend.registry import AgentRegistry
+from backend.agents.CodeAgent import TruncatedResponseError, validate_and_autocorrect_files
+from backend.jobs import JobManager, format_ndjson, format_sse
+from backend.workspace import WorkspaceManager
+from backend.file_writer import BulkFileWriter, FileWriteError
+from backend.archive import MEDIA_TYPES, stream_archive
+from backend.metrics import REGISTRY, request_scope, stage
+from backend.profiling import PROFILER
+from backend.tracing import EXPORTER, request_trace
 
-# --- Rich Logging ---
-from rich.console import Console
-from rich.panel import Panel
-from rich.tree import Tree
-from rich.table import Table
-from rich.traceback import install
-install(show_locals=True)
-console = Console()
+from backend.log import get_logger, shutdown_logging
 
-def log_panel(title, content, style="cyan"):
-    console.print(Panel(content, title=title, style=style))
+logger = get_logger("agent_server")
+
+log_panel = logger.panel
 
 def log_tree(files):
-    tree = Tree("📦 GENERATED_PLUGIN")
-    for file in files:
-        rel = file.get("path", "")
-        size = file.get("content_binary")
-        if size is not None:
-            size_bytes = len(size)
-        else:
-            size_bytes = len(file.get("content", "").encode("utf-8"))
-        tree.add(f"[green]{rel}[/green]  [dim]{size_bytes} bytes[/dim]")
-    console.print(tree)
+    logger.tree("📦 GENERATED_PLUGIN", (f"{file.get('path', '')}  {_size_bytes(file)} bytes" for file in files))
 
 def log_steps(steps):
-    table = Table(title="Ablaufschritte", show_header=True, header_style="bold magenta")
-    table.add_column("Nr.", style="dim")
-    table.add_column("Beschreibung")
-    for i, step in enumerate(steps, 1):
-        table.add_row(str(i), step)
-    #console.print(table)
+    logger.event("Ablaufschritte", level=logging.DEBUG, steps=list(steps))
+
+# Begrenzter Thread-Pool für die restliche synchrone Arbeit (Dateien schreiben,
+# DependencyAgent), damit der Event-Loop nie blockiert.
+AGENT_WORKERS = int(os.getenv("AGENT_WORKERS", "4"))
+executor = ThreadPoolExecutor(max_workers=AGENT_WORKERS, thread_name_prefix="agent-worker")
+
+# Maximale Anzahl Reparaturrunden (LLM-Patch + inkrementeller Rebuild) nach einem fehlgeschlagenen Build
+REPAIR_MAX_ITERATIONS = int(os.getenv("REPAIR_MAX_ITERATIONS", "2"))
+
+async def run_blocking(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    # Kontext mitgeben, damit Stage-Zeiten aus dem Thread beim Request landen
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executor, functools.partial(context.run, func, *args, **kwargs))
 
-app = FastAPI()
+def _size_bytes(file):
+    if file.get("content_binary") is not None:
+        return len(file["content_binary"])
+    return len(file.get("content", "").encode("utf-8"))
+
+file_writer = BulkFileWriter()
+
+def save_generated_files(files, workspace):
+    """
+    Schreibt alle generierten Dateien atomar in den Workspace des Jobs (Pfade werden
+    dabei sicher umgeschrieben, unveränderte Dateien übersprungen).
+    Gibt den Schreib-Report zurück; wirft FileWriteError für die erste fehlerhafte Datei.
+    """
+    try:
+        with stage("write"):
+            report = file_writer.write(workspace, files)
+    except FileWriteError as e:
+        log_panel("Writing errors", f"{e.path}\n{e.error}", style="bold red")
+        raise
+    log_panel(
+        "Files saved",
+        f"{len(report['written'])} written ({report['bytes_written']} bytes), "
+        f"{len(report['skipped'])} unchanged ({report['bytes_skipped']} bytes)",
+        style="white",
+    )
+    return report
+
+def _merge_write_reports(total, report):
+    for key in ("written", "skipped"):
+        total[key] = total.get(key, []) + report[key]
+    for key in ("bytes_written", "bytes_skipped", "elapsed"):
+        total[key] = round(total.get(key, 0) + report[key], 4)
+    return total
+
+jobs = JobManager()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Agents und LLM-Clients leben so lange wie die App (geteilter Connection-Pool)
+    app.state.agents = AgentRegistry()
+    app.state.agents.start_dependency_index()
+    # Jeder Job bekommt ein eigenes Verzeichnis; alte Workspaces räumt ein Hintergrund-Task ab
+    app.state.workspaces = WorkspaceManager()
+    app.state.workspaces.start_gc()
+    if os.getenv("LLM_WARMUP", "1") == "1":
+        await app.state.agents.warm_up()
+    yield
+    await app.state.workspaces.stop_gc()
+    await app.state.agents.aclose()
+    file_writer.close()
+    executor.shutdown(wait=False)
+    shutdown_logging()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -53,107 +111,406 @@ app.add_middleware(
 
 class PluginRequest(BaseModel):
     prompt: str
+    # Streaming-Modus: Dateien werden gespeichert, sobald das LLM sie fertig geliefert hat
+    stream: bool = False
+    # False umgeht den Generierungs-Cache (erzwingt einen frischen LLM-Call)
+    use_cache: bool = True
+    # "two_step": Analyzer-Call + CodeAgent-Call, "fused": ein Call liefert Metadaten und Dateien,
+    # "parallel": Analyzer-Call + Manifest-Call + ein gleichzeitiger Call pro Datei,
+    # "scaffold": pom.xml/plugin.xml/Assembly lokal aus Templates, das LLM schreibt nur Java
+    mode: Literal["two_step", "fused", "parallel", "scaffold"] = "two_step"
+    # "json": speichern + testen; "zip"/"tar.gz": Projekt direkt als Archiv streamen (kein Disk-I/O, kein Maven)
+    format: Literal["json", "zip", "tar.gz"] = "json"
+    # Bei Compiler-/Precheck-Fehlern nur die betroffenen Dateien neu generieren und erneut bauen
+    repair: bool = True
 
-@app.post("/generate")
-async def generate_plugin(req: PluginRequest):
+def _observe_options(request: Request) -> dict:
+    """
+    Tracing-/Profiling-Wünsche aus den Headern: traceparent (W3C) sowie
+    X-Profile: sample|cprofile mit optionalem X-Profile-Token.
+    """
+    return {
+        "traceparent": request.headers.get("traceparent"),
+        "profile": request.headers.get("x-profile"),
+        "profile_token": request.headers.get("x-profile-token"),
+    }
+
+@contextmanager
+def observe(name: str, mode: str, traceparent: str = None, profile: str = None, profile_token: str = None):
+    """
+    Metriken, Trace und (falls angefordert) Profil eines Requests. Liefert
+    (metrics, trace, profile_info); trace ist None, wenn der Request nicht getraced wird,
+    profile_info None ohne X-Profile. Ein Profil erzwingt immer auch einen Trace.
+    """
+    with request_scope(mode) as metrics:
+        with request_trace(name, traceparent, force=bool(profile), mode=mode) as trace:
+            if not profile:
+                yield metrics, trace, None
+                return
+            with PROFILER.profile(profile, profile_token, trace.trace_id) as profile_info:
+                yield metrics, trace, profile_info
+
+def _observed_fields(trace, profile_info) -> dict:
+    fields = {}
+    if trace is not None:
+        fields["trace_id"] = trace.trace_id
+    if profile_info is not None:
+        fields["profile"] = profile_info
+    return fields
+
+async def run_pipeline(req: PluginRequest, on_step=None, on_file=None, **observe_options):
+    """
+    Komplette Pipeline analyze → generate → save → test in einem eigenen Workspace.
+    Jeder Stage-Übergang wird in steps festgehalten und, falls gesetzt, an on_step gemeldet;
+    jede gespeicherte Datei an on_file(path, size_bytes).
+    Gibt (payload, status_code) zurück; payload enthält immer einen timings-Block,
+    bei getraceten Requests trace_id und bei X-Profile einen profile-Block.
+    """
+    workspace = app.state.workspaces.allocate()
+    with observe("generate", req.mode, **observe_options) as (metrics, trace, profile_info):
+        try:
+            payload, status_code = await _run_pipeline(req, workspace, on_step, on_file)
+        finally:
+            app.state.workspaces.release(workspace)
+        payload["timings"] = metrics.finish(status_code)
+        if trace is not None:
+            trace.root.set_attribute("http.response.status_code", status_code)
+    payload.update(_observed_fields(trace, profile_info))
+    return payload, status_code
+
+async def _run_pipeline(req: PluginRequest, workspace, on_step, on_file):
+    # Ohne workspace (Archiv-Modus) endet die Pipeline nach der Generierung
     prompt_text = req.prompt
+    agents = app.state.agents
     steps = []
-    steps.append("1) Receive prompt")
+
+    def add_step(step):
+        steps.append(step)
+        if on_step:
+            on_step(step)
+
+    add_step("1) Receive prompt")
 
     # --- Log Prompt ---
-    log_panel("Receive prompt", prompt_text, style="yellow")
+    log_panel("Receive prompt", prompt_text, style="yellow", level=logging.INFO)
 
     # 1) Metadaten extrahieren
-    try:
-        analyzer = PromptAnalyzerAgent()
-        meta = analyzer.analyze(prompt_text)
-        log_panel("Extracted metadata", str(meta), style="green")
-        steps.append("2) Metadata extracted")
-    except Exception as e:
-        log_panel("Error during metadata extraction", str(e), style="red")
-        return JSONResponse({"error": f"Metadata parsing error: {e}"}, status_code=500)
+    files = None
+    if req.mode == "fused":
+        # Metadaten und Dateien aus einem einzigen LLM-Call, danach dieselben Defaults/Korrekturen
+        try:
+            with stage("generate"):
+                raw_meta, files = await agents.code_agent.agenerate_fused(
+                    prompt_text, agents.analyzer.detect_dicom(prompt_text)
+                )
+            meta = agents.analyzer.complete_metadata(raw_meta, prompt_text)
+            files = validate_and_autocorrect_files(files, meta["dicom_enabled"], meta.get("plugin_type"))
+            log_panel("Extracted metadata", str(meta), style="green")
+            add_step("2) Metadata extracted")
+        except Exception as e:
+            log_panel("Error during fused generation", str(e), style="red")
+            return {"error": f"Error during file generation: {e}"}, 500
+    else:
+        try:
+            with stage("analyze"):
+                meta = await agents.analyzer.aanalyze(prompt_text)
+            log_panel("Extracted metadata", str(meta), style="green")
+            add_step("2) Metadata extracted")
+        except Exception as e:
+            log_panel("Error during metadata extraction", str(e), style="red")
+            return {"error": f"Metadata parsing error: {e}"}, 500
+
+    # Scaffold-Modus: Build- und Deskriptor-Dateien lokal rendern (ohne passendes Scaffold wie two_step)
+    scaffold_files = None
+    if req.mode == "scaffold":
+        with stage("scaffold"):
+            scaffold, scaffold_files = agents.scaffolds.render(meta)
+        if scaffold is None:
+            log_panel("Scaffold", f"No scaffold for plugin type {meta.get('plugin_type')}, generating all files", style="yellow")
+        else:
+            log_panel("Scaffold rendered", f"{scaffold.name}: {', '.join(f['path'] for f in scaffold_files)}", style="green")
 
-    # 2) Files generieren
+    # 2) Files generieren (im Streaming-Modus direkt speichern)
+    files_saved = False
+    write_report = {}
     try:
-        code_agent = CodeAgent()
-        files = code_agent.generate_files(prompt_text, meta)
-        steps.append(f"3) {len(files)} Files generated")
+        with stage("generate"):
+            if files is not None:
+                pass
+            elif req.stream and workspace is not None:
+                files = []
+                if req.mode == "parallel":
+                    file_stream = agents.code_agent.astream_parallel(prompt_text, meta, use_cache=req.use_cache)
+                else:
+                    file_stream = agents.code_agent.astream_files(
+                        prompt_text, meta, use_cache=req.use_cache, scaffold_files=scaffold_files
+                    )
+                async for file in _with_scaffold(scaffold_files, file_stream):
+                    files.append(file)
+                    try:
+                        report = await run_blocking(save_generated_files, [file], workspace)
+                    except FileWriteError as e:
+                        return {"error": f"Errors when writing {e.path}: {e.error}"}, 500
+                    _merge_write_reports(write_report, report)
+                    if on_file:
+                        on_file(file["path"], _size_bytes(file))
+                files_saved = True
+            elif req.mode == "parallel":
+                files = await agents.code_agent.agenerate_parallel(prompt_text, meta, use_cache=req.use_cache)
+            else:
+                files = await agents.code_agent.agenerate_files(
+                    prompt_text, meta, use_cache=req.use_cache, scaffold_files=scaffold_files
+                )
+                files = (scaffold_files or []) + files
+        add_step(f"3) {len(files)} Files generated")
         log_panel("Files generated", f"{len(files)} Files created.", style="blue")
         log_tree(files)
+    except TruncatedResponseError as e:
+        # Ein unvollständiges Projekt würde nur im Build scheitern; fehlende Dateien kann die Reparatur nicht ergänzen
+        kept = files or (scaffold_files or []) + e.files
+        log_panel("Error during file generation", str(e), style="red")
+        return {
+            "error": f"Error during file generation: {e}",
+            "truncated": True,
+            "steps": steps,
+            "files": [{"path": f["path"], "size_bytes": _size_bytes(f)} for f in kept],
+        }, 500
     except Exception as e:
         log_panel("Error during file generation", str(e), style="red")
-        return JSONResponse({"error": f"Error during file generation: {e}"}, status_code=500)
+        return {"error": f"Error during file generation: {e}"}, 500
 
-    # === Dependency-Prüfung für Mirth-Server-API ===
-    dep_agent = DependencyAgent()
-    mirth_api_needed = any(
-        "server-api" in f.get("content", "") for f in files if f["path"].endswith("pom.xml")
-    )
-    dep_result_msg = None
-    if mirth_api_needed:
-        ok, dep_result_msg = dep_agent.check_and_install_mirth_server_api()
+    if workspace is None:
+        return {"steps": steps, "files": files}, 200
+
+    # === Dependency-Prüfung: alle im pom.xml deklarierten Mirth-Artefakte ===
+    for pom in (f for f in files if f["path"].endswith("pom.xml")):
+        ok, dep_result_msg = await run_blocking(agents.dependency_agent.check_pom, pom.get("content", ""))
         log_panel("DependencyAgent", dep_result_msg, style="red" if not ok else "green")
         if not ok:
             # Abbrechen mit klarer Fehlermeldung und Anleitung
-            return JSONResponse({
+            return {
                 "error": dep_result_msg,
                 "steps": steps,
-                "files": [
-                    {
-                        "path": f["path"],
-                        "size_bytes": len(f["content_binary"]) if f.get("content_binary") is not None
-                                  else len(f.get("content", "").encode("utf-8"))
-                    }
-                    for f in files
-                ]
-            }, status_code=500)
+                "files": [{"path": f["path"], "size_bytes": _size_bytes(f)} for f in files]
+            }, 500
 
     # 3) Dateien speichern
-    for file in files:
-        orig_path = file.get("path", "")
-        path = os.path.normpath(orig_path)
-        directory = os.path.dirname(path)
+    if not files_saved:
         try:
-            if file.get("content_binary") is not None:
-                content_bytes = file["content_binary"]
-                if directory and not os.path.exists(directory):
-                    os.makedirs(directory, exist_ok=True)
-                with open(path, "wb") as f:
-                    f.write(content_bytes)
-            else:
-                if directory and not os.path.exists(directory):
-                    os.makedirs(directory, exist_ok=True)
-                save_file(path, file.get("content", ""))
-            log_panel("File saved", f"{path} ({os.path.getsize(path)} bytes)", style="white")
-        except Exception as e:
-            log_panel("Writing errors", f"{path}\n{e}", style="bold red")
-            return JSONResponse({"error": f"Errors when writing {path}: {e}"}, status_code=500)
+            write_report = await run_blocking(save_generated_files, files, workspace)
+        except FileWriteError as e:
+            return {"error": f"Errors when writing {e.path}: {e.error}"}, 500
+        if on_file:
+            for f in files:
+                on_file(f["path"], _size_bytes(f))
 
-    steps.append("4) Files stored on project")
+    add_step("4) Files stored on project")
     log_steps(steps)
 
     # === Testing Schritt ===
+    test_result = await _run_checks(agents, files, workspace, add_step, "5)")
+
+    # === Reparatur: fehlerhafte Dateien gezielt neu generieren, patchen und inkrementell bauen ===
+    repairs = []
+    max_repairs = REPAIR_MAX_ITERATIONS if req.repair else 0
+    while not test_result.get("success") and len(repairs) < max_repairs:
+        diagnostics = agents.testing_agent.diagnostics_by_file(test_result, workspace.path, files)
+        if not diagnostics:
+            log_panel("Repair", "Keine Fehler einer Datei zuordenbar, Reparatur übersprungen.", style="yellow")
+            break
+        iteration = len(repairs) + 1
+        repair = {"iteration": iteration, "files": sorted(diagnostics)}
+        repairs.append(repair)
+        try:
+            with stage("repair"):
+                patched = await agents.code_agent.arepair_files(prompt_text, meta, files, diagnostics)
+        except Exception as e:
+            log_panel("Error during repair", str(e), style="red")
+            repair["error"] = str(e)
+            break
+        if not patched:
+            repair["error"] = "LLM returned none of the files to repair"
+            break
+        by_path = {f["path"]: f for f in patched}
+        files = [by_path.get(f["path"], f) for f in files]
+
+        pom_error = None
+        for pom in (f for f in patched if f["path"].endswith("pom.xml")):
+            ok, dep_result_msg = await run_blocking(agents.dependency_agent.check_pom, pom.get("content", ""))
+            if not ok:
+                pom_error = dep_result_msg
+        if pom_error:
+            log_panel("DependencyAgent", pom_error, style="red")
+            repair["error"] = pom_error
+            break
+        try:
+            report = await run_blocking(save_generated_files, patched, workspace)
+        except FileWriteError as e:
+            return {"error": f"Errors when writing {e.path}: {e.error}"}, 500
+        if on_file:
+            for f in patched:
+                on_file(f["path"], _size_bytes(f))
+        repair["files_written"] = len(report["written"])
+        test_result = await _run_checks(agents, files, workspace, add_step, f"6.{iteration}) Repair:")
+        repair["success"] = bool(test_result.get("success"))
+
+    return {
+        "msg": "Plugin files generated and saved successfully.",
+        "mode": req.mode,
+        "workspace": workspace.path,
+        "steps": steps,
+        "write": {
+            "files_written": len(write_report.get("written", [])),
+            "files_skipped": len(write_report.get("skipped", [])),
+            "bytes_written": write_report.get("bytes_written", 0),
+            "bytes_skipped": write_report.get("bytes_skipped", 0),
+        },
+        "test_result": test_result,
+        "repairs": repairs,
+        "files": [{"path": f["path"], "size_bytes": _size_bytes(f)} for f in files]
+    }, 200
+
+async def _with_scaffold(scaffold_files, file_stream):
+    # Lokal gerenderte Scaffold-Dateien zuerst, danach die des LLM
+    for file in scaffold_files or []:
+        yield file
+    async for file in file_stream:
+        yield file
+
+async def _run_checks(agents, files, workspace, add_step, label):
+    """
+    Precheck und, falls dieser sauber ist, Maven-Build im Workspace. Gibt das Testergebnis zurück.
+    """
     try:
-        plugin_dir = os.path.join(os.getcwd(), "GENERATED_PLUGIN")
-        tester = TestingAgent()
-        test_result = tester.run_tests(plugin_dir)
-        steps.append("5) Tests ausgeführt")
-        log_panel("Testing results", str(test_result), style="magenta")
+        # Strukturfehler in Java, pom.xml und plugin.xml ohne Maven erkennen (CPU-gebunden, im Worker-Thread)
+        test_result = await run_blocking(agents.testing_agent.precheck, files, agents.dependency_index)
+        if test_result is not None:
+            add_step(f"{label} Precheck fehlgeschlagen, Maven übersprungen")
+        else:
+            test_result = await agents.testing_agent.arun_tests(workspace.path)
+            add_step(f"{label} Tests ausgeführt")
+        logger.event("Testing results", success=test_result.get("success"), operation=test_result.get("operation"),
+                     first_error=test_result.get("first_error"))
+        log_panel("Testing results", lambda: str(test_result), style="magenta", level=logging.DEBUG)
     except Exception as e:
         log_panel("Error during testing", str(e), style="red")
         test_result = {"success": False, "error": str(e)}
-        steps.append("5) Fehler beim Testen")
+        add_step(f"{label} Fehler beim Testen")
+    return test_result
 
-    return JSONResponse({
-        "msg": "Plugin files generated and saved successfully.",
-        "steps": steps,
-        "test_result": test_result,
-        "files": [
-            {
-                "path": f["path"],
-                "size_bytes": len(f["content_binary"]) if f.get("content_binary") is not None
-                              else len(f.get("content", "").encode("utf-8"))
-            }
-            for f in files
-        ]
-    })
\ No newline at end of file
+@app.post("/generate")
+async def generate_plugin(req: PluginRequest, request: Request):
+    if req.format != "json":
+        return await generate_archive(req, _observe_options(request))
+    payload, status_code = await run_pipeline(req, **_observe_options(request))
+    return JSONResponse(payload, status_code=status_code)
+
+async def generate_archive(req: PluginRequest, observe_options: dict):
+    """
+    Generiert das Projekt und streamt es als ZIP bzw. tar.gz direkt aus der
+    Dateiliste im Speicher, ohne Workspace, Dependency-Check und Maven.
+    Trace- und Profil-Id stehen in den Headern X-Trace-Id bzw. X-Profile-Id.
+    """
+    with observe("generate_archive", req.mode, **observe_options) as (metrics, trace, profile_info):
+        payload, status_code = await _run_pipeline(req, None, None, None)
+        timings = metrics.finish(status_code)
+        if trace is not None:
+            trace.root.set_attribute("http.response.status_code", status_code)
+    observed = _observed_fields(trace, profile_info)
+    if status_code != 200:
+        payload["timings"] = timings
+        payload.update(observed)
+        return JSONResponse(payload, status_code=status_code)
+    try:
+        chunks = stream_archive(payload["files"], req.format)
+    except ValueError as e:
+        return JSONResponse({"error": f"Errors when packing archive: {e}"}, status_code=500)
+    filename = f"GENERATED_PLUGIN.{req.format}"
+    extra_headers = {}
+    if "trace_id" in observed:
+        extra_headers["X-Trace-Id"] = observed["trace_id"]
+    if observed.get("profile", {}).get("id"):
+        extra_headers["X-Profile-Id"] = observed["profile"]["id"]
+    server_timing = ", ".join(
+        f"{name.replace('.', '-')};dur={seconds * 1000:.1f}" for name, seconds in timings["stages"].items()
+    )
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[req.format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Server-Timing": f"total;dur={timings['total'] * 1000:.1f}" + (f", {server_timing}" if server_timing else ""),
+            **extra_headers,
+        },
+    )
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """
+    Einer der letzten Traces im OTLP/JSON-Format (ExportTraceServiceRequest).
+    """
+    document = EXPORTER.get(trace_id)
+    if document is None:
+        return JSONResponse({"error": f"Unknown trace {trace_id}"}, status_code=404)
+    return document
+
+@app.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    """
+    Download eines per X-Profile erzeugten Profils: "sample" als folded stacks
+    (speedscope, flamegraph.pl), "cprofile" als pstats-Datei (python -m pstats, snakeviz).
+    """
+    profile = PROFILER.store.get(profile_id)
+    if profile is None:
+        return JSONResponse({"error": f"Unknown profile {profile_id}"}, status_code=404)
+    return Response(
+        profile["data"],
+        media_type=profile["media_type"],
+        headers={"Content-Disposition": f'attachment; filename="{profile["filename"]}"'},
+    )
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return app.state.agents.cache_stats()
+
+@app.post("/jobs", status_code=202)
+async def create_job(req: PluginRequest, request: Request):
+    job = jobs.submit(req, functools.partial(run_pipeline, **_observe_options(request)))
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events",
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse({"error": f"Unknown job {job_id}"}, status_code=404)
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request, format: str | None = None):
+    """
+    Streamt alle Stage-Übergänge eines Jobs live, als NDJSON (Default)
+    oder als Server-Sent Events (?format=sse oder Accept: text/event-stream).
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse({"error": f"Unknown job {job_id}"}, status_code=404)
+    use_sse = format == "sse" or "text/event-stream" in request.headers.get("accept", "")
+    formatter = format_sse if use_sse else format_ndjson
+
+    async def event_source():
+        async for event in job.stream():
+            yield formatter(event)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+    )
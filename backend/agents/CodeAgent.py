@@ -1,51 +1,41 @@
 from langchain_openai import ChatOpenAI
+import asyncio
 import json
+import logging
 import re
 import base64
 import traceback
 import os
 from datetime import datetime
-from rich.console import Console
-from rich.panel import Panel
-from rich.tree import Tree
-from rich.traceback import install
-install(show_locals=True)
-console = Console()
-
-FORBIDDEN_PATTERNS = [
-    "import org.dcm4che3.net.service.ServiceClassProvider",
-    "import org.dcm4che3.net.service.FindSCU",
-    "import org.dcm4che3.net.service.FindSCP",
-    "import org.dcm4che3.net.Association",
-    "import org.dcm4che3.net.PDVInputStream",
-    "import org.dcm4che3.net.Dimse",
-    "import org.dcm4che3.net.PresentationContext",
-    "ServiceClassProvider",
-    "FindSCU",
-    "FindSCP",
-    "Association",
-    "PDVInputStream",
-    "Dimse",
-    "PresentationContext",
-    "Commands"
-]
-
-def log_panel(title, content, style="cyan"):
-    console.print(Panel(content, title=title, style=style))
+from backend.json_extract import IncrementalArrayParser, extract_json_array
+from backend.metrics import record_llm_usage, stage
+from backend.rules import JAVA, file_kind, rule_set_for
+from backend.tracing import set_attributes, traced
+from backend.workspace import safe_relative_path
+from backend.log import get_logger
+
+logger = get_logger("CodeAgent")
+
+log_panel = logger.panel
+
+class TruncatedResponseError(RuntimeError):
+    """
+    Die LLM-Antwort endete mitten im JSON-Array (z.B. max_tokens erreicht). files enthält
+    die vollständig empfangenen Dateien; das Ergebnis wird nicht gecacht.
+    """
+
+    def __init__(self, files: list):
+        super().__init__(f"[CodeAgent] LLM response truncated, only {len(files)} complete files received")
+        self.files = files
+
 
 def log_tree(files, title="[CodeAgent] File Tree"):
-    tree = Tree(title)
-    for file in files:
-        tree.add(file['path'])
-    console.print(tree)
+    logger.tree(title, (file["path"] for file in files))
 
-def clean_forbidden_code(content):
-    lines = content.splitlines()
-    cleaned_lines = []
-    for line in lines:
-        if not any(pattern in line for pattern in FORBIDDEN_PATTERNS):
-            cleaned_lines.append(line)
-    return "\n".join(cleaned_lines)
+def clean_forbidden_code(content, rule_set=None):
+    rule_set = rule_set or rule_set_for(is_dicom=True)
+    cleaned, _ = rule_set.scrub(content, JAVA)
+    return cleaned
 
 def valid_java_class(content):
     # Prüft auf echten Klassenkopf, öffnende und schließende Klammern (mind. einmal) und mehr als nur "class X {}"
@@ -68,73 +58,570 @@ def extract_package_and_class(original):
     class_name = class_match.group(1) if class_match else "Plugin"
     return package_decl, class_name
 
-def validate_and_autocorrect_files(files, is_dicom=False):
+def validate_and_autocorrect_files(files, is_dicom=False, plugin_type=None):
     """
-    Entfernt nur bei DICOM alle Zeilen mit verbotenen dcm4che-Klassen/Imports aus Java-Dateien.
-    Ersetzt kaputte Dateien nur bei DICOM durch eine gültige Stub-Klasse.
-    Für Nicht-DICOM-Plugins bleibt alles wie generiert!
+    Entfernt alle Zeilen mit verbotenen Bezeichnern (siehe backend/rules.py) aus Java-Dateien
+    und meldet Treffer in pom.xml und plugin.xml – mit dem Regelsatz für DICOM bzw. den plugin_type.
+    Ersetzt kaputte Java-Dateien nur bei DICOM durch eine gültige Stub-Klasse.
+    Ohne passenden Regelsatz (Default für Nicht-DICOM-Plugins) bleibt alles wie generiert!
     """
+    rule_set = rule_set_for(is_dicom, plugin_type)
+    if rule_set is None:
+        return files
+    with stage("autocorrect"):
+        _autocorrect(files, rule_set, is_dicom)
+    return files
+
+def _autocorrect(files, rule_set, is_dicom):
     for file in files:
         path = file.get("path", "")
-        if path.endswith(".java") and is_dicom:
-            original = file.get("content", "")
-            cleaned = clean_forbidden_code(original)
-            if not valid_java_class(cleaned):
-                package_decl, class_name = extract_package_and_class(original)
-                cleaned = f"""{package_decl}public class {class_name} {{
+        kind = file_kind(path)
+        if kind is None or file.get("content_binary") is not None:
+            continue
+        original = file.get("content", "")
+        cleaned, hits = rule_set.scrub(original, kind)
+        if kind == JAVA and is_dicom and not valid_java_class(cleaned):
+            package_decl, class_name = extract_package_and_class(original)
+            cleaned = f"""{package_decl}public class {class_name} {{
     // TODO: Not possible with real dcm4che API
 }}"""
-            file["content"] = cleaned
-    return files
+        if hits:
+            title = "[CodeAgent] Forbidden code removed" if kind == JAVA else "[CodeAgent] Forbidden code found (XML left unchanged)"
+            log_panel(title, f"{path}: {', '.join(sorted({h for _, h in hits}))}", style="yellow")
+        file["content"] = cleaned
+
+def _normalized_path(path):
+    try:
+        return safe_relative_path(path)
+    except ValueError:
+        return path
 
 class CodeAgent:
-    def __init__(self, model_name: str = "gpt-4o", temperature: float = 0.0):
-        self.llm = ChatOpenAI(model=model_name, temperature=temperature)
-        self.current_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    def __init__(self, model_name: str = "gpt-4o", temperature: float = 0.0, llm: ChatOpenAI | None = None,
+                 generation_cache=None, file_concurrency: int = None, file_retries: int = None):
+        # llm kann von der AgentRegistry geteilt übergeben werden (gemeinsamer Connection-Pool)
+        self.llm = llm or ChatOpenAI(model=model_name, temperature=temperature)
+        # Optionaler GenerationCache (backend/cache.py), nur bei Temperatur 0 aktiv
+        self.generation_cache = generation_cache
+        # Parallel-Modus: gleichzeitige Datei-Calls (PARALLEL_FILE_CONCURRENCY, Default 4) und
+        # Wiederholungen pro Datei bzw. Manifest (PARALLEL_FILE_RETRIES, Default 2)
+        self.file_concurrency = file_concurrency or int(os.getenv("PARALLEL_FILE_CONCURRENCY", "4"))
+        self.file_retries = file_retries if file_retries is not None else int(os.getenv("PARALLEL_FILE_RETRIES", "2"))
         self.user_login = "zurd46"
 
-    def generate_files(self, prompt: str, meta: dict) -> list:
-        main_class = meta.get("main_class_name", "MyPlugin")
-        pkg = meta.get("package", "com.example.plugin")
-        mirth_ver = meta.get("mirth_version", "4.5.2")
-        dicom_flag = meta.get("dicom_enabled", False)
+    @property
+    def current_date(self) -> str:
+        # Pro Aufruf berechnet, da die Instanz über die ganze App-Laufzeit lebt
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-        system_message = self._create_system_prompt(prompt, meta, dicom_flag)
+    @traced
+    def generate_files(self, prompt: str, meta: dict, use_cache: bool = True, scaffold_files: list = None) -> list:
+        """
+        Mit scaffold_files (lokal gerenderte pom.xml, plugin.xml, ...) werden nur noch die
+        Java-Quellen generiert; die Rückgabe enthält dann ausschließlich diese.
+        """
+        dicom_flag = meta.get("dicom_enabled", False)
+        cache_key, cached = self._cache_lookup(prompt, meta, dicom_flag, use_cache, scaffold_files=scaffold_files)
+        if cached is not None:
+            return cached
+        system_message = self._generation_prompt(prompt, meta, dicom_flag, scaffold_files)
 
         log_panel("[CodeAgent] Sending request to LLM", f"Model: {self.llm.model_name}, Temperature: {self.llm.temperature}")
         try:
-            resp = self.llm.invoke(system_message)
-            raw_response = resp.content
-
-            # Typabsicherung für _process_llm_response
-            if isinstance(raw_response, str):
-                response_str = raw_response
-            elif isinstance(raw_response, list):
-                response_str = "\n".join(
-                    s if isinstance(s, str) else json.dumps(s)
-                    for s in raw_response
-                )
-            else:
-                response_str = str(raw_response)
+            resp = self._invoke(system_message)
+            response_str = self._response_to_str(resp)
+        except Exception as exc:
+            error_msg = f"[CodeAgent] LLM-Request failed: {exc}"
+            log_panel("[CodeAgent] LLM-Request Error", traceback.format_exc(), style="red")
+            raise RuntimeError(error_msg)
+
+        files, complete = self._finalize_files(response_str, dicom_flag, meta.get("plugin_type"))
+        files = self._drop_scaffolded(files, scaffold_files)
+        if not complete:
+            raise TruncatedResponseError(files)
+        self._cache_store(cache_key, files, len(response_str.encode("utf-8")))
+        return files
 
-            log_panel("[CodeAgent] Raw LLM response received", f"Length: {len(response_str)} characters")
+    @traced
+    async def agenerate_files(self, prompt: str, meta: dict, use_cache: bool = True, scaffold_files: list = None) -> list:
+        """
+        Async-Variante von generate_files(): der LLM-Call läuft über den nativen
+        async-Client, das Parsen der Antwort bleibt identisch.
+        """
+        dicom_flag = meta.get("dicom_enabled", False)
+        cache_key, cached = self._cache_lookup(prompt, meta, dicom_flag, use_cache, scaffold_files=scaffold_files)
+        if cached is not None:
+            return cached
+        system_message = self._generation_prompt(prompt, meta, dicom_flag, scaffold_files)
+
+        log_panel("[CodeAgent] Sending request to LLM", f"Model: {self.llm.model_name}, Temperature: {self.llm.temperature}")
+        try:
+            resp = await self._ainvoke(system_message)
+            response_str = self._response_to_str(resp)
         except Exception as exc:
             error_msg = f"[CodeAgent] LLM-Request failed: {exc}"
             log_panel("[CodeAgent] LLM-Request Error", traceback.format_exc(), style="red")
             raise RuntimeError(error_msg)
 
+        files, complete = self._finalize_files(response_str, dicom_flag, meta.get("plugin_type"))
+        files = self._drop_scaffolded(files, scaffold_files)
+        if not complete:
+            raise TruncatedResponseError(files)
+        self._cache_store(cache_key, files, len(response_str.encode("utf-8")))
+        return files
+
+    async def astream_files(self, prompt: str, meta: dict, use_cache: bool = True, scaffold_files: list = None):
+        """
+        Streaming-Modus: konsumiert die LLM-Antwort Token für Token und liefert jede
+        Datei, sobald ihr JSON-Objekt vollständig ist – bereits validiert und
+        (bei Binärdateien) dekodiert. Der Aufrufer kann sie sofort speichern.
+        Endet der Stream vor dem Ende des Arrays, folgt nach den Dateien ein TruncatedResponseError.
+        """
+        dicom_flag = meta.get("dicom_enabled", False)
+        cache_key, cached = self._cache_lookup(prompt, meta, dicom_flag, use_cache, scaffold_files=scaffold_files)
+        if cached is not None:
+            for file in cached:
+                yield file
+            return
+        system_message = self._generation_prompt(prompt, meta, dicom_flag, scaffold_files)
+        scaffolded = {_normalized_path(f["path"]) for f in scaffold_files or []}
+        parser = IncrementalArrayParser()
+        files = []
+        response_bytes = 0
+        count = 0
+
+        log_panel("[CodeAgent] Streaming request to LLM", f"Model: {self.llm.model_name}, Temperature: {self.llm.temperature}")
+        usage_chunk = None
+        try:
+            # Enthält auch die Zeit, in der der Aufrufer die gelieferten Dateien speichert
+            with stage("llm.code.stream"):
+                async for chunk in self.llm.astream(system_message):
+                    if getattr(chunk, "usage_metadata", None):
+                        usage_chunk = chunk
+                    text = self._chunk_to_str(chunk)
+                    response_bytes += len(text.encode("utf-8"))
+                    for file in parser.feed(text):
+                        file = self._finalize_file(count, file, dicom_flag, meta.get("plugin_type"))
+                        if _normalized_path(file["path"]) in scaffolded:
+                            continue
+                        files.append(file)
+                        count += 1
+                        yield file
+                record_llm_usage("code", self.llm.model_name, usage_chunk)
+        except ValueError as e:
+            log_panel("[CodeAgent] Processing Error", str(e), style="red")
+            raise RuntimeError(f"[CodeAgent] Failed to process LLM response: {e}")
+        except Exception as exc:
+            log_panel("[CodeAgent] LLM-Request Error", traceback.format_exc(), style="red")
+            raise RuntimeError(f"[CodeAgent] LLM-Request failed: {exc}")
+
+        if count == 0:
+            raise RuntimeError("[CodeAgent] Failed to process LLM response: no file objects in streamed response")
+        if not parser.finished:
+            log_panel("[CodeAgent] Stream ended early", f"JSON array not closed, {count} complete files received", style="red")
+            raise TruncatedResponseError(files)
+        self._cache_store(cache_key, files, response_bytes)
+        log_panel("[CodeAgent] Files successfully streamed", f"Count: {count}")
+
+    @traced
+    async def agenerate_fused(self, prompt: str, dicom_flag: bool) -> tuple[dict, list]:
+        """
+        Fused-Modus: ein einziger LLM-Call liefert Metadaten UND Dateien als
+        JSON-Objekt {"metadata": {...}, "files": [...]}. Die Metadaten kommen roh
+        zurück; der Aufrufer ergänzt sie mit PromptAnalyzerAgent.complete_metadata()
+        und wendet anschließend validate_and_autocorrect_files() an.
+        """
+        system_message = self._create_fused_prompt(prompt, dicom_flag)
+        llm = self.llm.bind(response_format={"type": "json_object"})
+
+        log_panel("[CodeAgent] Sending fused request to LLM", f"Model: {self.llm.model_name}, Temperature: {self.llm.temperature}")
+        try:
+            resp = await self._ainvoke(system_message, llm)
+            response_str = self._response_to_str(resp)
+        except Exception as exc:
+            log_panel("[CodeAgent] LLM-Request Error", traceback.format_exc(), style="red")
+            raise RuntimeError(f"[CodeAgent] LLM-Request failed: {exc}")
+
+        try:
+            with stage("parse"):
+                result = json.loads(self._strip_code_fences(response_str))
+                if not isinstance(result, dict) or "files" not in result:
+                    raise ValueError("Expected an object with 'metadata' and 'files'")
+                meta = result.get("metadata") if isinstance(result.get("metadata"), dict) else {}
+                files = self._process_file_list(result["files"])
+        except Exception as e:
+            log_panel("[CodeAgent] Processing Error", str(e), style="red")
+            raise RuntimeError(f"[CodeAgent] Failed to process fused LLM response: {e}")
+        log_panel("[CodeAgent] Fused response processed", f"Count: {len(files)}")
+        return meta, files
+
+    @traced
+    async def agenerate_parallel(self, prompt: str, meta: dict, use_cache: bool = True) -> list:
+        """
+        Parallel-Modus: erst ein kleiner Planungs-Call (Manifest mit Pfaden, Rollen und
+        Schnittstellen), dann ein Call pro Datei, höchstens file_concurrency gleichzeitig.
+        Die Dauer entspricht damit etwa der langsamsten Einzeldatei statt der Summe aller.
+        Dateien kommen in Manifest-Reihenfolge zurück.
+        """
+        results = {}
+        async for index, file in self._aiter_parallel(prompt, meta, use_cache):
+            results[index] = file
+        files = [results[i] for i in sorted(results)]
+        log_tree(files)
+        return files
+
+    async def astream_parallel(self, prompt: str, meta: dict, use_cache: bool = True):
+        """
+        Wie agenerate_parallel(), liefert aber jede Datei, sobald ihr Call fertig ist.
+        """
+        async for _, file in self._aiter_parallel(prompt, meta, use_cache):
+            yield file
+
+    async def _aiter_parallel(self, prompt: str, meta: dict, use_cache: bool):
+        dicom_flag = meta.get("dicom_enabled", False)
+        cache_key, cached = self._cache_lookup(prompt, meta, dicom_flag, use_cache, variant="parallel")
+        if cached is not None:
+            for index, file in enumerate(cached):
+                yield index, file
+            return
+
+        manifest, response_bytes = await self._aplan_manifest(prompt, meta, dicom_flag)
+        semaphore = asyncio.Semaphore(self.file_concurrency)
+
+        async def generate(index, entry):
+            async with semaphore:
+                file, nbytes = await self._agenerate_single(prompt, meta, dicom_flag, manifest, entry)
+            return index, file, nbytes
+
+        tasks = [asyncio.ensure_future(generate(i, entry)) for i, entry in enumerate(manifest)]
+        files = [None] * len(manifest)
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, file, nbytes = await next_done
+                files[index] = file
+                response_bytes += nbytes
+                yield index, file
+        finally:
+            # Bei einem endgültig fehlgeschlagenen Datei-Call die übrigen Calls abbrechen
+            for task in tasks:
+                task.cancel()
+        log_panel("[CodeAgent] Parallel generation finished", f"Count: {len(files)}")
+        self._cache_store(cache_key, files, response_bytes)
+
+    @traced
+    async def _aplan_manifest(self, prompt: str, meta: dict, dicom_flag: bool) -> tuple[list, int]:
+        """
+        Planungs-Call: gibt (manifest, antwort_bytes) zurück, manifest als Liste von
+        {"path", "role", "interface"} ohne doppelte Pfade.
+        """
+        system_message = self._create_manifest_prompt(prompt, meta, dicom_flag)
+        log_panel("[CodeAgent] Sending manifest request to LLM", f"Model: {self.llm.model_name}, Temperature: {self.llm.temperature}")
+        last_error = None
+        for attempt in range(self.file_retries + 1):
+            try:
+                resp = await self._ainvoke(system_message)
+                response_str = self._response_to_str(resp)
+                entries, complete = self._extract_json_array(response_str)
+                if not complete:
+                    # Ein abgeschnittenes Manifest würde Dateien stillschweigend weglassen
+                    raise ValueError("Truncated manifest")
+                if not entries:
+                    raise ValueError("Expected a non-empty JSON array")
+                manifest = []
+                seen = set()
+                for i, entry in enumerate(entries):
+                    if not isinstance(entry, dict) or not entry.get("path"):
+                        raise ValueError(f"Manifest entry {i} has no 'path'")
+                    if entry["path"] in seen:
+                        continue
+                    seen.add(entry["path"])
+                    manifest.append({
+                        "path": str(entry["path"]),
+                        "role": str(entry.get("role", "")),
+                        "interface": str(entry.get("interface", "")),
+                    })
+                log_tree(manifest, title="[CodeAgent] Manifest")
+                return manifest, len(response_str.encode("utf-8"))
+            except Exception as e:
+                last_error = e
+                log_panel("[CodeAgent] Manifest Error", f"Attempt {attempt + 1}: {e}", style="red")
+        raise RuntimeError(f"[CodeAgent] Manifest planning failed: {last_error}")
+
+    @traced
+    async def _agenerate_single(self, prompt: str, meta: dict, dicom_flag: bool, manifest: list, entry: dict):
+        """
+        Generiert genau eine Datei des Manifests; ungültige Antworten (gleiche Prüfungen wie
+        _process_llm_response) werden bis zu file_retries Mal wiederholt.
+        Gibt (datei, antwort_bytes) zurück.
+        """
+        set_attributes(**{"file.path": entry["path"]})
+        system_message = self._create_single_file_prompt(prompt, meta, dicom_flag, manifest, entry)
+        wanted = _normalized_path(entry["path"])
+        last_error = None
+        for attempt in range(self.file_retries + 1):
+            try:
+                resp = await self._ainvoke(system_message)
+                response_str = self._response_to_str(resp)
+                files, _ = self._process_llm_response(response_str)
+                file = next((f for f in files if _normalized_path(f["path"]) == wanted), None)
+                if file is None:
+                    raise ValueError(f"Response does not contain {entry['path']}")
+                file["path"] = entry["path"]
+                validate_and_autocorrect_files([file], dicom_flag, meta.get("plugin_type"))
+                return file, len(response_str.encode("utf-8"))
+            except Exception as e:
+                last_error = e
+                log_panel("[CodeAgent] File Generation Error", f"{entry['path']} (attempt {attempt + 1}): {e}", style="red")
+        raise RuntimeError(f"[CodeAgent] Failed to generate {entry['path']}: {last_error}")
+
+    def _create_manifest_prompt(self, prompt: str, meta: dict, dicom_flag: bool) -> str:
+        return self._create_system_prompt(prompt, meta, dicom_flag) + """
+MANIFEST RESPONSE FORMAT (this overrides every response format instruction above):
+- Do NOT generate file contents yet. Plan the complete project instead.
+- Respond with ONLY a valid JSON array with one object per file of the project, each with:
+  "path": the file path under 'GENERATED_PLUGIN/',
+  "role": one sentence describing the purpose of the file,
+  "interface": for Java files the fully qualified type name and the public constructors, methods and
+               constants other files may use; for other files the key identifiers (artifactId, plugin id, ...).
+- The interfaces are a contract: every file will be generated separately and may only rely on them.
+"""
+
+    def _create_single_file_prompt(self, prompt: str, meta: dict, dicom_flag: bool, manifest: list, entry: dict) -> str:
+        plan = "\n".join(
+            f"- {e['path']}: {e['role']}" + (f"\n  interface: {e['interface']}" if e["interface"] else "")
+            for e in manifest
+        )
+        return self._create_system_prompt(prompt, meta, dicom_flag) + f"""
+PROJECT PLAN (all files of the project; other files are generated separately):
+{plan}
+
+SINGLE FILE RESPONSE FORMAT (this overrides every response format instruction above):
+- Generate ONLY the file below, complete and compilable, consistent with the interfaces in the plan.
+- Respond with ONLY a valid JSON array containing exactly one object with "path" and "content".
+FILE TO GENERATE: {entry['path']}
+ROLE: {entry['role']}
+"""
+
+    @traced
+    async def arepair_files(self, prompt: str, meta: dict, files: list, diagnostics: dict) -> list:
+        """
+        Reparatur-Call: das LLM bekommt nur die fehlerhaften Dateien samt ihrer Compiler-/
+        Precheck-Meldungen (diagnostics: {pfad: [meldung, ...]}) und liefert sie korrigiert zurück.
+        Übrige Projektdateien erscheinen nur als Pfadliste. Antworten für Pfade, die nicht
+        repariert werden sollten, werden verworfen. Ohne Cache, da die Eingabe jedes Mal anders ist.
+        """
+        dicom_flag = meta.get("dicom_enabled", False)
+        broken = [f for f in files if f["path"] in diagnostics and f.get("content_binary") is None]
+        if not broken:
+            return []
+        system_message = self._create_repair_prompt(prompt, meta, files, broken, diagnostics)
+
+        log_panel("[CodeAgent] Sending repair request to LLM", "\n".join(f["path"] for f in broken))
+        try:
+            resp = await self._ainvoke(system_message)
+            response_str = self._response_to_str(resp)
+        except Exception as exc:
+            log_panel("[CodeAgent] LLM-Request Error", traceback.format_exc(), style="red")
+            raise RuntimeError(f"[CodeAgent] LLM-Request failed: {exc}")
+
+        wanted = {_normalized_path(f["path"]): f["path"] for f in broken}
+        repaired = []
+        # Auch aus einer abgeschnittenen Antwort sind die vollständigen Dateien brauchbar
+        files, _ = self._finalize_files(response_str, dicom_flag, meta.get("plugin_type"))
+        for file in files:
+            path = wanted.pop(_normalized_path(file["path"]), None)
+            if path is not None:
+                file["path"] = path
+                repaired.append(file)
+        return repaired
+
+    def _create_repair_prompt(self, prompt: str, meta: dict, files: list, broken: list, diagnostics: dict) -> str:
+        other_paths = "\n".join(f"- {f['path']}" for f in files if f["path"] not in diagnostics)
+        sections = []
+        for file in broken:
+            messages = "\n".join(f"  - {m}" for m in diagnostics[file["path"]])
+            sections.append(f"""=== FILE: {file['path']}
+ERRORS:
+{messages}
+CURRENT CONTENT:
+{file.get('content', '')}
+""")
+        return f"""You are a senior Java/Maven developer specializing in Mirth Connect plugins.
+
+REPAIR TASK:
+The generated Mirth Connect plugin below does not build. Fix ONLY the reported errors in the
+files listed under FILES TO REPAIR. Keep everything else in these files unchanged.
+
+METADATA:
+- Main Class: {meta.get('main_class_name', 'MyPlugin')}
+- Package: {meta.get('package', 'com.example.plugin')}
+- Plugin Type: {meta.get('plugin_type', 'SERVER_PLUGIN')}
+- Mirth Version: {meta.get('mirth_version', '4.5.2')}
+
+ORIGINAL USER REQUEST:
+{prompt}
+
+OTHER PROJECT FILES (unchanged, for reference only — do NOT return them):
+{other_paths or '- (none)'}
+
+FILES TO REPAIR:
+{"".join(sections)}
+RULES:
+- Use ONLY classes, methods and constants that exist in the referenced libraries; never invent APIs.
+- Do not rename files, packages or public classes unless an error requires it.
+- If an error cannot be fixed with public APIs, remove the offending code and leave a // TODO comment.
+
+RESPONSE FORMAT:
+- Respond with ONLY a valid JSON array of objects with "path" and "content" — NO markdown, NO explanations.
+- Return exactly one object per file under FILES TO REPAIR, with the identical "path" and the COMPLETE corrected content.
+"""
+
+    def _create_fused_prompt(self, prompt: str, dicom_flag: bool) -> str:
+        derive = "(derive from the USER REQUEST; must match \"metadata\" in your response)"
+        base_prompt = self._create_system_prompt(
+            prompt,
+            {"main_class_name": derive, "package": derive, "plugin_type": derive, "mirth_version": derive},
+            dicom_flag,
+        )
+        return base_prompt + """
+FUSED RESPONSE FORMAT (this overrides every response format instruction above):
+- Respond with ONLY a valid JSON object with exactly two keys, "metadata" and "files".
+- "metadata" is an object with the keys plugin_name, plugin_description, main_class_name, package,
+  plugin_id, mirth_version, plugin_type, use_assembly, provided_dependencies, dicom_enabled,
+  dicom_host, dicom_port, dicom_server_ae, dicom_client_ae, all derived from the USER REQUEST.
+- "files" is the JSON array of file objects with "path" and "content" described above.
+- The files MUST use exactly the package, main class name and plugin id from "metadata".
+"""
+
+    async def _ainvoke(self, message: str, llm=None):
+        llm = llm or self.llm
+        with stage("llm.code"):
+            resp = await llm.ainvoke(message)
+            record_llm_usage("code", self.llm.model_name, resp)
+        return resp
+
+    def _invoke(self, message: str):
+        with stage("llm.code"):
+            resp = self.llm.invoke(message)
+            record_llm_usage("code", self.llm.model_name, resp)
+        return resp
+
+    def _cache_lookup(self, prompt: str, meta: dict, dicom_flag: bool, use_cache: bool, variant: str = "",
+                      scaffold_files: list = None):
+        """
+        Gibt (cache_key, cached_files) zurück. cache_key ist None, wenn nicht gecacht werden soll.
+        variant trennt die Einträge verschiedener Generierungsmodi (z.B. "parallel").
+        """
+        if not use_cache or self.generation_cache is None or self.llm.temperature != 0.0:
+            return None, None
+        # Der Zeitstempel im Prompt ändert nichts am generierten Code und bleibt deshalb außen vor
+        key_prompt = self._generation_prompt(prompt, meta, dicom_flag, scaffold_files, generated="-")
+        if variant:
+            key_prompt += f"\nMODE: {variant}"
+        key = self.generation_cache.key(key_prompt, self.llm.model_name, self.llm.temperature)
+        cached = self.generation_cache.get(key)
+        if cached is not None:
+            log_panel("[CodeAgent] Generation cache hit", f"{len(cached)} Files replayed from cache", style="green")
+        return key, cached
+
+    def _cache_store(self, key, files: list, response_bytes: int):
+        if key is not None:
+            self.generation_cache.set(key, files, response_bytes=response_bytes)
+
+    def _chunk_to_str(self, chunk) -> str:
+        content = chunk.content
+        if isinstance(content, str):
+            return content
+        if isinstance(content, list):
+            return "".join(
+                s if isinstance(s, str) else s.get("text", "") if isinstance(s, dict) else str(s)
+                for s in content
+            )
+        return str(content)
+
+    def _finalize_file(self, index: int, file, dicom_flag: bool, plugin_type: str = None) -> dict:
         try:
-            files = self._process_llm_response(response_str)
-            files = validate_and_autocorrect_files(files, dicom_flag)
+            self._validate_file(index, file)
+        except Exception as e:
+            log_panel("[CodeAgent] File Validation Error", str(e), style="red")
+            raise ValueError(f"Invalid file structure: {e}")
+        self._process_binary_files([file])
+        validate_and_autocorrect_files([file], dicom_flag, plugin_type)
+        return file
+
+    def _response_to_str(self, resp) -> str:
+        raw_response = resp.content
+
+        # Typabsicherung für _process_llm_response
+        if isinstance(raw_response, str):
+            response_str = raw_response
+        elif isinstance(raw_response, list):
+            response_str = "\n".join(
+                s if isinstance(s, str) else json.dumps(s)
+                for s in raw_response
+            )
+        else:
+            response_str = str(raw_response)
+
+        log_panel("[CodeAgent] Raw LLM response received", f"Length: {len(response_str)} characters", level=logging.DEBUG)
+        return response_str
+
+    def _finalize_files(self, response_str: str, dicom_flag: bool, plugin_type: str = None) -> tuple[list, bool]:
+        """
+        Parst, validiert und korrigiert die Dateien einer Antwort. Gibt (files, complete) zurück;
+        complete ist False, wenn die Antwort mitten im Array abbrach.
+        """
+        try:
+            files, complete = self._process_llm_response(response_str)
+            files = validate_and_autocorrect_files(files, dicom_flag, plugin_type)
             log_panel("[CodeAgent] Files successfully generated", f"Count: {len(files)}")
             log_tree(files)
-            return files
+            return files, complete
         except Exception as e:
             error_msg = f"[CodeAgent] Failed to process LLM response: {e}"
             log_panel("[CodeAgent] Processing Error", str(e), style="red")
             raise RuntimeError(error_msg)
 
-    def _create_system_prompt(self, prompt: str, meta: dict, dicom_flag: bool) -> str:
+    def _generation_prompt(self, prompt: str, meta: dict, dicom_flag: bool, scaffold_files: list = None,
+                           generated: str = None) -> str:
+        if scaffold_files:
+            return self._create_scaffold_prompt(prompt, meta, dicom_flag, scaffold_files, generated)
+        return self._create_system_prompt(prompt, meta, dicom_flag, generated)
+
+    def _create_scaffold_prompt(self, prompt: str, meta: dict, dicom_flag: bool, scaffold_files: list,
+                                generated: str = None) -> str:
+        package_dir = str(meta.get("package", "com.example.plugin")).replace(".", "/")
+        provided = "\n".join(
+            f"=== {f['path']} (already generated, FINAL)\n{f['content']}" for f in scaffold_files
+        )
+        return self._create_system_prompt(prompt, meta, dicom_flag, generated) + f"""
+SCAFFOLD (this overrides every file list and pom.xml/plugin.xml instruction above):
+The build and plugin descriptor files below are already generated from templates and MUST NOT be returned.
+Your code may only use the JDK and the dependencies declared in this pom.xml.
+
+{provided}
+
+SCAFFOLD RESPONSE FORMAT:
+- Generate ONLY the Java sources (and optional src/main/resources files) implementing the USER REQUEST.
+- Source files go under GENERATED_PLUGIN/src/main/java/{package_dir}/ (tests under GENERATED_PLUGIN/src/test/java/).
+- Every class referenced in plugin.xml MUST be generated, in particular {meta.get('package', 'com.example.plugin')}.{meta.get('main_class_name', 'MyPlugin')}.
+- Respond with ONLY a valid JSON array of objects with "path" and "content".
+"""
+
+    def _drop_scaffolded(self, files: list, scaffold_files: list) -> list:
+        """
+        Entfernt Dateien, die das LLM trotz Scaffold erneut geliefert hat – das Scaffold gewinnt.
+        """
+        if not scaffold_files:
+            return files
+        scaffolded = {_normalized_path(f["path"]) for f in scaffold_files}
+        kept = [f for f in files if _normalized_path(f["path"]) not in scaffolded]
+        if len(kept) != len(files):
+            log_panel("[CodeAgent] Scaffold files ignored",
+                      "\n".join(f["path"] for f in files if f not in kept), style="yellow")
+        return kept
+
+    def _create_system_prompt(self, prompt: str, meta: dict, dicom_flag: bool, generated: str = None) -> str:
         base_prompt = f"""You are a senior Java/Maven developer specializing in Mirth Connect plugins.
 
 CRITICAL INSTRUCTIONS:
@@ -159,7 +646,7 @@ METADATA:
 - Plugin Type: {meta.get('plugin_type', 'SERVER_PLUGIN')}
 - Mirth Version: {meta.get('mirth_version', '4.5.2')}
 - Author: {self.user_login}
-- Generated: {self.current_date}
+- Generated: {generated or self.current_date}
 
 USER REQUEST:
 {prompt}
@@ -206,35 +693,49 @@ RESPONSE FORMAT:
 """
         return base_prompt
 
-    def _process_llm_response(self, raw_response: str) -> list:
+    def _process_llm_response(self, raw_response: str) -> tuple[list, bool]:
+        with stage("parse"):
+            return self._parse_llm_response(raw_response)
+
+    def _parse_llm_response(self, raw_response: str) -> tuple[list, bool]:
         preview = raw_response[:500] + "..." if len(raw_response) > 500 else raw_response
-        log_panel("[CodeAgent] LLM Response Preview", preview, style="yellow")
-        cleaned_text = self._strip_code_fences(raw_response)
-        json_text = self._extract_json_array(cleaned_text)
+        log_panel("[CodeAgent] LLM Response Preview", preview, style="yellow", level=logging.DEBUG)
+        try:
+            files, complete = self._extract_json_array(raw_response)
+        except ValueError as e:
+            log_panel("[CodeAgent] JSON Parse Error", f"Error: {e}", style="red")
+            log_panel("[CodeAgent] Problematic JSON Text", raw_response[:1000] + "..." if len(raw_response) > 1000 else raw_response, style="red")
+            raise ValueError(f"Invalid JSON response from LLM: {e}")
+        if not complete:
+            log_panel("[CodeAgent] Truncated JSON response", f"Only {len(files)} complete file objects", style="red")
+        return self._process_file_list(files), complete
+
+    def _process_file_list(self, files) -> list:
+        """
+        Validiert eine bereits geparste Dateiliste und dekodiert Binärdateien.
+        """
         try:
-            files = json.loads(json_text)
             if not isinstance(files, list):
                 raise ValueError(f"Expected list, got {type(files)}")
             for i, file in enumerate(files):
-                if not isinstance(file, dict):
-                    raise ValueError(f"File {i} is not a dict: {type(file)}")
-                if "path" not in file:
-                    raise ValueError(f"File {i} missing 'path' field")
-                if "content" not in file:
-                    raise ValueError(f"File {i} missing 'content' field")
-                content = str(file["content"])
-                if "FromToFromTo" in content and content.count("FromTo") > 5:
-                    raise ValueError(f"File {i} contains repetitive/nonsensical content")
-        except json.JSONDecodeError as e:
-            log_panel("[CodeAgent] JSON Parse Error", f"Error: {e}", style="red")
-            log_panel("[CodeAgent] Problematic JSON Text", json_text[:1000] + "..." if len(json_text) > 1000 else json_text, style="red")
-            raise ValueError(f"Invalid JSON response from LLM: {e}")
+                self._validate_file(i, file)
         except Exception as e:
             log_panel("[CodeAgent] File Validation Error", str(e), style="red")
             raise ValueError(f"Invalid file structure: {e}")
         self._process_binary_files(files)
         return files
 
+    def _validate_file(self, i: int, file) -> None:
+        if not isinstance(file, dict):
+            raise ValueError(f"File {i} is not a dict: {type(file)}")
+        if "path" not in file:
+            raise ValueError(f"File {i} missing 'path' field")
+        if "content" not in file:
+            raise ValueError(f"File {i} missing 'content' field")
+        content = str(file["content"])
+        if "FromToFromTo" in content and content.count("FromTo") > 5:
+            raise ValueError(f"File {i} contains repetitive/nonsensical content")
+
     def _strip_code_fences(self, text: str) -> str:
         text = text.strip()
         pattern = r"^```(?:json)?\s*\n(.*?)\n```$"
@@ -243,34 +744,14 @@ RESPONSE FORMAT:
             return match.group(1).strip()
         return text
 
-    def _extract_json_array(self, text: str) -> str:
-        text = text.strip()
-        start_idx = text.find('[')
-        if start_idx == -1:
-            return text
-        bracket_count = 0
-        in_string = False
-        escape_next = False
-        for i in range(start_idx, len(text)):
-            char = text[i]
-            if escape_next:
-                escape_next = False
-                continue
-            if char == '\\':
-                escape_next = True
-                continue
-            if char == '"' and not escape_next:
-                in_string = not in_string
-                continue
-            if not in_string:
-                if char == '[':
-                    bracket_count += 1
-                elif char == ']':
-                    bracket_count -= 1
-                    if bracket_count == 0:
-                        return text[start_idx:i+1]
-        return text[start_idx:]
+    @traced
+    def _extract_json_array(self, text: str) -> tuple[list, bool]:
+        """
+        (elemente, vollständig) des JSON-Arrays in der Antwort, siehe json_extract.extract_json_array.
+        """
+        return extract_json_array(text)
 
+    @traced
     def _process_binary_files(self, files: list) -> None:
         binary_extensions = ['.png', '.jpg', '.jpeg', '.gif', '.zip', '.jar', '.ico']
         for file in files:
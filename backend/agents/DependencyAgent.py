@@ -1,62 +1,241 @@
 import os
 import subprocess
-from rich.console import Console
-from rich.panel import Panel
-from rich.traceback import install
-install(show_locals=True)
-console = Console()
+import threading
+import time
+import weakref
+from backend.build_executor import default_local_repo
+from backend.dependency_index import jar_pom_properties
+from backend.metrics import stage
+from backend.tracing import traced
+from backend.xml_check import LOCAL_ONLY_GROUP_PREFIXES, parse_pom_dependencies
+from backend.log import get_logger
 
-def log_panel(title, content, style="cyan"):
-    console.print(Panel(content, title=title, style=style))
+logger = get_logger("DependencyAgent")
+
+log_panel = logger.panel
 
 class DependencyAgent:
-    def __init__(self, mirth_home=None):
+    """
+    Stellt sicher, dass die im generierten pom.xml deklarierten Artefakte im lokalen
+    Maven-Repository liegen, und installiert fehlende aus MIRTH_HOME/server-lib.
+    Installiert werden nur Artefakte aus LOCAL_ONLY_GROUP_PREFIXES; alle anderen lädt
+    Maven aus den Remote-Repositories, auch wenn server-lib ein gleichnamiges JAR enthält.
+
+    Ergebnisse werden pro (groupId, artifactId, version) gemerkt und erst nach
+    recheck_interval Sekunden per stat() gegen die mtime der JARs revalidiert.
+    Gleichzeitige Installationen desselben Artefakts laufen nur einmal (Lock pro Artefakt).
+    Ist ein fertiger DependencyIndex gesetzt, werden Quell-JARs dort nachgeschlagen
+    statt im Dateisystem gesucht.
+
+    Konfiguration über Umgebungsvariablen:
+      MIRTH_HOME                  Mirth-Connect-Installation (JARs unter server-lib/)
+      MAVEN_LOCAL_REPO            lokales Repository (Default: build_executor.default_local_repo)
+      MIRTH_VERSION               Version für JARs ohne Version im Namen und ohne pom.properties (Default 4.5.2)
+      DEPENDENCY_RECHECK_INTERVAL Sekunden, bis ein gemerktes Ergebnis neu geprüft wird (Default 30)
+    """
+
+    def __init__(self, mirth_home=None, local_repo=None, recheck_interval=None, maven_cmd=None, index=None):
         self.mirth_home = mirth_home or os.getenv("MIRTH_HOME")
+        self.index = index
+        self.local_repo = local_repo or default_local_repo()
+        self.recheck_interval = recheck_interval if recheck_interval is not None else float(
+            os.getenv("DEPENDENCY_RECHECK_INTERVAL", "30")
+        )
+        self.maven_cmd = maven_cmd or os.getenv("MAVEN_CMD") or "mvn"
+        self.mirth_version = os.getenv("MIRTH_VERSION", "4.5.2")
+        self.stats = {"hits": 0, "revalidations": 0, "misses": 0, "installs": 0}
+        self._results = {}  # key -> (checked_at, mtimes, (ok, msg))
+        # Lock pro Artefakt nur solange jemand ihn hält oder darauf wartet (wie BuildExecutor._dir_locks)
+        self._locks = weakref.WeakValueDictionary()
+        self._guard = threading.Lock()
+
+    def repo_jar_path(self, group_id, artifact_id, version):
+        return os.path.join(
+            self.local_repo, *group_id.split("."), artifact_id, version, f"{artifact_id}-{version}.jar"
+        )
+
+    def find_source_jar(self, artifact_id, version):
+        """
+        Sucht das JAR im DependencyIndex bzw. in MIRTH_HOME/server-lib. Ein JAR ohne
+        Versionssuffix im Dateinamen zählt nur, wenn seine Version passt (siehe _jar_version).
+        """
+        if self.index is not None and self.index.ready.is_set():
+            entry = self.index.lookup(artifact_id, version)
+            return entry.path if entry and entry.version == version else None
+        if not self.mirth_home:
+            return None
+        lib = os.path.join(self.mirth_home, "server-lib")
+        path = os.path.join(lib, f"{artifact_id}-{version}.jar")
+        if os.path.exists(path):
+            return path
+        path = os.path.join(lib, f"{artifact_id}.jar")
+        if os.path.exists(path):
+            found = self._jar_version(path, artifact_id)
+            if found == version:
+                return path
+            logger.warning(f"Skipping {path}: version {found} does not match requested {version}")
+        return None
+
+    def _jar_version(self, path, artifact_id):
+        """
+        Version aus pom.properties des JARs; ohne pom.properties die der Mirth-Installation
+        (MIRTH_VERSION), zu der server-lib gehört. None, wenn das JAR ein anderes Artefakt ist.
+        """
+        props = jar_pom_properties(path)
+        if props.get("artifactId", artifact_id) != artifact_id:
+            return None
+        return props.get("version") or self.mirth_version
 
     def check_and_install_mirth_server_api(self, version="4.5.2"):
         """
         Prüft, ob server-api im lokalen Maven-Repo vorhanden ist, oder installiert es aus MIRTH_HOME/server-lib.
-        Gibt (success: bool, message: str) zurück. Loggt alle Schritte als Rich-Panel.
+        Gibt (success: bool, message: str) zurück.
         """
-        # 1. Suche im lokalen Maven-Repository
-        m2_path = os.path.expanduser(
-            f"~/.m2/repository/com/mirth/connect/plugins/server-api/{version}/server-api-{version}.jar"
-        )
-        if os.path.exists(m2_path):
-            log_panel("[DependencyAgent] Prüfung", "server-api bereits im lokalen Maven-Repository vorhanden.", style="green")
-            return True, "server-api already installed in local Maven repo."
-
-        # 2. Suche in MIRTH_HOME/server-lib
-        if self.mirth_home:
-            jar_path = os.path.join(self.mirth_home, "server-lib", f"server-api-{version}.jar")
-            if os.path.exists(jar_path):
-                cmd = [
-                    "mvn", "install:install-file",
-                    "-DgroupId=com.mirth.connect.plugins",
-                    "-DartifactId=server-api",
-                    f"-Dversion={version}",
-                    "-Dpackaging=jar",
-                    f"-Dfile={jar_path}"
-                ]
-                log_panel("[DependencyAgent] Installation", f"Installiere {jar_path} ins Maven-Repository...", style="magenta")
-                try:
-                    subprocess.run(cmd, check=True)
-                    log_panel("[DependencyAgent] Erfolg", "server-api JAR erfolgreich installiert.", style="green")
-                    return True, "server-api JAR installed from MIRTH_HOME."
-                except Exception as e:
-                    log_panel("[DependencyAgent] Fehler", f"Fehler beim Installieren: {e}", style="red")
-                    return False, f"Fehler beim Installieren: {e}"
+        return self.resolve("com.mirth.connect.plugins", "server-api", version)
+
+    @traced
+    def check_pom(self, pom_content: str):
+        """
+        Prüft alle Abhängigkeiten eines pom.xml. Artefakte aus LOCAL_ONLY_GROUP_PREFIXES
+        müssen lokal auflösbar sein; alle anderen lädt Maven bei Bedarf selbst.
+        Gibt (success: bool, message: str) zurück.
+        """
+        with stage("dependency_check"):
+            return self._check_pom(pom_content)
+
+    def _check_pom(self, pom_content: str):
+        try:
+            deps = parse_pom_dependencies(pom_content)
+        except ValueError as e:
+            # Ungültiges XML meldet der Precheck mit Zeilennummer (backend/xml_check.py)
+            return True, f"pom.xml skipped: {e}"
+
+        messages = []
+        for dep in deps:
+            if dep["section"] != "dependencies":
+                continue
+            group_id, artifact_id, version = dep["groupId"], dep["artifactId"], dep["version"]
+            if not group_id or not artifact_id or not version or "${" in version:
+                continue
+            ok, msg = self.resolve(group_id, artifact_id, version)
+            if not ok and group_id.startswith(LOCAL_ONLY_GROUP_PREFIXES):
+                return False, msg
+            if ok:
+                messages.append(msg)
+        return True, "\n".join(messages) or "No local dependencies required."
+
+    @traced
+    def resolve(self, group_id, artifact_id, version):
+        """
+        Gemerktes Ergebnis für ein Artefakt, sonst prüfen und ggf. installieren.
+        Gibt (success: bool, message: str) zurück.
+        """
+        key = (group_id, artifact_id, version)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        with self._guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+        with lock:
+            # Ein paralleler Aufruf hat das Artefakt evtl. gerade installiert
+            cached = self._cached(key)
+            if cached is not None:
+                return cached
+            self._count("misses")
+            result = self._resolve_uncached(group_id, artifact_id, version)
+            self._results[key] = (time.monotonic(), self._mtimes(key), result)
+            return result
+
+    def _count(self, name):
+        # resolve() läuft in mehreren Worker-Threads (run_blocking)
+        with self._guard:
+            self.stats[name] += 1
+
+    def _cached(self, key):
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        checked_at, mtimes, result = entry
+        if time.monotonic() - checked_at < self.recheck_interval:
+            self._count("hits")
+            return result
+        # Fehlschläge nach Ablauf immer neu prüfen, Erfolge nur bei geänderter mtime
+        if not result[0] or self._mtimes(key) != mtimes:
+            return None
+        self._count("revalidations")
+        self._results[key] = (time.monotonic(), mtimes, result)
+        return result
+
+    def _mtimes(self, key):
+        group_id, artifact_id, version = key
+        mtimes = []
+        for path in (self.repo_jar_path(group_id, artifact_id, version), self._source_jar(group_id, artifact_id, version)):
+            try:
+                mtimes.append(os.stat(path).st_mtime if path else None)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def _source_jar(self, group_id, artifact_id, version):
+        # Nur Mirth-eigene Artefakte stammen aus server-lib; für alle anderen ist Maven zuständig
+        if not group_id.startswith(LOCAL_ONLY_GROUP_PREFIXES):
+            return None
+        return self.find_source_jar(artifact_id, version)
+
+    def _resolve_uncached(self, group_id, artifact_id, version):
+        coords = f"{group_id}:{artifact_id}:{version}"
+        # 1. Suche im lokalen Maven-Repository (veraltet, wenn das Quell-JAR neuer ist)
+        repo_jar = self.repo_jar_path(group_id, artifact_id, version)
+        source_jar = self._source_jar(group_id, artifact_id, version)
+        if os.path.exists(repo_jar) and (
+            source_jar is None or os.path.getmtime(source_jar) <= os.path.getmtime(repo_jar)
+        ):
+            log_panel("[DependencyAgent] Prüfung", f"{coords} bereits im lokalen Maven-Repository vorhanden.", style="green")
+            return True, f"{artifact_id} already installed in local Maven repo."
+        if not group_id.startswith(LOCAL_ONLY_GROUP_PREFIXES):
+            return False, f"{coords} not in local Maven repo, Maven resolves it remotely."
+
+        # 2. Installation aus MIRTH_HOME/server-lib
+        if source_jar:
+            return self._install(group_id, artifact_id, version, source_jar)
 
         # 3. Nicht gefunden – Hinweis zum Download & Installation
         msg = (
-            "server-api JAR nicht gefunden.\n"
+            f"{artifact_id} JAR nicht gefunden.\n"
             "Bitte lade es aus deiner Mirth Connect Installation (z.B. von MIRTH_HOME/server-lib/) "
             f"und installiere es manuell mit:\n\n"
-            f"mvn install:install-file -DgroupId=com.mirth.connect.plugins -DartifactId=server-api "
-            f"-Dversion={version} -Dpackaging=jar -Dfile=/pfad/zu/server-api-{version}.jar\n"
+            f"mvn install:install-file -DgroupId={group_id} -DartifactId={artifact_id} "
+            f"-Dversion={version} -Dpackaging=jar -Dfile=/pfad/zu/{artifact_id}-{version}.jar\n"
             "\n"
             "Falls du das JAR nicht findest, prüfe, ob Mirth Connect korrekt installiert ist. "
             "Gegebenenfalls musst du es beim Hersteller/Distributor anfordern."
         )
         log_panel("[DependencyAgent] Nicht gefunden", msg, style="red")
-        return False, msg
\ No newline at end of file
+        return False, msg
+
+    def _install(self, group_id, artifact_id, version, jar_path):
+        cmd = [
+            self.maven_cmd, "-B", "install:install-file",
+            f"-DgroupId={group_id}",
+            f"-DartifactId={artifact_id}",
+            f"-Dversion={version}",
+            "-Dpackaging=jar",
+            f"-Dfile={jar_path}",
+            f"-Dmaven.repo.local={self.local_repo}",
+        ]
+        log_panel("[DependencyAgent] Installation", f"Installiere {jar_path} ins Maven-Repository...", style="magenta")
+        try:
+            subprocess.run(cmd, check=True, shell=(os.name == "nt"))
+            self._count("installs")
+            log_panel("[DependencyAgent] Erfolg", f"{artifact_id} JAR erfolgreich installiert.", style="green")
+            return True, f"{artifact_id} JAR installed from MIRTH_HOME."
+        except Exception as e:
+            log_panel("[DependencyAgent] Fehler", f"Fehler beim Installieren: {e}", style="red")
+            return False, f"Fehler beim Installieren: {e}"
+
+    def get_stats(self) -> dict:
+        with self._guard:
+            return {**self.stats, "entries": len(self._results)}
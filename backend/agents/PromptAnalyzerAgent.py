@@ -1,19 +1,31 @@
 # backend/agents/PromptAnalyzerAgent.py
 
 import json
+import os
 import re
 from langchain_openai import ChatOpenAI
-# --- Rich Logging ---
-from rich.console import Console
-from rich.panel import Panel
-from rich.tree import Tree
-from rich.table import Table
-from rich.traceback import install
-install(show_locals=True)
-console = Console()
+from backend.metrics import record_llm_usage, stage
+from backend.tracing import traced
+from backend.log import get_logger
 
-def log_panel(title, content, style="cyan"):
-    console.print(Panel(content, title=title, style=style))
+logger = get_logger("PromptAnalyzerAgent")
+
+log_panel = logger.panel
+
+
+# Wörter, die nach "plugin" stehen können, aber kein Name sind ("plugin that ...")
+NAME_STOPWORDS = {
+    "that", "which", "who", "for", "to", "the", "a", "an", "with", "in", "on", "of", "and", "or",
+    "using", "from", "der", "die", "das", "für", "mit", "und", "zum", "zur", "welches",
+    "should", "will", "can", "must", "is", "as", "plugin", "plugins",
+}
+
+
+# Rollenwörter für AE-Titel im Prompt und Wörter, die nie ein AE-Titel sind
+_SERVER_AE_ROLES = r"server|remote|pacs|called"
+_CLIENT_AE_ROLES = r"client|plugin|local|calling|mirth"
+_AE_STOPWORDS = {"of", "the", "is", "for", "to", "and", "a", "an", "as", "with", "server", "client", "plugin",
+                 "remote", "local", "pacs", "title", "ae"}
 
 
 class PromptAnalyzerAgent:
@@ -22,16 +34,171 @@ class PromptAnalyzerAgent:
     für ein Mirth Connect Plugin. Antwortet robust gegen alle LLM-Formate.
     """
 
-    def __init__(self, model_name: str = "gpt-4o", temperature: float = 0.0):
-        self.llm = ChatOpenAI(model=model_name, temperature=temperature)
+    def __init__(self, model_name: str = "gpt-4o", temperature: float = 0.0, llm: ChatOpenAI | None = None,
+                 cache=None, rule_threshold: float | None = None):
+        # llm kann von der AgentRegistry geteilt übergeben werden (gemeinsamer Connection-Pool)
+        self.llm = llm or ChatOpenAI(model=model_name, temperature=temperature)
+        # Optionaler MetadataCache (backend/cache.py)
+        self.cache = cache
+        # Ab dieser Konfidenz wird das Ergebnis der lokalen Regeln ohne LLM-Call übernommen (> 1 = immer LLM)
+        if rule_threshold is None:
+            rule_threshold = float(os.getenv("ANALYZER_RULE_THRESHOLD", "0.75"))
+        self.rule_threshold = rule_threshold
 
+    @traced
     def analyze(self, prompt: str) -> dict:
         """
         Analysiere den Prompt, fordere Metadaten als reines JSON an und parse sie.
         Fallback auf Defaults, falls das LLM ungültige Antwort liefert.
         """
-        dicom_flag = bool(re.search(r"\b(dicom|c[- ]find)\b", prompt, re.IGNORECASE))
-        system_message = (
+        fast = self._rule_fast_path(prompt)
+        if fast is not None:
+            return fast
+        cache_key, cached = self._cache_lookup(prompt)
+        if cached is not None:
+            return cached
+        dicom_flag = self._detect_dicom(prompt)
+        with stage("llm.analyzer"):
+            resp = self.llm.invoke(self._create_system_message(prompt))
+            record_llm_usage("analyzer", self.llm.model_name, resp)
+        return self._cache_store(cache_key, *self._parse_response(resp, prompt, dicom_flag))
+
+    @traced
+    async def aanalyze(self, prompt: str) -> dict:
+        """
+        Async-Variante von analyze(): nutzt den nativen async-Client von ChatOpenAI,
+        damit der Event-Loop des Servers während des LLM-Calls frei bleibt.
+        """
+        fast = self._rule_fast_path(prompt)
+        if fast is not None:
+            return fast
+        cache_key, cached = self._cache_lookup(prompt)
+        if cached is not None:
+            return cached
+        dicom_flag = self._detect_dicom(prompt)
+        with stage("llm.analyzer"):
+            resp = await self.llm.ainvoke(self._create_system_message(prompt))
+            record_llm_usage("analyzer", self.llm.model_name, resp)
+        return self._cache_store(cache_key, *self._parse_response(resp, prompt, dicom_flag))
+
+    def extract_rule_based(self, prompt: str) -> tuple[dict, float, list]:
+        """
+        Lokale, deterministische Extraktion ohne LLM.
+        Gibt (metadata, confidence, missing_required_fields) zurück; metadata hat
+        dieselbe Form wie _ensure_all_fields().
+        """
+        dicom_flag = self._detect_dicom(prompt)
+        found = {}
+        missing = []
+
+        name, name_score = self._extract_plugin_name(prompt)
+        if name:
+            found["plugin_name"] = name
+            found["main_class_name"] = name
+            found["plugin_id"] = self._to_plugin_id(name)
+        else:
+            missing.append("plugin_name")
+
+        pkg = self._extract_package(prompt)
+        if pkg:
+            found["package"] = pkg
+        version = self._extract_mirth_version(prompt)
+        if version:
+            found["mirth_version"] = version
+        if dicom_flag:
+            found["dicom_enabled"] = True
+            host = self._extract_host_port(prompt)
+            if host:
+                found["dicom_host"] = host
+            else:
+                missing.append("dicom_host")
+
+        confidence = name_score
+        confidence += 0.05 if pkg else 0.0
+        confidence += 0.05 if version else 0.0
+        if dicom_flag and "dicom_host" not in found:
+            confidence *= 0.7
+        return self._ensure_all_fields(found, prompt, dicom_flag), min(confidence, 1.0), missing
+
+    def _rule_fast_path(self, prompt: str):
+        """
+        Stufe 1 des Analyzers: Regeln statt LLM, wenn sie sicher genug sind.
+        Gibt None zurück, wenn das LLM gefragt werden muss.
+        DICOM-Prompts gehen immer ans LLM: Host, Port und beide AE-Titel lassen sich
+        per Regex nicht zuverlässig den Rollen (Server/Client) zuordnen.
+        """
+        if self.rule_threshold > 1.0 or self._detect_dicom(prompt):
+            return None
+        meta, confidence, missing = self.extract_rule_based(prompt)
+        if missing or confidence < self.rule_threshold:
+            return None
+        log_panel("[PromptAnalyzerAgent] Rule-based metadata",
+                  f"Confidence {confidence:.2f} >= {self.rule_threshold:.2f}, LLM call skipped", style="green")
+        return meta
+
+    def _extract_plugin_name(self, prompt: str) -> tuple[str | None, float]:
+        """
+        Gibt (Name, Score) zurück. Explizite Angaben ("plugin named X", "XyzPlugin")
+        gelten als sicher, die alte "plugin X"-Heuristik nur als schwacher Hinweis.
+        """
+        m = re.search(r"\bplugin\s+(?:named|called|namens|mit dem namen)\s+[\"']?([A-Za-z][A-Za-z0-9_]*)",
+                      prompt, re.IGNORECASE)
+        if m:
+            return self._to_class_name(m.group(1)), 0.9
+        m = re.search(r"\b([A-Z][A-Za-z0-9]*Plugin)\b", prompt)
+        if m:
+            return m.group(1), 0.9
+        m = re.search(r"plugin\s+([A-Za-z0-9]+)", prompt, re.IGNORECASE)
+        if m and m.group(1).lower() not in NAME_STOPWORDS:
+            return m.group(1).strip().capitalize(), 0.6
+        return None, 0.0
+
+    def _extract_package(self, prompt: str) -> str | None:
+        m = re.search(r"\bpackage\s+([a-z_][\w]*(?:\.[a-z_][\w]*)+)", prompt, re.IGNORECASE)
+        if m:
+            return m.group(1)
+        m = re.search(r"\b((?:com|org|net|de|ch|io)\.[a-z_][\w]*(?:\.[a-z_][\w]*)*)\b", prompt)
+        return m.group(1) if m else None
+
+    def _extract_mirth_version(self, prompt: str) -> str | None:
+        m = re.search(r"\bmirth(?:\s+connect)?\s*(?:version\s*)?v?([0-9]+\.[0-9]+(?:\.[0-9]+)?)",
+                      prompt, re.IGNORECASE)
+        return m.group(1) if m else None
+
+    def _to_class_name(self, name: str) -> str:
+        return name[0].upper() + name[1:]
+
+    def _to_plugin_id(self, name: str) -> str:
+        # DicomAnalyzerPlugin -> dicom-analyzer-plugin
+        return re.sub(r"(?<=[a-z0-9])(?=[A-Z])", "-", name).lower().replace("_", "-")
+
+    def _cache_lookup(self, prompt: str):
+        if self.cache is None:
+            return None, None
+        key = self.cache.key(prompt, self.llm.model_name, self.llm.temperature)
+        return key, self.cache.get(key)
+
+    def _cache_store(self, key, meta: dict, from_llm: bool) -> dict:
+        # Nur echte LLM-Ergebnisse cachen, Fallback-Defaults sollen beim nächsten Mal neu versucht werden
+        if self.cache is not None and from_llm:
+            self.cache.set(key, meta)
+        return meta
+
+    def complete_metadata(self, meta: dict, prompt: str) -> dict:
+        """
+        Ergänzt extern gelieferte Metadaten (z.B. aus dem Fused-Modus des CodeAgent)
+        mit denselben Defaults und Fallbacks wie analyze().
+        """
+        return self._ensure_all_fields(meta or {}, prompt, self._detect_dicom(prompt))
+
+    def detect_dicom(self, prompt: str) -> bool:
+        return self._detect_dicom(prompt)
+
+    def _detect_dicom(self, prompt: str) -> bool:
+        return bool(re.search(r"\b(dicom|c[- ]find)\b", prompt, re.IGNORECASE))
+
+    def _create_system_message(self, prompt: str) -> str:
+        return (
             "You are an assistant that extracts metadata for a Mirth Connect plugin "
             "from a single user prompt. Respond ONLY with a valid JSON dictionary. "
             "NO markdown, NO comments, NO explanation. Use double quotes for all keys and string values.\n\n"
@@ -57,7 +224,10 @@ class PromptAnalyzerAgent:
             "Return ONLY valid JSON as above."
         )
 
-        resp = self.llm.invoke(system_message)
+    def _parse_response(self, resp, prompt: str, dicom_flag: bool) -> tuple[dict, bool]:
+        """
+        Gibt (metadata, from_llm) zurück; from_llm ist False, wenn auf Defaults zurückgefallen wurde.
+        """
         content = str(resp.content).strip()
         content = self._strip_code_fences(content)
         try:
@@ -65,9 +235,9 @@ class PromptAnalyzerAgent:
             if not isinstance(meta, dict):
                 raise ValueError("LLM response is not a dict.")
         except Exception as e:
-            print(f"[PromptAnalyzerAgent] Failed to parse LLM response: {e}")
-            return self._default_metadata(prompt, dicom_flag)
-        return self._ensure_all_fields(meta, prompt, dicom_flag)
+            logger.warning(f"Failed to parse LLM response: {e}")
+            return self._default_metadata(prompt, dicom_flag), False
+        return self._ensure_all_fields(meta, prompt, dicom_flag), True
 
     def _strip_code_fences(self, text: str) -> str:
         """
@@ -176,11 +346,24 @@ class PromptAnalyzerAgent:
         return m.group(1) if m else None
 
     def _extract_server_ae(self, prompt: str) -> str | None:
-        m = re.search(r"(?:AE[- ]Title(?: of the server)?\s*[:=]?\s*)([A-Za-z0-9_-]+)",
-                      prompt, re.IGNORECASE)
-        return m.group(1) if m else None
+        return self._extract_ae(prompt, _SERVER_AE_ROLES)
 
     def _extract_client_ae(self, prompt: str) -> str | None:
-        m = re.search(r"(?:AE[- ]Title(?: of the plugin)?\s*[:=]?\s*)([A-Za-z0-9_-]+)",
-                      prompt, re.IGNORECASE)
-        return m.group(1) if m else None
\ No newline at end of file
+        ae = self._extract_ae(prompt, _CLIENT_AE_ROLES)
+        # Derselbe Wert für beide Rollen heißt: die Rolle war nicht eindeutig
+        return ae if ae is None or ae != self._extract_server_ae(prompt) else None
+
+    def _extract_ae(self, prompt: str, roles: str) -> str | None:
+        """
+        AE-Titel nur mit ausdrücklicher Rolle ("server AE Title X", "AE Title of the server: X");
+        Füllwörter werden nie als Titel übernommen.
+        """
+        patterns = (
+            rf"\b(?:{roles})\b\s*AE[- ]?Title\s*(?:is\s*)?[:=]?\s*([A-Za-z0-9_-]+)",
+            rf"\bAE[- ]?Title\s+(?:of\s+(?:the\s+)?)?(?:{roles})\b\s*(?:is\s*)?[:=]?\s*([A-Za-z0-9_-]+)",
+        )
+        for pattern in patterns:
+            for m in re.finditer(pattern, prompt, re.IGNORECASE):
+                if m.group(1).lower() not in _AE_STOPWORDS:
+                    return m.group(1)
+        return None
\ No newline at end of file
@@ -1,14 +1,20 @@
+import asyncio
 import subprocess
 import os
+import re
+import time
 from datetime import datetime
-from rich.console import Console
-from rich.panel import Panel
-from rich.traceback import install
-install(show_locals=True)
-console = Console()
+from backend.build_executor import default_local_repo
+from backend.java_check import check_java_files
+from backend.metrics import stage
+from backend.tracing import traced
+from backend.workspace import safe_relative_path
+from backend.xml_check import check_xml_files
+from backend.log import get_logger
 
-def log_panel(title, content, style="cyan"):
-    console.print(Panel(content, title=title, style=style))
+logger = get_logger("TestingAgent")
+
+log_panel = logger.panel
 
 def _extract_first_error(logtext):
     """Extrahiere die erste relevante Fehlermeldung aus Maven-Log."""
@@ -17,16 +23,38 @@ def _extract_first_error(logtext):
             return line.strip()
     return ""
 
+# Maven-Fehlerzeilen mit Dateibezug, z.B.
+#   [ERROR] /ws/src/main/java/com/x/Foo.java:[12,5] cannot find symbol
+#   [FATAL] Non-parseable POM /ws/pom.xml: unexpected markup <!d (position: START_DOCUMENT seen <!d... @1:3)
+_MAVEN_FILE_ERROR = re.compile(
+    r"^\[(?:ERROR|FATAL)\]\s+(?:.*?\s)?(?P<file>(?:[A-Za-z]:)?[\\/][^\s:\[]+\.(?:java|xml))"
+    r"(?::\[(?P<line>\d+)(?:,\d+)?\])?:?\s*(?P<msg>.*)$",
+    re.MULTILINE,
+)
+
+# Höchstens so viele Meldungen pro Datei gehen in einen Reparatur-Prompt
+MAX_DIAGNOSTICS_PER_FILE = 20
+
 class TestingAgent:
-    def __init__(self):
-        self.current_date = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    def __init__(self, build_executor=None):
+        # Optionaler BuildExecutor (backend/build_executor.py) für warme, inkrementelle Builds
+        self.build_executor = build_executor
         self.user_login = "zurd46"
 
+    @property
+    def current_date(self) -> str:
+        # Pro Aufruf berechnet, da die Instanz über die ganze App-Laufzeit lebt
+        return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+    def _maven_cmd(self, maven_args):
+        # Dasselbe lokale Repository wie DependencyAgent und DependencyIndex
+        return ["mvn", f"-Dmaven.repo.local={default_local_repo()}"] + maven_args
+
     def run_maven(self, plugin_dir, maven_args, timeout=300, operation_name="test"):
         shell_flag = os.name == "nt"
         try:
             result = subprocess.run(
-                ["mvn"] + maven_args,
+                self._maven_cmd(maven_args),
                 cwd=plugin_dir,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
@@ -34,45 +62,90 @@ class TestingAgent:
                 timeout=timeout,
                 shell=shell_flag
             )
-            success = result.returncode == 0
-            log_panel(f"[TestingAgent] Maven {operation_name} " + ("erfolgreich" if success else "fehlgeschlagen"),
-                      f"Returncode: {result.returncode}", style="green" if success else "red")
-            preview = (result.stdout + result.stderr)[:1000]  # kombiniere für Übersicht
-            if not success:
-                log_panel("[TestingAgent] Fehlervorschau", preview, style="yellow")
-            return {
-                "success": success,
-                "returncode": result.returncode,
-                "stdout": result.stdout,
-                "stderr": result.stderr,
-                "first_error": _extract_first_error(result.stdout + "\n" + result.stderr),
-                "timestamp": self.current_date,
-                "operation": operation_name,
-                "test_report_dir": os.path.join(plugin_dir, "target", "surefire-reports")
-            }
+            return self._maven_result(plugin_dir, result.returncode, result.stdout, result.stderr, operation_name)
         except subprocess.TimeoutExpired:
-            error_msg = f"Maven-{operation_name} hat das Timeout überschritten."
-            log_panel("[TestingAgent] Timeout", error_msg, style="red")
-            return {
-                "success": False,
-                "error": error_msg,
-                "timeout": True,
-                "timestamp": self.current_date,
-                "operation": operation_name
-            }
+            return self._maven_timeout(operation_name)
         except Exception as e:
-            error_msg = f"Unerwarteter Fehler bei Maven-{operation_name}: {str(e)}"
-            log_panel("[TestingAgent] Unerwarteter Fehler", error_msg, style="red")
-            return {
-                "success": False,
-                "error": error_msg,
-                "timestamp": self.current_date,
-                "operation": operation_name
-            }
+            return self._maven_error(operation_name, e)
 
-    def run_tests(self, plugin_dir: str) -> dict:
+    async def arun_maven(self, plugin_dir, maven_args, timeout=300, operation_name="test"):
         """
-        Führt `mvn clean test` im angegebenen Verzeichnis aus.
+        Async-Variante von run_maven(): Maven läuft als asyncio-Subprozess,
+        der Event-Loop wartet nicht blockierend auf das Ende des Builds.
+        """
+        try:
+            if os.name == "nt":
+                # mvn ist unter Windows ein .cmd-Skript und braucht die Shell
+                proc = await asyncio.create_subprocess_shell(
+                    subprocess.list2cmdline(self._maven_cmd(maven_args)),
+                    cwd=plugin_dir,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE
+                )
+            else:
+                proc = await asyncio.create_subprocess_exec(
+                    *self._maven_cmd(maven_args),
+                    cwd=plugin_dir,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE
+                )
+            try:
+                stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                return self._maven_timeout(operation_name)
+            return self._maven_result(
+                plugin_dir, proc.returncode,
+                stdout.decode("utf-8", errors="replace"),
+                stderr.decode("utf-8", errors="replace"),
+                operation_name
+            )
+        except Exception as e:
+            return self._maven_error(operation_name, e)
+
+    def _maven_result(self, plugin_dir, returncode, stdout, stderr, operation_name):
+        success = returncode == 0
+        log_panel(f"[TestingAgent] Maven {operation_name} " + ("erfolgreich" if success else "fehlgeschlagen"),
+                  f"Returncode: {returncode}", style="green" if success else "red")
+        preview = (stdout + stderr)[:1000]  # kombiniere für Übersicht
+        if not success:
+            log_panel("[TestingAgent] Fehlervorschau", preview, style="yellow")
+        return {
+            "success": success,
+            "returncode": returncode,
+            "stdout": stdout,
+            "stderr": stderr,
+            "first_error": _extract_first_error(stdout + "\n" + stderr),
+            "timestamp": self.current_date,
+            "operation": operation_name,
+            "test_report_dir": os.path.join(plugin_dir, "target", "surefire-reports")
+        }
+
+    def _maven_timeout(self, operation_name):
+        error_msg = f"Maven-{operation_name} hat das Timeout überschritten."
+        log_panel("[TestingAgent] Timeout", error_msg, style="red")
+        return {
+            "success": False,
+            "error": error_msg,
+            "timeout": True,
+            "timestamp": self.current_date,
+            "operation": operation_name
+        }
+
+    def _maven_error(self, operation_name, e):
+        error_msg = f"Unerwarteter Fehler bei Maven-{operation_name}: {str(e)}"
+        log_panel("[TestingAgent] Unerwarteter Fehler", error_msg, style="red")
+        return {
+            "success": False,
+            "error": error_msg,
+            "timestamp": self.current_date,
+            "operation": operation_name
+        }
+
+    def _check_plugin_dir(self, plugin_dir):
+        """
+        Prüft das Plugin-Verzeichnis. Gibt ein Fehler-Dict zurück oder None, wenn alles passt.
         """
         if not plugin_dir or not isinstance(plugin_dir, str):
             error_msg = "Plugin-Verzeichnis ist ungültig oder leer."
@@ -88,10 +161,131 @@ class TestingAgent:
             error_msg = f"Keine pom.xml im Verzeichnis '{plugin_dir}' gefunden."
             log_panel("[TestingAgent] Maven-Projekt ungültig", error_msg, style="red")
             return {"success": False, "error": error_msg, "timestamp": self.current_date}
+        return None
+
+    @traced
+    def precheck(self, files: list, index=None):
+        """
+        Strukturprüfung der generierten Java-Dateien (backend/java_check.py) sowie von
+        pom.xml/plugin.xml (backend/xml_check.py) in Millisekunden.
+        Gibt bei Problemen ein Fehler-Dict im Format der Maven-Ergebnisse zurück
+        (Maven muss dann nicht laufen), sonst None.
+        """
+        start = time.perf_counter()
+        with stage("precheck"):
+            issues = check_xml_files(files, index) + check_java_files(files, index)
+        elapsed = time.perf_counter() - start
+        if not issues:
+            return None
+        lines = [f"{i['path']}:{i['line']}: {i['message']}" for i in issues]
+        log_panel("[TestingAgent] Precheck fehlgeschlagen", "\n".join(lines[:20]), style="red")
+        return {
+            "success": False,
+            "error": f"{len(issues)} structural problems found, Maven was skipped.",
+            "first_error": lines[0],
+            "issues": issues,
+            "timestamp": self.current_date,
+            "operation": "precheck",
+            "timings": {"precheck": round(elapsed, 4)},
+        }
+
+    @traced
+    def diagnostics_by_file(self, test_result: dict, plugin_dir: str, files: list) -> dict:
+        """
+        Ordnet die Fehler eines fehlgeschlagenen Precheck- oder Maven-Laufs den generierten
+        Dateien zu: {pfad wie in files: ["line 12: cannot find symbol", ...]}.
+        Maven-Pfade sind absolut und werden über den Workspace auf files abgebildet;
+        Meldungen ohne zuordenbare Datei (z.B. Testfehler, Netzwerk) fallen weg.
+        """
+        by_rel = {}
+        for file in files:
+            try:
+                by_rel[safe_relative_path(file["path"])] = file["path"]
+            except ValueError:
+                continue
+
+        diagnostics = {}
+
+        def add(path, line, message):
+            entries = diagnostics.setdefault(path, [])
+            entry = f"line {line}: {message}" if line else message
+            if entry not in entries and len(entries) < MAX_DIAGNOSTICS_PER_FILE:
+                entries.append(entry)
+
+        for issue in test_result.get("issues") or []:
+            try:
+                path = by_rel.get(safe_relative_path(issue["path"]))
+            except ValueError:
+                path = None
+            if path is not None:
+                add(path, issue.get("line"), issue["message"])
+
+        output = (test_result.get("stdout") or "") + "\n" + (test_result.get("stderr") or "")
+        root = os.path.normpath(plugin_dir) if plugin_dir else None
+        for m in _MAVEN_FILE_ERROR.finditer(output):
+            if root is None:
+                break
+            file_path = os.path.normpath(m.group("file"))
+            if not file_path.startswith(root + os.sep):
+                continue
+            path = by_rel.get(os.path.relpath(file_path, root).replace(os.sep, "/"))
+            if path is not None:
+                add(path, m.group("line"), m.group("msg").strip())
+        return diagnostics
+
+    @traced
+    def run_tests(self, plugin_dir: str) -> dict:
+        """
+        Führt `mvn clean test` im angegebenen Verzeichnis aus.
+        """
+        error = self._check_plugin_dir(plugin_dir)
+        if error:
+            return error
+        plugin_dir = os.path.normpath(plugin_dir)
 
         log_panel("[TestingAgent] Maven-Tests starten", f"Verzeichnis: {plugin_dir}", style="magenta")
-        return self.run_maven(plugin_dir, ["clean", "test", "-q"], timeout=300, operation_name="test")
+        with stage("maven"):
+            return self.run_maven(plugin_dir, ["clean", "test", "-q"], timeout=300, operation_name="test")
+
+    @traced
+    async def arun_tests(self, plugin_dir: str) -> dict:
+        """
+        Async-Variante von run_tests().
+        """
+        error = self._check_plugin_dir(plugin_dir)
+        if error:
+            return error
+        plugin_dir = os.path.normpath(plugin_dir)
+
+        log_panel("[TestingAgent] Maven-Tests starten", f"Verzeichnis: {plugin_dir}", style="magenta")
+        with stage("maven"):
+            if self.build_executor is not None:
+                return await self.arun_build(plugin_dir, ["test", "-q"], timeout=300, operation_name="test")
+            return await self.arun_maven(plugin_dir, ["clean", "test", "-q"], timeout=300, operation_name="test")
+
+    @traced
+    async def arun_build(self, plugin_dir, goals, timeout=300, operation_name="test", force_clean=False):
+        """
+        Baut über den BuildExecutor (clean nur bei Bedarf) und ergänzt das übliche
+        Ergebnis-Dict um goals, incremental und timings.
+        """
+        try:
+            build = await self.build_executor.run(plugin_dir, goals, timeout=timeout, force_clean=force_clean)
+        except Exception as e:
+            return self._maven_error(operation_name, e)
+        if build["timeout"]:
+            result = self._maven_timeout(operation_name)
+        else:
+            result = self._maven_result(plugin_dir, build["returncode"], build["stdout"], build["stderr"], operation_name)
+        result.update({
+            "goals": build["goals"],
+            "incremental": build["incremental"],
+            "plan_reason": build["plan_reason"],
+            "timings": build["timings"],
+        })
+        return result
 
+    @traced
     def run_compile_only(self, plugin_dir: str) -> dict:
         """
         Führt nur 'mvn clean compile' im angegebenen Verzeichnis aus.
@@ -109,4 +303,5 @@ class TestingAgent:
             return {"success": False, "error": f"Keine pom.xml im Verzeichnis '{plugin_dir}' gefunden.", "timestamp": self.current_date}
 
         log_panel("[TestingAgent] Maven-Compile startet", f"Verzeichnis: {plugin_dir}", style="magenta")
-        return self.run_maven(plugin_dir, ["clean", "compile", "-q"], timeout=120, operation_name="compile")
\ No newline at end of file
+        with stage("maven"):
+            return self.run_maven(plugin_dir, ["clean", "compile", "-q"], timeout=120, operation_name="compile")
\ No newline at end of file
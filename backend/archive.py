@@ -0,0 +1,91 @@
+# backend/archive.py
+
+import io
+import tarfile
+import time
+import zipfile
+
+from backend.file_writer import encode_file
+from backend.workspace import GENERATED_PREFIX, safe_relative_path
+
+MEDIA_TYPES = {
+    "zip": "application/zip",
+    "tar.gz": "application/gzip",
+}
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Nicht-seekbares Ziel für zipfile/tarfile: sammelt nur die Bytes seit dem
+    letzten drain(), damit nie das ganze Archiv im Speicher liegt.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _entries(files: list):
+    for file in files:
+        yield GENERATED_PREFIX + safe_relative_path(file.get("path", "")), encode_file(file)
+
+
+def stream_zip(files: list):
+    """
+    Erzeugt ein ZIP der generierten Dateien stückweise (ein Chunk pro Datei),
+    direkt aus der Dateiliste im Speicher.
+    """
+    sink = _ChunkSink()
+    now = time.localtime()[:6]
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, data in _entries(files):
+            info = zipfile.ZipInfo(name, date_time=now)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            zf.writestr(info, data)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def stream_tar_gz(files: list):
+    """
+    Wie stream_zip, aber als gzip-komprimiertes tar im Stream-Modus ("w|gz").
+    """
+    sink = _ChunkSink()
+    now = time.time()
+    with tarfile.open(fileobj=sink, mode="w|gz") as tf:
+        for name, data in _entries(files):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = now
+            info.mode = 0o644
+            tf.addfile(info, io.BytesIO(data))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    yield sink.drain()
+
+
+def stream_archive(files: list, archive_format: str):
+    """
+    Liefert einen Generator über die Archiv-Chunks. Unsichere Pfade werden hier
+    vorab abgelehnt (ValueError), bevor die Response begonnen hat.
+    """
+    for file in files:
+        safe_relative_path(file.get("path", ""))
+    if archive_format == "zip":
+        return stream_zip(files)
+    if archive_format == "tar.gz":
+        return stream_tar_gz(files)
+    raise ValueError(f"Unsupported archive format: {archive_format}")
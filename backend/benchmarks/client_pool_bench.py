@@ -0,0 +1,58 @@
+# backend/benchmarks/client_pool_bench.py
+#
+# Vergleicht pro Request neu gebaute Agents (eigener ChatOpenAI-Client, eigener
+# Connection-Pool) mit den langlebigen Agents aus der AgentRegistry.
+# Läuft komplett lokal gegen StubOpenAIServer.
+#
+# Aufruf:
+#   python -m backend.benchmarks.client_pool_bench -n 50
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from backend.benchmarks.stub_llm import StubOpenAIServer
+
+METADATA = json.dumps({"plugin_name": "BenchPlugin", "main_class_name": "BenchPlugin", "package": "com.example"})
+
+
+async def _run_fresh(n: int, prompt: str) -> float:
+    from backend.agents.PromptAnalyzerAgent import PromptAnalyzerAgent
+    start = time.perf_counter()
+    for _ in range(n):
+        # Verhalten vor der Registry: neuer Agent = neuer Client = neue Verbindung
+        await PromptAnalyzerAgent().aanalyze(prompt)
+    return time.perf_counter() - start
+
+
+async def _run_shared(n: int, prompt: str) -> float:
+    from backend.registry import AgentRegistry
+    registry = AgentRegistry()
+    await registry.warm_up()
+    start = time.perf_counter()
+    for _ in range(n):
+        await registry.analyzer.aanalyze(prompt)
+    elapsed = time.perf_counter() - start
+    await registry.aclose()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request vs. shared LLM client benchmark")
+    parser.add_argument("-n", "--requests", type=int, default=50)
+    parser.add_argument("--prompt", default="Create a plugin BenchPlugin")
+    args = parser.parse_args()
+
+    for label, runner in (("fresh agents per request", _run_fresh), ("shared AgentRegistry", _run_shared)):
+        with StubOpenAIServer(responder=lambda request: METADATA) as stub:
+            os.environ["OPENAI_BASE_URL"] = stub.base_url
+            os.environ.setdefault("OPENAI_API_KEY", "sk-stub")
+            elapsed = asyncio.run(runner(args.requests, args.prompt))
+            print(f"{label:28s} {elapsed:8.3f}s total  {elapsed / args.requests * 1000:8.2f} ms/request  "
+                  f"{stub.connections:4d} TCP connections for {stub.requests} LLM calls")
+
+
+if __name__ == "__main__":
+    main()
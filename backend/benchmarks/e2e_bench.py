@@ -0,0 +1,245 @@
+# backend/benchmarks/e2e_bench.py
+#
+# Offline-End-to-End-Benchmark für POST /generate: startet den Server als eigenen
+# Prozess gegen StubOpenAIServer (ReplayResponder, konfigurierbare Latenz und
+# Streaming) und fake_mvn (konfigurierbare Dauer und Exit-Codes) und treibt ihn mit
+# mehreren Concurrency-Stufen. Pro Stufe: Durchsatz, Client-Latenz, p50/p95/p99 pro
+# Stage aus dem timings-Block der Antworten und der Speicher-Höchststand (VmHWM)
+# des Servers. Für jede Stufe läuft ein frischer Server, damit VmHWM vergleichbar bleibt.
+#
+# Aufruf:
+#   python -m backend.benchmarks.e2e_bench [--concurrency 1,4,16] [--mode two_step] [--stream]
+#       [--latency 0.5] [--mvn-seconds 0.5] [--recording aufzeichnung.json] [--json report.json]
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from backend.benchmarks.fake_mvn import install_fake_maven
+from backend.benchmarks.stub_llm import ReplayResponder, StubOpenAIServer, synthetic_project, synthetic_recording
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(values: list, q: float) -> float:
+    # Nearest-Rank, ausreichend für Benchmark-Berichte
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def memory_high_water(pid: int):
+    """
+    Höchster RSS des Prozesses in Bytes (VmHWM aus /proc, nur Linux), sonst None.
+    """
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class BenchServer:
+    """
+    uvicorn mit backend.agent_server:app in einem Unterprozess, Arbeitsverzeichnis und
+    Caches in workdir.
+    """
+
+    def __init__(self, workdir: str, env: dict):
+        self.workdir = workdir
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.env = {**os.environ, **env, "PYTHONPATH": REPO_ROOT}
+        self.log_path = os.path.join(workdir, "server.log")
+        self.proc = None
+
+    def __enter__(self):
+        self._log = open(self.log_path, "ab")
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.agent_server:app", "--port", str(self.port),
+             "--log-level", "warning"],
+            cwd=self.workdir, env=self.env, stdout=self._log, stderr=subprocess.STDOUT,
+        )
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"Server exited with {self.proc.returncode}, see {self.log_path}")
+            try:
+                if httpx.get(f"{self.url}/metrics", timeout=1.0).status_code == 200:
+                    return self
+            except httpx.HTTPError:
+                time.sleep(0.2)
+        raise RuntimeError(f"Server did not start within 60s, see {self.log_path}")
+
+    def __exit__(self, *exc):
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+        self._log.close()
+
+
+async def drive(url: str, total: int, concurrency: int, payload: dict, timeout: float) -> tuple[list, float]:
+    """
+    Schickt total Requests, höchstens concurrency gleichzeitig. Gibt (ergebnisse, wall) zurück,
+    ergebnisse als Liste von {"status", "seconds", "timings", "build_ok"}.
+    """
+    slots = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async def one(client, i):
+        async with slots:
+            # Eindeutiger Prompt, damit kein Cache (Analyzer, Generierung) greift
+            body = {**payload, "prompt": f"{payload['prompt']} (request {i})"}
+            start = time.perf_counter()
+            try:
+                resp = await client.post(f"{url}/generate", json=body)
+                status, data = resp.status_code, resp.json()
+            except (httpx.HTTPError, ValueError) as e:
+                status, data = 0, {"error": str(e)}
+            return {"status": status, "seconds": time.perf_counter() - start, "timings": data.get("timings") or {},
+                    "build_ok": bool((data.get("test_result") or {}).get("success"))}
+
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        results = await asyncio.gather(*[one(client, i) for i in range(total)])
+        return results, time.perf_counter() - start
+
+
+def summarize(concurrency: int, results: list, wall: float, memory) -> dict:
+    ok = [r for r in results if r["status"] == 200]
+    stages = {}
+    for r in ok:
+        for name, seconds in r["timings"].get("stages", {}).items():
+            stages.setdefault(name, []).append(seconds)
+        if "total" in r["timings"]:
+            stages.setdefault("server.total", []).append(r["timings"]["total"])
+
+    def quantiles(values):
+        return {"n": len(values), **{f"p{q}": round(percentile(values, q), 4) for q in (50, 95, 99)}}
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "build_failures": sum(1 for r in ok if not r["build_ok"]),
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(ok) / wall, 3) if wall else 0.0,
+        "latency": quantiles([r["seconds"] for r in ok]),
+        "stages": {name: quantiles(values) for name, values in sorted(stages.items())},
+        "memory_high_water_bytes": memory,
+    }
+
+
+def run_level(args, recording: dict, concurrency: int) -> dict:
+    total = args.requests or max(8, concurrency * 4)
+    responder = ReplayResponder(recording)
+    stub = StubOpenAIServer(responder=responder, latency=args.latency, jitter=args.jitter,
+                            chunk_size=args.chunk_size, chunk_delay=args.chunk_delay)
+    with stub, tempfile.TemporaryDirectory(prefix="e2e-bench-") as workdir:
+        env = {
+            "OPENAI_BASE_URL": stub.base_url,
+            "OPENAI_API_KEY": "sk-bench",
+            "MAVEN_CMD": install_fake_maven(workdir),
+            "MAVEN_LOCAL_REPO": os.path.join(workdir, "m2"),
+            "FAKE_MVN_SECONDS": str(args.mvn_seconds),
+            "FAKE_MVN_EXIT_CODE": str(args.mvn_exit_code),
+            "FAKE_MVN_FAIL_RATE": str(args.mvn_fail_rate),
+            "MIRTH_AI_CACHE_DIR": os.path.join(workdir, "cache"),
+            "LLM_WARMUP": "0",
+            "LOG_FORMAT": "json",
+            "LOG_LEVEL": args.log_level,
+        }
+        with BenchServer(workdir, env) as server:
+            payload = {"prompt": args.prompt, "mode": args.mode, "stream": args.stream,
+                       "use_cache": False, "repair": args.repair}
+            results, wall = asyncio.run(drive(server.url, total, concurrency, payload, args.timeout))
+            memory = memory_high_water(server.proc.pid)
+    report = summarize(concurrency, results, wall, memory)
+    report["llm_calls"] = dict(responder.calls)
+    return report
+
+
+def print_report(report: dict):
+    memory = report["memory_high_water_bytes"]
+    memory_text = f"{memory / 2**20:.1f} MiB" if memory else "n/a"
+    latency = report["latency"]
+    print(f"\nconcurrency {report['concurrency']}: {report['requests']} requests, {report['errors']} errors, "
+          f"{report['build_failures']} failed builds, "
+          f"{report['throughput_rps']:.2f} req/s, wall {report['wall_seconds']:.2f}s, "
+          f"server RSS high-water {memory_text}")
+    print(f"  LLM calls: {report['llm_calls']}")
+    print(f"  {'stage':<24} {'n':>5} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    rows = [("client.latency", latency)] + list(report["stages"].items())
+    for name, q in rows:
+        print(f"  {name:<24} {q['n']:>5} {q['p50'] * 1000:>10.1f} {q['p95'] * 1000:>10.1f} {q['p99'] * 1000:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark for /generate")
+    parser.add_argument("--concurrency", default="1,4,16", help="kommagetrennte Concurrency-Stufen")
+    parser.add_argument("-n", "--requests", type=int, default=0, help="Requests pro Stufe (Default max(8, 4*c))")
+    parser.add_argument("--mode", default="two_step", choices=["two_step", "fused", "parallel", "scaffold"])
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--no-repair", dest="repair", action="store_false")
+    parser.add_argument("--prompt", default="Create a plugin that forwards HL7 messages to a REST endpoint")
+    parser.add_argument("--latency", type=float, default=0.5, help="LLM-Latenz pro Call in Sekunden")
+    parser.add_argument("--jitter", type=float, default=0.0, help="± Sekunden auf die LLM-Latenz")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Zeichen pro Streaming-Chunk")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Sekunden zwischen Streaming-Chunks")
+    parser.add_argument("--recording", help="JSON-Aufzeichnung für ReplayResponder (Default: synthetisch)")
+    parser.add_argument("--save-recording", help="synthetische Aufzeichnung als Vorlage speichern und beenden")
+    parser.add_argument("--java-files", type=int, default=8)
+    parser.add_argument("--java-lines", type=int, default=120)
+    parser.add_argument("--binary-bytes", type=int, default=0, help="Größe einer base64-kodierten Binärdatei")
+    parser.add_argument("--mvn-seconds", type=float, default=0.5)
+    parser.add_argument("--mvn-exit-code", type=int, default=0)
+    parser.add_argument("--mvn-fail-rate", type=float, default=0.0)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--json", help="Bericht zusätzlich als JSON speichern")
+    args = parser.parse_args()
+
+    if args.recording:
+        with open(args.recording, encoding="utf-8") as f:
+            recording = json.load(f)
+    else:
+        recording = synthetic_recording(synthetic_project(args.java_files, args.java_lines, args.binary_bytes))
+    if args.save_recording:
+        with open(args.save_recording, "w", encoding="utf-8") as f:
+            json.dump(recording, f, indent=2)
+        print(f"Recording written to {args.save_recording}")
+        return
+
+    reports = []
+    for concurrency in [int(c) for c in args.concurrency.split(",") if c.strip()]:
+        report = run_level(args, recording, concurrency)
+        print_report(report)
+        reports.append(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "levels": reports}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# backend/benchmarks/fake_mvn.py
+#
+# Stand-in für mvn/mvnd in Benchmarks: wartet eine konfigurierbare Zeit, legt target/
+# an (damit BuildExecutor inkrementell weiterbauen kann) und endet mit dem gewünschten
+# Exit-Code. Wird über ein von install_fake_maven() erzeugtes Wrapper-Skript als
+# MAVEN_CMD eingebunden; importiert bewusst nichts aus backend (schneller Start).
+#
+# Konfiguration über Umgebungsvariablen:
+#   FAKE_MVN_SECONDS    Dauer eines Builds in Sekunden (Default 0.5)
+#   FAKE_MVN_EXIT_CODE  Exit-Code (Default 0)
+#   FAKE_MVN_FAIL_RATE  Anteil zufällig fehlschlagender Builds (Exit-Code 1, Default 0)
+#   FAKE_MVN_LOG        Datei, an die jeder Aufruf (Verzeichnis, Argumente) angehängt wird
+
+import os
+import random
+import stat
+import sys
+import time
+
+
+def main(argv: list) -> int:
+    seconds = float(os.getenv("FAKE_MVN_SECONDS", "0.5"))
+    exit_code = int(os.getenv("FAKE_MVN_EXIT_CODE", "0"))
+    if random.random() < float(os.getenv("FAKE_MVN_FAIL_RATE", "0")):
+        exit_code = 1
+    if os.getenv("FAKE_MVN_LOG"):
+        with open(os.environ["FAKE_MVN_LOG"], "a", encoding="utf-8") as f:
+            f.write(f"{os.getcwd()} {' '.join(argv)}\n")
+    time.sleep(seconds)
+    if "install:install-file" in argv:
+        return exit_code
+    os.makedirs("target/classes", exist_ok=True)
+    if exit_code:
+        print("[ERROR] BUILD FAILURE (fake mvn)")
+        print(f"[ERROR] Failed to execute goal on project bench-plugin: exit code {exit_code}")
+    else:
+        print("[INFO] BUILD SUCCESS (fake mvn)")
+    return exit_code
+
+
+def install_fake_maven(directory: str) -> str:
+    """
+    Schreibt ein ausführbares mvn-Skript nach directory und gibt den Pfad zurück
+    (für MAVEN_CMD).
+    """
+    path = os.path.join(directory, "mvn")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.abspath(__file__)}" "$@"\n')
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
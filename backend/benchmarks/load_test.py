@@ -0,0 +1,69 @@
+# backend/benchmarks/load_test.py
+#
+# Schickt N gleichzeitige Requests an einen laufenden Backend-Server und
+# vergleicht die Gesamtdauer mit der Summe und dem Maximum der Einzeldauern.
+# Blockiert der Server nicht, liegt die Gesamtdauer nahe am langsamsten
+# Request; blockiert er, nähert sie sich der Summe aller Requests.
+#
+# Aufruf:
+#   python -m backend.benchmarks.load_test --url http://127.0.0.1:8000/generate -n 4
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+
+async def _timed_request(client, url, payload, idx):
+    start = time.perf_counter()
+    resp = await client.post(url, json=payload)
+    elapsed = time.perf_counter() - start
+    return idx, resp.status_code, elapsed
+
+
+async def run_load_test(url: str, concurrency: int, prompt: str, timeout: float) -> dict:
+    payload = {"prompt": prompt}
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        start = time.perf_counter()
+        results = await asyncio.gather(*[
+            _timed_request(client, url, payload, i) for i in range(concurrency)
+        ])
+        wall = time.perf_counter() - start
+
+    durations = [r[2] for r in results]
+    return {
+        "concurrency": concurrency,
+        "wall_seconds": wall,
+        "slowest_seconds": max(durations),
+        "sum_seconds": sum(durations),
+        # ~1.0 = parallel, ~concurrency = serialisiert
+        "serialization_factor": wall / max(durations) if durations else 0.0,
+        "requests": [
+            {"idx": idx, "status": status, "seconds": round(elapsed, 3)}
+            for idx, status, elapsed in results
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test for /generate")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/generate")
+    parser.add_argument("-n", "--concurrency", type=int, default=4)
+    parser.add_argument("--prompt", default="Create a plugin HelloWorld that logs every message")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load_test(args.url, args.concurrency, args.prompt, args.timeout))
+    for r in report["requests"]:
+        print(f"Request {r['idx']}: HTTP {r['status']} in {r['seconds']:.3f}s")
+    print(f"Concurrency:          {report['concurrency']}")
+    print(f"Wall time:            {report['wall_seconds']:.3f}s")
+    print(f"Slowest request:      {report['slowest_seconds']:.3f}s")
+    print(f"Sum of requests:      {report['sum_seconds']:.3f}s")
+    print(f"Serialization factor: {report['serialization_factor']:.2f} "
+          f"(1.0 = fully concurrent, {report['concurrency']}.0 = fully serialized)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# backend/benchmarks/logging_bench.py
+#
+# Logging-Overhead pro Request im Request-Pfad: die bisherige synchrone rich-Ausgabe
+# (Panels, Tree, Testergebnis als String) gegen den Queue-Logger aus backend/log.py
+# im JSON- und im Dev-Modus. Gemessen wird die Zeit im aufrufenden Thread; die
+# Ausgabe geht nach /dev/null, die Terminal-Kosten selbst sind also noch nicht enthalten.
+#
+# Aufruf:
+#   python -m backend.benchmarks.logging_bench [-n 200] [--files 20] [--with-error]
+
+import argparse
+import logging
+import os
+import time
+
+from rich.console import Console
+from rich.panel import Panel
+from rich.tree import Tree
+
+from backend import log
+
+PREVIEW = "x" * 1000
+MAVEN_STDOUT = "[INFO] Compiling 20 source files\n" * 400
+
+
+def _files(n: int) -> list:
+    return [{"path": f"GENERATED_PLUGIN/src/main/java/com/example/Class{i}.java", "content": "x" * 2000} for i in range(n)]
+
+
+def _request_events(files: list):
+    """
+    Die Log-Aufrufe eines typischen /generate-Requests: (art, titel, inhalt, style).
+    """
+    test_result = {"success": True, "returncode": 0, "stdout": MAVEN_STDOUT, "stderr": "", "first_error": ""}
+    return [
+        ("panel", "Receive prompt", "Create a plugin that forwards HL7 messages", "yellow"),
+        ("panel", "Extracted metadata", str({"plugin_name": "BenchPlugin", "package": "com.example"}), "green"),
+        ("panel", "[CodeAgent] Sending request to LLM", "Model: gpt-4o, Temperature: 0.0", "cyan"),
+        ("panel", "[CodeAgent] Raw LLM response received", "Length: 48000 characters", "debug"),
+        ("panel", "[CodeAgent] LLM Response Preview", PREVIEW, "debug"),
+        ("panel", "[CodeAgent] Files successfully generated", f"Count: {len(files)}", "cyan"),
+        ("tree", "[CodeAgent] File Tree", files, None),
+        ("panel", "Files generated", f"{len(files)} Files created.", "blue"),
+        ("tree", "GENERATED_PLUGIN", files, None),
+        ("panel", "DependencyAgent", "No local dependencies required.", "green"),
+        ("panel", "Files saved", f"{len(files)} written", "white"),
+        ("panel", "[TestingAgent] Maven-Tests starten", "Verzeichnis: /tmp/ws", "magenta"),
+        ("panel", "[TestingAgent] Maven test erfolgreich", "Returncode: 0", "green"),
+        ("result", "Testing results", test_result, "magenta"),
+    ]
+
+
+def old_request(console: Console, events, with_error: bool):
+    # Verhalten vor backend/log.py: alles wird sofort im Request gerendert
+    for kind, title, content, style in events:
+        if kind == "tree":
+            tree = Tree(title)
+            for f in content:
+                tree.add(f"[green]{f['path']}[/green]  [dim]{len(f['content'].encode('utf-8'))} bytes[/dim]")
+            console.print(tree)
+        else:
+            text = str(content) if kind == "result" else content
+            console.print(Panel(text, title=title, style="yellow" if style == "debug" else style))
+    if with_error:
+        try:
+            {}["missing"]
+        except KeyError:
+            console.print_exception(show_locals=True)
+
+
+def new_request(logger, events, with_error: bool):
+    for kind, title, content, style in events:
+        if kind == "tree":
+            logger.tree(title, (f"{f['path']}  {len(f['content'].encode('utf-8'))} bytes" for f in content))
+        elif kind == "result":
+            logger.event(title, success=content["success"], first_error=content["first_error"])
+            logger.panel(title, lambda: str(content), style=style, level=logging.DEBUG)
+        elif style == "debug":
+            logger.panel(title, content, level=logging.DEBUG)
+        else:
+            logger.panel(title, content, style=style)
+    if with_error:
+        try:
+            {}["missing"]
+        except KeyError:
+            logger.exception("Error during generation")
+
+
+def measure(func, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        func()
+    return (time.perf_counter() - start) / n
+
+
+def run_benchmark(n: int, n_files: int, with_error: bool) -> list:
+    events = _request_events(_files(n_files))
+    rows = []
+    with open(os.devnull, "w") as devnull:
+        console = Console(file=devnull, force_terminal=True, width=100)
+        rows.append(("old: rich, synchronous", measure(lambda: old_request(console, events, with_error), n), None))
+
+        for log_format in ("json", "dev"):
+            os.environ["LOG_FORMAT"] = log_format
+            os.environ.pop("LOG_LEVEL", None)
+            config = log.setup_logging(force=True, stream=devnull)
+            logger = log.get_logger("bench")
+            hot = measure(lambda: new_request(logger, events, with_error), n)
+            start = time.perf_counter()
+            log.shutdown_logging()  # wartet, bis der Listener die Queue geleert hat
+            drain = time.perf_counter() - start
+            rows.append((f"new: {log_format} (level {config['level']})", hot, drain))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logging overhead per request")
+    parser.add_argument("-n", type=int, default=200, help="Anzahl simulierter Requests")
+    parser.add_argument("--files", type=int, default=20, help="Dateien pro Request (für die Trees)")
+    parser.add_argument("--with-error", action="store_true", help="pro Request eine Exception loggen")
+    args = parser.parse_args()
+
+    rows = run_benchmark(args.n, args.files, args.with_error)
+    baseline = rows[0][1]
+    print(f"{'variant':<28} {'hot path/request':>18} {'speedup':>8} {'background drain':>17}")
+    for name, hot, drain in rows:
+        drain_text = f"{drain * 1000:.1f} ms" if drain is not None else "-"
+        print(f"{name:<28} {hot * 1e6:>15.0f} us {baseline / hot:>7.1f}x {drain_text:>17}")
+
+
+if __name__ == "__main__":
+    main()
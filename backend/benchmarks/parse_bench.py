@@ -0,0 +1,126 @@
+# backend/benchmarks/parse_bench.py
+#
+# Micro-Benchmarks für die CPU-Arbeit nach dem LLM-Call auf großen synthetischen
+# Antworten (backend.benchmarks.stub_llm.synthetic_project):
+#   - Array-Extraktion                 bisheriger Weg (Fence-Regex, Zeichen-Schleife, json.loads)
+#                                      gegen json_extract.extract_json_array (raw_decode), auch
+#                                      für eine abgeschnittene Antwort
+#   - clean_forbidden_code             verbotene DICOM-Bezeichner aus allen Java-Dateien entfernen
+#   - CodeAgent._process_binary_files  base64-Binärdateien dekodieren
+# Ausgabe: bester Lauf pro Funktion und Durchsatz in MB/s.
+#
+# Aufruf:
+#   python -m backend.benchmarks.parse_bench [--java-files 200] [--java-lines 200] [--binary-bytes 2000000]
+
+import argparse
+import json
+import os
+import re
+import time
+
+from backend.benchmarks.stub_llm import synthetic_project
+
+
+def timed(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def old_strip_code_fences(text: str) -> str:
+    # Vorheriges Verfahren aus CodeAgent._parse_llm_response: Fences, Zeichen-Schleife, json.loads
+    text = text.strip()
+    match = re.search(r"^```(?:json)?\s*\n(.*?)\n```$", text, flags=re.DOTALL)
+    return match.group(1).strip() if match else text
+
+
+def old_extract_json_array(text: str) -> str:
+    text = text.strip()
+    start_idx = text.find('[')
+    if start_idx == -1:
+        return text
+    bracket_count = 0
+    in_string = False
+    escape_next = False
+    for i in range(start_idx, len(text)):
+        char = text[i]
+        if escape_next:
+            escape_next = False
+            continue
+        if char == '\\':
+            escape_next = True
+            continue
+        if char == '"' and not escape_next:
+            in_string = not in_string
+            continue
+        if not in_string:
+            if char == '[':
+                bracket_count += 1
+            elif char == ']':
+                bracket_count -= 1
+                if bracket_count == 0:
+                    return text[start_idx:i+1]
+    return text[start_idx:]
+
+
+def old_parse(response: str) -> list:
+    return json.loads(old_extract_json_array(old_strip_code_fences(response)))
+
+
+def make_response(files: list) -> str:
+    # Wie eine reale Antwort: Einleitungssatz, Code-Fence, Array, Schlusssatz
+    return "Here are the generated files:\n```json\n" + json.dumps(files, indent=2) + "\n```\nLet me know if you need changes."
+
+
+def run_benchmark(java_files: int, java_lines: int, binary_bytes: int, repeat: int) -> list:
+    # CodeAgent baut einen ChatOpenAI-Client, ruft ihn hier aber nie auf
+    os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+    from backend.agents.CodeAgent import CodeAgent, clean_forbidden_code
+    from backend.json_extract import extract_json_array
+    from backend.rules import rule_set_for
+
+    agent = CodeAgent()
+    files = synthetic_project(java_files, java_lines, binary_bytes)
+    response = make_response(files)
+    java_sources = [f["content"] for f in files if f["path"].endswith(".java")]
+    binaries = [f for f in files if not f["path"].endswith((".java", ".xml"))]
+    rule_set = rule_set_for(is_dicom=True)
+
+    # Abgeschnitten mitten in der letzten Datei (z.B. max_tokens erreicht)
+    truncated = response[:len(response) - len(files[-1]["content"]) // 2]
+    assert old_parse(response) == files
+    assert extract_json_array(response) == (files, True)
+    assert extract_json_array(truncated) == (files[:-1], False)
+
+    rows = [
+        ("old: fences+loop+loads", len(response), timed(lambda: old_parse(response), repeat)),
+        ("extract_json_array", len(response), timed(lambda: extract_json_array(response), repeat)),
+        ("  truncated response", len(truncated), timed(lambda: extract_json_array(truncated), repeat)),
+        ("clean_forbidden_code", sum(len(s) for s in java_sources),
+         timed(lambda: [clean_forbidden_code(s, rule_set) for s in java_sources], repeat)),
+    ]
+    if binaries:
+        rows.append(("_process_binary_files", sum(len(f["content"]) for f in binaries),
+                     timed(lambda: agent._process_binary_files(binaries), repeat)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for LLM response post-processing")
+    parser.add_argument("--java-files", type=int, default=200)
+    parser.add_argument("--java-lines", type=int, default=200)
+    parser.add_argument("--binary-bytes", type=int, default=2_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = run_benchmark(args.java_files, args.java_lines, args.binary_bytes, args.repeat)
+    print(f"{'function':<24} {'input':>10} {'best':>10} {'throughput':>12}")
+    for name, size, seconds in rows:
+        print(f"{name:<24} {size / 2**20:>7.2f} MB {seconds * 1000:>7.1f} ms {size / 2**20 / seconds:>8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# backend/benchmarks/rules_bench.py
+#
+# Micro-Benchmark für das Entfernen verbotener Bezeichner: alter Zeilen-Scan
+# (any(pattern in line for pattern in ...)) gegen den kompilierten RuleSet-Scan
+# auf synthetischen Java-Quellen mehrerer Megabyte. MB/s sollte über alle Größen
+# konstant bleiben (linearer Scan).
+#
+# Aufruf:
+#   python -m backend.benchmarks.rules_bench [--sizes 1,2,4,8] [--repeat 3] [--hit-ratio 0.02]
+
+import argparse
+import random
+import time
+
+from backend.rules import DICOM_FORBIDDEN_NAMES, JAVA, rule_set_for
+
+_CLEAN_LINES = [
+    "    private final Map<String, Object> cache = new HashMap<>();",
+    "    public void onMessage(String payload) throws IOException {",
+    "        log.info(\"processing {} bytes\", payload.length());",
+    "        for (int i = 0; i < items.size(); i++) { total += items.get(i); }",
+    "    }",
+]
+
+# Zeilen, die der alte Scan entfernt: echte Treffer und Fehlalarme (Kommentar, String, Teilwort)
+_HIT_LINES = [
+    "    // keeps the Association between channel and connector",
+    "        String label = \"Commands are queued\";",
+    "        MyAssociationHelper helper = new MyAssociationHelper();",
+    "        Association assoc = connect(remote);",
+    "import org.dcm4che3.net.Dimse;",
+]
+
+
+def make_source(size_bytes: int, hit_ratio: float = 0.02, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    parts = ["package com.example;\n\npublic class Big {\n"]
+    total = len(parts[0])
+    while total < size_bytes:
+        pool = _HIT_LINES if rng.random() < hit_ratio else _CLEAN_LINES
+        line = rng.choice(pool) + "\n"
+        parts.append(line)
+        total += len(line)
+    parts.append("}\n")
+    return "".join(parts)
+
+
+def old_scan(content: str) -> str:
+    # Vorheriges Verfahren aus CodeAgent.clean_forbidden_code
+    return "\n".join(
+        line for line in content.splitlines()
+        if not any(pattern in line for pattern in DICOM_FORBIDDEN_NAMES)
+    )
+
+
+def timed(func, arg, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(sizes_mb: list, repeat: int, hit_ratio: float) -> list:
+    rule_set = rule_set_for(is_dicom=True)
+    rows = []
+    for size_mb in sizes_mb:
+        source = make_source(int(size_mb * 1024 * 1024), hit_ratio)
+        old_s = timed(old_scan, source, repeat)
+        new_s = timed(lambda c: rule_set.scrub(c, JAVA), source, repeat)
+        rows.append({
+            "size_mb": size_mb,
+            "old_s": old_s,
+            "new_s": new_s,
+            "old_mb_s": size_mb / old_s,
+            "new_mb_s": size_mb / new_s,
+            "old_lines_removed": len(source.splitlines()) - len(old_scan(source).splitlines()),
+            "new_lines_removed": len({line for line, _ in rule_set.find(source, JAVA)}),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Forbidden-code scan benchmark")
+    parser.add_argument("--sizes", default="1,2,4,8", help="Quellgrößen in MB, kommagetrennt")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--hit-ratio", type=float, default=0.02, help="Anteil der Zeilen mit (Schein-)Treffern")
+    args = parser.parse_args()
+
+    rows = run_benchmark([float(s) for s in args.sizes.split(",")], args.repeat, args.hit_ratio)
+    print(f"{'size':>6} {'old s':>8} {'old MB/s':>9} {'new s':>8} {'new MB/s':>9} {'removed old/new':>16}")
+    for r in rows:
+        print(f"{r['size_mb']:>5}M {r['old_s']:8.3f} {r['old_mb_s']:9.1f} {r['new_s']:8.3f} {r['new_mb_s']:9.1f} "
+              f"{r['old_lines_removed']:>8}/{r['new_lines_removed']}")
+    print("Old scan also drops comment/string/identifier false positives "
+          "(e.g. MyAssociationHelper, \"Commands are queued\").")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+# backend/benchmarks/stub_llm.py
+#
+# Minimaler OpenAI-kompatibler HTTP-Server für Benchmarks ohne Netzwerk.
+# Beantwortet /v1/chat/completions (auch mit stream=true) und /v1/models
+# und zählt, wie viele TCP-Verbindungen die Clients aufgebaut haben.
+# ReplayResponder spielt aufgezeichnete (oder synthetische) Antworten passend
+# zum jeweiligen Prompt der Agents ab.
+
+import base64
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "GENERATED_PLUGIN/"
+
+
+def synthetic_project(java_files: int = 8, java_lines: int = 120, binary_bytes: int = 0,
+                      package: str = "com.example", main_class: str = "BenchPlugin") -> list:
+    """
+    Synthetisches, für Precheck und Autokorrektur gültiges Projekt als Dateiliste
+    {"path", "content"} – Binärdateien base64-kodiert, wie das LLM sie liefert.
+    """
+    package_dir = package.replace(".", "/")
+    files = [
+        {"path": PREFIX + "pom.xml", "content": (
+            "<project>\n    <modelVersion>4.0.0</modelVersion>\n"
+            f"    <groupId>{package}</groupId>\n    <artifactId>bench-plugin</artifactId>\n    <version>1.0.0</version>\n"
+            "    <dependencies>\n        <dependency>\n            <groupId>junit</groupId>\n"
+            "            <artifactId>junit</artifactId>\n            <version>4.13.2</version>\n"
+            "            <scope>test</scope>\n        </dependency>\n    </dependencies>\n</project>\n"
+        )},
+        {"path": PREFIX + "plugin.xml", "content": (
+            '<pluginMetaData path="bench-plugin">\n    <name>BenchPlugin</name>\n'
+            f"    <serverClasses>\n        <string>{package}.{main_class}</string>\n    </serverClasses>\n</pluginMetaData>\n"
+        )},
+    ]
+    for i in range(java_files):
+        class_name = main_class if i == 0 else f"Helper{i}"
+        body = "".join(
+            f"    public String step{n}(String input) {{\n"
+            f"        // Schritt {n}: \"quoted\" \\ backslash [brackets]\n"
+            f"        return input + \"-{n}\";\n    }}\n\n"
+            for n in range(max(1, java_lines // 5))
+        )
+        files.append({
+            "path": f"{PREFIX}src/main/java/{package_dir}/{class_name}.java",
+            "content": f"package {package};\n\npublic class {class_name} {{\n\n{body}}}\n",
+        })
+    if binary_bytes:
+        payload = random.Random(0).randbytes(binary_bytes)
+        encoded = base64.b64encode(payload).decode("ascii")
+        # Zeilenumbrüche wie in LLM-Antworten; _process_binary_files entfernt sie wieder
+        files.append({"path": PREFIX + "src/main/resources/icon.png",
+                      "content": "\n".join(encoded[i:i + 76] for i in range(0, len(encoded), 76))})
+    return files
+
+
+def synthetic_recording(files: list, metadata: dict = None) -> dict:
+    """
+    Aufzeichnung im Format von ReplayResponder aus einer Dateiliste.
+    """
+    metadata = metadata or {
+        "plugin_name": "BenchPlugin", "plugin_description": "Benchmark plugin", "main_class_name": "BenchPlugin",
+        "package": "com.example", "plugin_id": "bench-plugin", "mirth_version": "4.5.2",
+        "plugin_type": "server_plugin", "use_assembly": False, "provided_dependencies": [], "dicom_enabled": False,
+    }
+    java = [f for f in files if f["path"].endswith(".java")]
+    return {
+        "metadata": json.dumps(metadata),
+        "files": json.dumps(files),
+        "fused": json.dumps({"metadata": metadata, "files": files}),
+        "manifest": json.dumps([{"path": f["path"], "role": "source", "interface": ""} for f in files]),
+        "single": {f["path"]: json.dumps([f]) for f in files},
+        "scaffold": json.dumps(java),
+        "repair": json.dumps(java[:1]),
+    }
+
+
+class ReplayResponder:
+    """
+    responder für StubOpenAIServer: erkennt am Prompt, welcher Agent-Call ankommt,
+    und liefert die passende aufgezeichnete Antwort.
+
+    Aufzeichnung (JSON-Datei oder dict) mit rohen Antworttexten:
+      metadata  PromptAnalyzerAgent          fused     Modus "fused"
+      files     CodeAgent (two_step/stream)  manifest  Planungs-Call im Modus "parallel"
+      single    {pfad: antwort} pro Datei    scaffold  Modus "scaffold" (nur Java)
+      repair    Reparatur-Call
+    Fehlende Einträge fallen auf "files" zurück.
+    """
+
+    _SINGLE_PATH = re.compile(r"FILE TO GENERATE: (\S+)")
+
+    def __init__(self, recording):
+        if isinstance(recording, str):
+            with open(recording, encoding="utf-8") as f:
+                recording = json.load(f)
+        self.recording = recording
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def kind(self, text: str) -> str:
+        if "extracts metadata for a Mirth Connect plugin" in text:
+            return "metadata"
+        for marker, kind in (("FUSED RESPONSE FORMAT", "fused"), ("REPAIR TASK", "repair"),
+                             ("SINGLE FILE RESPONSE FORMAT", "single"), ("MANIFEST RESPONSE FORMAT", "manifest"),
+                             ("SCAFFOLD RESPONSE FORMAT", "scaffold")):
+            if marker in text:
+                return kind
+        return "files"
+
+    def __call__(self, request: dict) -> str:
+        text = "\n".join(str(m.get("content", "")) for m in request.get("messages", []))
+        kind = self.kind(text)
+        with self._lock:
+            self.calls[kind] = self.calls.get(kind, 0) + 1
+        if kind == "single":
+            match = self._SINGLE_PATH.search(text)
+            single = self.recording.get("single", {})
+            if match and match.group(1) in single:
+                return single[match.group(1)]
+        return self.recording.get(kind) or self.recording["files"]
+
+
+class StubOpenAIServer:
+    """
+    responder(request_json) -> str liefert den Antworttext des "LLM".
+    latency wird vor jeder Antwort abgewartet (± jitter, gleichverteilt), chunk_size und
+    chunk_delay steuern das Streaming (Zeit zwischen zwei Chunks, simuliert Token-Rate).
+    """
+
+    def __init__(self, responder=None, latency: float = 0.0, chunk_size: int = 64, port: int = 0,
+                 jitter: float = 0.0, chunk_delay: float = 0.0):
+        self.responder = responder or (lambda request: "[]")
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, attr):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                # Eine Handler-Instanz pro TCP-Verbindung
+                stub._count("connections")
+                super().setup()
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_chunk(self, data: str):
+                raw = f"data: {data}\n\n".encode("utf-8")
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(raw), raw))
+                self.wfile.flush()
+
+            def do_GET(self):
+                self._send_json({"object": "list", "data": [{"id": "stub", "object": "model"}]})
+
+            def do_POST(self):
+                stub._count("requests")
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                text = stub.responder(request)
+                delay = stub.latency + (random.uniform(-stub.jitter, stub.jitter) if stub.jitter else 0.0)
+                if delay > 0:
+                    time.sleep(delay)
+                model = request.get("model", "stub")
+                usage = {"prompt_tokens": len(json.dumps(request)) // 4,
+                         "completion_tokens": len(text) // 4,
+                         "total_tokens": (len(json.dumps(request)) + len(text)) // 4}
+                if not request.get("stream"):
+                    self._send_json({
+                        "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": model,
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                        "usage": usage,
+                    })
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i in range(0, len(text), stub.chunk_size):
+                    self._send_chunk(json.dumps({
+                        "id": "stub", "object": "chat.completion.chunk", "created": 0, "model": model,
+                        "choices": [{"index": 0, "delta": {"content": text[i:i + stub.chunk_size]}, "finish_reason": None}],
+                    }))
+                    if stub.chunk_delay:
+                        time.sleep(stub.chunk_delay)
+                self._send_chunk(json.dumps({
+                    "id": "stub", "object": "chat.completion.chunk", "created": 0, "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                }))
+                if (request.get("stream_options") or {}).get("include_usage"):
+                    self._send_chunk(json.dumps({
+                        "id": "stub", "object": "chat.completion.chunk", "created": 0, "model": model,
+                        "choices": [], "usage": usage,
+                    }))
+                self._send_chunk("[DONE]")
+                self.wfile.write(b"0\r\n\r\n")
+
+        return Handler
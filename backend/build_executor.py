@@ -0,0 +1,183 @@
+# backend/build_executor.py
+
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import time
+import weakref
+
+from backend.cache import CACHE_DIR
+from backend.log import get_logger
+
+logger = get_logger("BuildExecutor")
+
+MANIFEST_NAME = ".mirth-ai-build.json"
+
+
+def default_local_repo() -> str:
+    """
+    Lokales Maven-Repository für Builds und vorinstallierte Mirth-JARs: MAVEN_LOCAL_REPO,
+    sonst ein eigenes unter <MIRTH_AI_CACHE_DIR>/m2/repository statt ~/.m2/repository,
+    damit die Installation aus server-lib dort nichts überschreibt.
+    """
+    return os.getenv("MAVEN_LOCAL_REPO") or os.path.join(CACHE_DIR, "m2", "repository")
+
+
+def _default_maven_cmd() -> str:
+    # mvnd (Maven Daemon) hält JVMs mit geladenen Plugins warm – bevorzugen, wenn installiert
+    return os.getenv("MAVEN_CMD") or ("mvnd" if shutil.which("mvnd") else "mvn")
+
+
+class BuildExecutor:
+    """
+    Führt Maven-Builds auf einem begrenzten Worker-Pool aus, statt pro Request
+    einen kalten `mvn clean test` zu starten.
+
+    - Warme JVMs: mit mvnd bleiben die Daemons zwischen Builds am Leben.
+    - Offline: -o gegen ein vorab befülltes lokales Repository (MAVEN_LOCAL_REPO).
+    - Inkrementell: `clean` nur, wenn sich pom.xml geändert hat, Dateien gelöscht
+      wurden oder noch kein vorheriger Build existiert.
+    - Timings pro Phase (queue_wait, plan, maven, total) in jedem Ergebnis.
+
+    Konfiguration über Umgebungsvariablen:
+      MAVEN_CMD         Maven-Kommando (Default: mvnd falls vorhanden, sonst mvn; auch Fake-mvn für Tests)
+      MAVEN_OFFLINE     "1" = offline bauen (-o)
+      MAVEN_LOCAL_REPO  Pfad zum lokalen Repository (-Dmaven.repo.local, Default siehe default_local_repo)
+      BUILD_WORKERS     max. gleichzeitige Builds (Default 2)
+    """
+
+    def __init__(self, maven_cmd: str = None, workers: int = None, offline: bool = None, local_repo: str = None):
+        self.maven_cmd = maven_cmd or _default_maven_cmd()
+        self.workers = workers or int(os.getenv("BUILD_WORKERS", "2"))
+        self.offline = offline if offline is not None else os.getenv("MAVEN_OFFLINE", "0") == "1"
+        self.local_repo = local_repo or default_local_repo()
+        self._slots = asyncio.Semaphore(self.workers)
+        # Nur Locks laufender oder wartender Builds; danach fallen sie von selbst heraus
+        self._dir_locks = weakref.WeakValueDictionary()
+
+    def command(self, goals: list) -> list:
+        cmd = [self.maven_cmd, "-B"]
+        if self.offline:
+            cmd.append("-o")
+        cmd.append(f"-Dmaven.repo.local={self.local_repo}")
+        return cmd + list(goals)
+
+    def plan(self, project_dir: str) -> tuple[bool, str, dict]:
+        """
+        Entscheidet anhand des Datei-Diffs seit dem letzten Build, ob `clean` nötig ist.
+        Gibt (needs_clean, reason, snapshot) zurück; snapshot ist der Stand, mit dem gebaut
+        wird, und wird nach dem Build als Manifest geschrieben.
+        """
+        current = self._snapshot(project_dir)
+        previous = self._read_manifest(project_dir)
+        if previous is None or not os.path.isdir(os.path.join(project_dir, "target")):
+            return True, "no previous build", current
+        if previous.get("pom.xml") != current.get("pom.xml"):
+            return True, "pom.xml changed", current
+        removed = set(previous) - set(current)
+        if removed:
+            return True, f"{len(removed)} files removed", current
+        changed = sum(1 for path, digest in current.items() if previous.get(path) != digest)
+        return False, f"incremental, {changed} files changed", current
+
+    async def run(self, project_dir: str, goals: list, timeout: float = 300, force_clean: bool = False) -> dict:
+        """
+        Baut project_dir mit den angegebenen Goals. Liefert returncode/stdout/stderr,
+        die tatsächlich ausgeführten Goals, ob inkrementell gebaut wurde, und Timings.
+        """
+        timings = {}
+        start = time.perf_counter()
+        key = os.path.abspath(project_dir)
+        lock = self._dir_locks.get(key)
+        if lock is None:
+            lock = self._dir_locks[key] = asyncio.Lock()
+        async with lock, self._slots:
+            timings["queue_wait"] = time.perf_counter() - start
+
+            t = time.perf_counter()
+            needs_clean, reason, snapshot = await asyncio.to_thread(self.plan, project_dir)
+            if force_clean:
+                needs_clean, reason = True, "forced"
+            run_goals = (["clean"] if needs_clean else []) + list(goals)
+            timings["plan"] = time.perf_counter() - t
+
+            t = time.perf_counter()
+            returncode, stdout, stderr, timed_out = await self._exec(project_dir, self.command(run_goals), timeout)
+            timings["maven"] = time.perf_counter() - t
+
+            if not timed_out:
+                # Stand vor dem Build: währenddessen geänderte Dateien gelten beim nächsten Mal als geändert
+                await asyncio.to_thread(self._write_manifest, project_dir, snapshot)
+        timings["total"] = time.perf_counter() - start
+        return {
+            "returncode": returncode,
+            "stdout": stdout,
+            "stderr": stderr,
+            "timeout": timed_out,
+            "goals": run_goals,
+            "incremental": not needs_clean,
+            "plan_reason": reason,
+            "timings": {k: round(v, 4) for k, v in timings.items()},
+        }
+
+    async def _exec(self, project_dir, cmd, timeout):
+        if os.name == "nt":
+            # mvn/mvnd sind unter Windows .cmd-Skripte und brauchen die Shell
+            proc = await asyncio.create_subprocess_shell(
+                subprocess.list2cmdline(cmd), cwd=project_dir,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
+        else:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd, cwd=project_dir,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            return None, "", "", True
+        return (
+            proc.returncode,
+            stdout.decode("utf-8", errors="replace"),
+            stderr.decode("utf-8", errors="replace"),
+            False,
+        )
+
+    def _snapshot(self, project_dir: str) -> dict:
+        """
+        Hash aller Projektdateien außerhalb von target/, relativ zu project_dir.
+        """
+        snapshot = {}
+        for root, dirs, files in os.walk(project_dir):
+            if root == project_dir and "target" in dirs:
+                dirs.remove("target")
+            for name in files:
+                path = os.path.join(root, name)
+                rel = os.path.relpath(path, project_dir).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    snapshot[rel] = hashlib.sha256(f.read()).hexdigest()
+        return snapshot
+
+    def _manifest_path(self, project_dir: str) -> str:
+        return os.path.join(project_dir, "target", MANIFEST_NAME)
+
+    def _read_manifest(self, project_dir: str):
+        try:
+            with open(self._manifest_path(project_dir), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, project_dir: str, snapshot: dict):
+        target = os.path.join(project_dir, "target")
+        try:
+            os.makedirs(target, exist_ok=True)
+            with open(self._manifest_path(project_dir), "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+        except OSError as e:
+            logger.warning(f"Could not write build manifest: {e}")
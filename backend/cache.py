@@ -0,0 +1,283 @@
+# backend/cache.py
+
+import base64
+import copy
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+
+CACHE_DIR = os.getenv("MIRTH_AI_CACHE_DIR", os.path.expanduser("~/.cache/mirth-plugin-ai"))
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalisiert einen Prompt für den Cache-Key: Unicode-NFC, Whitespace zusammengefasst,
+    abschließende Satzzeichen entfernt. Groß-/Kleinschreibung bleibt erhalten,
+    da Klassennamen und AE-Titles daraus abgeleitet werden.
+    """
+    text = unicodedata.normalize("NFC", prompt)
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip(" .!?")
+
+
+def make_key(*parts) -> str:
+    return hashlib.sha256("\x00".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+class MetadataCache:
+    """
+    Zweistufiger Cache für PromptAnalyzerAgent-Ergebnisse:
+    LRU im Speicher + SQLite auf Disk (überlebt Neustarts).
+    Einträge laufen nach ttl Sekunden ab; beide Stufen sind in der Größe begrenzt.
+
+    Konfiguration über Umgebungsvariablen:
+      METADATA_CACHE_PATH         SQLite-Datei (Default: <MIRTH_AI_CACHE_DIR>/metadata.sqlite, "" = nur Speicher)
+      METADATA_CACHE_TTL          Sekunden (Default 86400)
+      METADATA_CACHE_MEMORY_SIZE  Einträge im Speicher (Default 256)
+      METADATA_CACHE_DISK_SIZE    Einträge auf Disk (Default 10000)
+    """
+
+    def __init__(self, path: str = None, ttl: float = None, memory_size: int = None, disk_size: int = None):
+        if path is None:
+            path = os.getenv("METADATA_CACHE_PATH", os.path.join(CACHE_DIR, "metadata.sqlite"))
+        self.path = path
+        self.ttl = ttl if ttl is not None else float(os.getenv("METADATA_CACHE_TTL", "86400"))
+        self.memory_size = memory_size or int(os.getenv("METADATA_CACHE_MEMORY_SIZE", "256"))
+        self.disk_size = disk_size or int(os.getenv("METADATA_CACHE_DISK_SIZE", "10000"))
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS metadata ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+
+    def key(self, prompt: str, model_name: str, temperature: float) -> str:
+        return make_key(normalize_prompt(prompt), model_name, float(temperature))
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return copy.deepcopy(value)
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM metadata WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    self._db.execute("UPDATE metadata SET last_access = ? WHERE key = ?", (now, key))
+                    value = json.loads(row[0])
+                    self._remember(key, row[1], value)
+                    self.stats["disk_hits"] += 1
+                    return copy.deepcopy(value)
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: dict):
+        now = time.time()
+        expires_at = now + self.ttl
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._remember(key, expires_at, value)
+            self.stats["stores"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO metadata (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), expires_at, now),
+                )
+                self._evict_disk(now)
+
+    def _remember(self, key, expires_at, value):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _evict_disk(self, now):
+        expired = self._db.execute("DELETE FROM metadata WHERE expires_at <= ?", (now,)).rowcount
+        overflow = self._db.execute(
+            "DELETE FROM metadata WHERE key IN ("
+            " SELECT key FROM metadata ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.disk_size,),
+        ).rowcount
+        self.stats["evictions"] += max(expired, 0) + max(overflow, 0)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM metadata")
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            return {
+                **self.stats,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+class GenerationCache:
+    """
+    Inhaltsadressierter Disk-Cache für CodeAgent-Generierungen.
+    Key = Hash aus finalem System-Prompt, Modell und Temperatur; Wert = die geparste,
+    validierte Dateiliste inkl. dekodierter content_binary-Bytes.
+
+    Format pro Eintrag (zlib-komprimiert): Header-Länge (4 Byte) + JSON-Header
+    mit Pfaden/Textinhalten + die Binärdaten hintereinander (kein Base64 auf Disk).
+    LRU-Verdrängung über die Zugriffszeit der Dateien, begrenzt durch max_bytes.
+
+    Konfiguration über Umgebungsvariablen:
+      GENERATION_CACHE_DIR        Verzeichnis (Default: <MIRTH_AI_CACHE_DIR>/generations)
+      GENERATION_CACHE_MAX_BYTES  Byte-Budget auf Disk (Default 256 MiB)
+    """
+
+    SUFFIX = ".mpgc"
+
+    def __init__(self, directory: str = None, max_bytes: int = None):
+        self.directory = directory or os.getenv("GENERATION_CACHE_DIR", os.path.join(CACHE_DIR, "generations"))
+        self.max_bytes = max_bytes or int(os.getenv("GENERATION_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "bytes_saved": 0}
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> Dateigröße, älteste Zugriffe zuerst
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_index()
+
+    def key(self, system_prompt: str, model_name: str, temperature: float) -> str:
+        return make_key(system_prompt, model_name, float(temperature))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def _load_index(self):
+        found = []
+        for name in os.listdir(self.directory):
+            if name.endswith(self.SUFFIX):
+                st = os.stat(os.path.join(self.directory, name))
+                found.append((st.st_mtime, name[:-len(self.SUFFIX)], st.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self._entries.values())
+
+    def get(self, key: str):
+        with self._lock:
+            if key not in self._entries:
+                self.stats["misses"] += 1
+                return None
+            path = self._path(key)
+            try:
+                with open(path, "rb") as f:
+                    header, files = self._decode(f.read())
+                os.utime(path)
+            except (OSError, ValueError, zlib.error):
+                self._entries.pop(key, None)
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            self.stats["bytes_saved"] += header.get("response_bytes", 0)
+            return files
+
+    def set(self, key: str, files: list, response_bytes: int = 0):
+        data = self._encode(files, response_bytes)
+        path = self._path(key)
+        tmp_path = path + ".tmp"
+        with self._lock:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._entries[key] = len(data)
+            self._entries.move_to_end(key)
+            self.stats["stores"] += 1
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, _ = self._entries.popitem(last=False)
+                try:
+                    os.remove(self._path(old_key))
+                except OSError:
+                    pass
+                self.stats["evictions"] += 1
+
+    def _encode(self, files: list, response_bytes: int) -> bytes:
+        entries = []
+        blobs = []
+        for file in files:
+            binary = file.get("content_binary")
+            entry = {k: v for k, v in file.items() if k != "content_binary"}
+            if binary is not None:
+                entry.pop("content", None)
+                entry["binary_len"] = len(binary)
+                blobs.append(binary)
+            entries.append(entry)
+        header = json.dumps({"response_bytes": response_bytes, "files": entries}).encode("utf-8")
+        return zlib.compress(struct.pack(">I", len(header)) + header + b"".join(blobs), 6)
+
+    def _decode(self, data: bytes):
+        raw = zlib.decompress(data)
+        (header_len,) = struct.unpack(">I", raw[:4])
+        header = json.loads(raw[4:4 + header_len])
+        offset = 4 + header_len
+        files = []
+        for entry in header["files"]:
+            binary_len = entry.pop("binary_len", None)
+            if binary_len is None:
+                entry["content_binary"] = None
+            else:
+                binary = raw[offset:offset + binary_len]
+                offset += binary_len
+                entry["content_binary"] = binary
+                entry["content"] = base64.b64encode(binary).decode("ascii")
+            files.append(entry)
+        return header, files
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "total_bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,237 @@
+# backend/dependency_index.py
+
+import os
+import re
+import shutil
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.build_executor import default_local_repo
+from backend.log import get_logger
+from backend.xml_check import LOCAL_ONLY_GROUP_PREFIXES
+
+logger = get_logger("DependencyIndex")
+
+_VERSIONED_JAR = re.compile(r"^(?P<artifact>.+?)-(?P<version>\d[\w.\-]*)\.jar$")
+
+_MINIMAL_POM = """<?xml version="1.0" encoding="UTF-8"?>
+<project xmlns="http://maven.apache.org/POM/4.0.0">
+  <modelVersion>4.0.0</modelVersion>
+  <groupId>{group}</groupId>
+  <artifactId>{artifact}</artifactId>
+  <version>{version}</version>
+  <packaging>jar</packaging>
+</project>
+"""
+
+
+class JarEntry:
+    def __init__(self, group_id: str, artifact_id: str, version: str, path: str, versioned: bool,
+                 packages: frozenset = frozenset(), group_inferred: bool = False):
+        self.group_id = group_id
+        # True, wenn group_id nicht aus pom.properties stammt, sondern DEPENDENCY_DEFAULT_GROUP ist
+        self.group_inferred = group_inferred
+        self.artifact_id = artifact_id
+        self.version = version
+        self.path = path
+        self.versioned = versioned
+        # Java-Packages mit mindestens einer .class-Datei im JAR
+        self.packages = packages
+
+    def to_dict(self) -> dict:
+        return {
+            "groupId": self.group_id,
+            "artifactId": self.artifact_id,
+            "version": self.version,
+            "path": self.path,
+        }
+
+
+class DependencyIndex:
+    """
+    Index artifactId → version → JAR über MIRTH_HOME/server-lib und weitere JAR-Verzeichnisse.
+    Wird beim Start im Hintergrund aufgebaut; fehlende Mirth-Artefakte (siehe is_mirth_owned)
+    werden danach parallel direkt im Repository-Layout installiert (JAR + minimales POM, ohne
+    eine JVM pro Artefakt), sodass der erste Request keine Installationslatenz mehr zahlt.
+    Drittbibliotheken aus server-lib werden nur indexiert; die lädt Maven selbst.
+
+    Koordinaten kommen aus META-INF/maven/**/pom.properties im JAR, sonst aus dem Dateinamen.
+    JARs ohne Version im Namen und ohne pom.properties erhalten MIRTH_VERSION. Zusätzlich
+    wird festgehalten, welche Java-Packages die JARs enthalten (für Import-Prüfungen).
+
+    Konfiguration über Umgebungsvariablen:
+      MIRTH_HOME                JARs unter server-lib/ (rekursiv)
+      DEPENDENCY_JAR_DIRS       weitere Verzeichnisse, getrennt durch os.pathsep
+      MAVEN_LOCAL_REPO          Ziel-Repository (Default: build_executor.default_local_repo)
+      DEPENDENCY_DEFAULT_GROUP  groupId für JARs ohne pom.properties (Default com.mirth.connect.plugins)
+      MIRTH_VERSION             Version für JARs ohne Version im Namen (Default 4.5.2)
+      DEPENDENCY_INDEX_WORKERS  parallele Threads für Scan und Installation (Default 8)
+    """
+
+    def __init__(self, jar_dirs: list = None, local_repo: str = None, default_group: str = None,
+                 default_version: str = None, workers: int = None):
+        if jar_dirs is None:
+            jar_dirs = []
+            if os.getenv("MIRTH_HOME"):
+                jar_dirs.append(os.path.join(os.getenv("MIRTH_HOME"), "server-lib"))
+            jar_dirs += [d for d in os.getenv("DEPENDENCY_JAR_DIRS", "").split(os.pathsep) if d]
+        self.jar_dirs = jar_dirs
+        self.local_repo = local_repo or default_local_repo()
+        self.default_group = default_group or os.getenv("DEPENDENCY_DEFAULT_GROUP", "com.mirth.connect.plugins")
+        self.default_version = default_version or os.getenv("MIRTH_VERSION", "4.5.2")
+        self.workers = workers or int(os.getenv("DEPENDENCY_INDEX_WORKERS", "8"))
+        self.ready = threading.Event()
+        self.stats = {"jars": 0, "installed": 0, "already_installed": 0, "failed": 0, "skipped": 0,
+                      "scan_s": 0.0, "install_s": 0.0}
+        self._entries = {}  # artifactId -> {version -> JarEntry}
+        self.packages = frozenset()
+
+    def lookup(self, artifact_id: str, version: str):
+        """
+        JAR für genau (artifactId, version), sonst None.
+        """
+        return self._entries.get(artifact_id, {}).get(version)
+
+    def contains(self, artifact_id: str) -> bool:
+        return artifact_id in self._entries
+
+    def is_available(self, group_id: str, artifact_id: str, version: str) -> bool:
+        """
+        True, wenn das Artefakt indexiert ist oder bereits im lokalen Repository liegt.
+        """
+        if self.lookup(artifact_id, version) is not None:
+            return True
+        jar = os.path.join(self.local_repo, *group_id.split("."), artifact_id, version, f"{artifact_id}-{version}.jar")
+        return os.path.exists(jar)
+
+    def has_package(self, package: str) -> bool:
+        return package in self.packages
+
+    def build(self) -> dict:
+        """
+        Scannt alle JAR-Verzeichnisse und installiert fehlende Artefakte. Gibt die Stats zurück.
+        """
+        self.stats.update(installed=0, already_installed=0, failed=0, skipped=0)
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="dep-index") as pool:
+            start = time.perf_counter()
+            self.scan(pool)
+            self.stats["scan_s"] = round(time.perf_counter() - start, 4)
+            self.ready.set()
+
+            start = time.perf_counter()
+            self.install_missing(pool)
+            self.stats["install_s"] = round(time.perf_counter() - start, 4)
+        logger.event("Dependency index built", **self.stats)
+        return self.stats
+
+    def scan(self, pool: ThreadPoolExecutor):
+        paths = []
+        for directory in self.jar_dirs:
+            for root, _, files in os.walk(directory):
+                paths += [os.path.join(root, name) for name in files if name.endswith(".jar")]
+        entries = {}
+        packages = set()
+        for entry in pool.map(self._read_entry, paths):
+            entries.setdefault(entry.artifact_id, {}).setdefault(entry.version, entry)
+            packages |= entry.packages
+        self._entries = entries
+        self.packages = frozenset(packages)
+        self.stats["jars"] = len(paths)
+
+    def _read_entry(self, path: str) -> JarEntry:
+        name = os.path.basename(path)
+        props = {}
+        packages = set()
+        try:
+            with zipfile.ZipFile(path) as jar:
+                for info in jar.infolist():
+                    filename = info.filename
+                    if filename.endswith(".class") and "/" in filename and not filename.startswith("META-INF/"):
+                        packages.add(filename.rsplit("/", 1)[0].replace("/", "."))
+                    elif filename.startswith("META-INF/maven/") and filename.endswith("/pom.properties") and not props:
+                        props = _parse_properties(jar.read(info).decode("utf-8", errors="replace"))
+        except (OSError, zipfile.BadZipFile):
+            pass
+        packages = frozenset(packages)
+        match = _VERSIONED_JAR.match(name)
+        if props.get("artifactId") and props.get("version"):
+            return JarEntry(
+                props.get("groupId") or self.default_group, props["artifactId"], props["version"], path,
+                versioned=bool(match), packages=packages, group_inferred=not props.get("groupId"),
+            )
+        if match:
+            return JarEntry(self.default_group, match.group("artifact"), match.group("version"), path, True, packages,
+                            group_inferred=True)
+        return JarEntry(self.default_group, name[:-len(".jar")], self.default_version, path, False, packages,
+                        group_inferred=True)
+
+    def repo_dir(self, entry: JarEntry) -> str:
+        return os.path.join(self.local_repo, *entry.group_id.split("."), entry.artifact_id, entry.version)
+
+    def is_mirth_owned(self, entry: JarEntry) -> bool:
+        """
+        Nur solche JARs installiert der Index: groupId aus LOCAL_ONLY_GROUP_PREFIXES und, falls
+        die groupId nur geraten ist, mindestens ein Package darunter (z.B. com.mirth.connect).
+        """
+        if not entry.group_id.startswith(LOCAL_ONLY_GROUP_PREFIXES):
+            return False
+        return not entry.group_inferred or any(p.startswith(LOCAL_ONLY_GROUP_PREFIXES) for p in entry.packages)
+
+    def install_missing(self, pool: ThreadPoolExecutor):
+        entries = [e for versions in self._entries.values() for e in versions.values()]
+        owned = [e for e in entries if self.is_mirth_owned(e)]
+        self.stats["skipped"] = len(entries) - len(owned)
+        for result in pool.map(self._install, owned):
+            self.stats[result] += 1
+
+    def _install(self, entry: JarEntry) -> str:
+        target_dir = self.repo_dir(entry)
+        base = os.path.join(target_dir, f"{entry.artifact_id}-{entry.version}")
+        try:
+            if os.path.exists(base + ".jar") and os.path.getmtime(base + ".jar") >= os.path.getmtime(entry.path):
+                return "already_installed"
+            os.makedirs(target_dir, exist_ok=True)
+            tmp = base + ".jar.tmp"
+            shutil.copy2(entry.path, tmp)
+            os.replace(tmp, base + ".jar")
+            if not os.path.exists(base + ".pom"):
+                with open(base + ".pom", "w", encoding="utf-8") as f:
+                    f.write(_MINIMAL_POM.format(group=entry.group_id, artifact=entry.artifact_id, version=entry.version))
+            return "installed"
+        except OSError as e:
+            logger.warning(f"Could not install {entry.path}: {e}")
+            return "failed"
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "ready": self.ready.is_set(),
+            "artifacts": len(self._entries),
+            "packages": len(self.packages),
+        }
+
+
+def jar_pom_properties(path: str) -> dict:
+    """
+    Inhalt von META-INF/maven/**/pom.properties im JAR, {} wenn keins vorhanden oder lesbar.
+    """
+    try:
+        with zipfile.ZipFile(path) as jar:
+            for filename in jar.namelist():
+                if filename.startswith("META-INF/maven/") and filename.endswith("/pom.properties"):
+                    return _parse_properties(jar.read(filename).decode("utf-8", errors="replace"))
+    except (OSError, zipfile.BadZipFile):
+        pass
+    return {}
+
+
+def _parse_properties(text: str) -> dict:
+    props = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith("#") and "=" in line:
+            key, value = line.split("=", 1)
+            props[key.strip()] = value.strip()
+    return props
@@ -0,0 +1,176 @@
+# backend/file_writer.py
+
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.log import get_logger
+
+logger = get_logger("BulkFileWriter")
+
+
+class FileWriteError(Exception):
+    def __init__(self, path: str, error: Exception):
+        super().__init__(f"{path}: {error}")
+        self.path = path
+        self.error = error
+
+
+def encode_file(file: dict) -> bytes:
+    """
+    Bytes, wie sie auf Disk landen: Binärdaten unverändert, Text als UTF-8 mit
+    plattformüblichen Zeilenenden (wie bisher beim Schreiben im Textmodus).
+    """
+    if file.get("content_binary") is not None:
+        return file["content_binary"]
+    content = file.get("content", "")
+    if os.linesep != "\n":
+        content = content.replace("\n", os.linesep)
+    return content.encode("utf-8")
+
+
+class BulkFileWriter:
+    """
+    Schreibt eine komplette Dateiliste in einen Workspace:
+
+    - Diff-aware: Dateien mit identischem Inhalt werden nicht angefasst, damit
+      Zeitstempel und Mavens inkrementelle Kompilierung gültig bleiben.
+    - Atomar: alle geänderten Dateien werden zuerst in ein Staging-Verzeichnis im
+      Workspace geschrieben und erst dann per os.replace veröffentlicht. Schlägt
+      dabei etwas fehl, werden bereits ersetzte Dateien zurückgerollt.
+    - Verzeichnisse werden einmal pro Baum angelegt; Dateien parallel geschrieben
+      (hilft auf langsamen oder Netzwerk-Dateisystemen).
+
+    Konfiguration über Umgebungsvariablen:
+      FILE_WRITER_WORKERS  parallele Schreib-Threads (Default 8)
+    """
+
+    def __init__(self, workers: int = None):
+        self.workers = workers or int(os.getenv("FILE_WRITER_WORKERS", "8"))
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="file-writer")
+
+    def write(self, workspace, files: list) -> dict:
+        """
+        Schreibt files in workspace. Gibt einen Report mit geschriebenen/übersprungenen
+        Dateien und Bytes zurück; wirft FileWriteError für die erste fehlerhafte Datei.
+        """
+        start = time.perf_counter()
+        targets = {}
+        for file in files:
+            path = file.get("path", "")
+            try:
+                targets[workspace.resolve(path)] = (path, encode_file(file))
+            except Exception as e:
+                raise FileWriteError(path, e)
+
+        changed = {}
+        skipped = []
+        bytes_skipped = 0
+        # Quota-Delta: überschriebene Dateien zählen nur mit ihrer Größenänderung
+        delta = 0
+        for target, (path, data) in targets.items():
+            old_size = self._existing_size(target)
+            if old_size == len(data) and self._same_content(target, data):
+                skipped.append(path)
+                bytes_skipped += len(data)
+            else:
+                changed[target] = (path, data)
+                delta += len(data) - old_size
+
+        if changed:
+            try:
+                workspace.reserve(delta)
+            except Exception as e:
+                raise FileWriteError(next(iter(changed.values()))[0], e)
+            try:
+                self._stage_and_publish(workspace.path, changed)
+            except Exception:
+                workspace.reserve(-delta)
+                raise
+
+        return {
+            "written": [path for path, _ in changed.values()],
+            "skipped": skipped,
+            "bytes_written": sum(len(data) for _, data in changed.values()),
+            "bytes_skipped": bytes_skipped,
+            "elapsed": round(time.perf_counter() - start, 4),
+        }
+
+    def _existing_size(self, target: str) -> int:
+        try:
+            return os.path.getsize(target)
+        except OSError:
+            return 0
+
+    def _same_content(self, target: str, data: bytes) -> bool:
+        try:
+            with open(target, "rb") as f:
+                return f.read() == data
+        except OSError:
+            return False
+
+    def _stage_and_publish(self, root: str, changed: dict):
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=root)
+        try:
+            staged = {}
+            for i, target in enumerate(changed):
+                staged[target] = os.path.join(staging, str(i))
+            self._run_all(
+                lambda target: self._write_bytes(staged[target], *changed[target]),
+                list(changed),
+            )
+
+            for directory in sorted({os.path.dirname(t) for t in changed}):
+                try:
+                    os.makedirs(directory, exist_ok=True)
+                except OSError as e:
+                    raise FileWriteError(directory, e)
+
+            published = []
+            try:
+                for i, (target, source) in enumerate(staged.items()):
+                    backup = None
+                    if os.path.exists(target):
+                        backup = os.path.join(staging, f"{i}.orig")
+                        os.replace(target, backup)
+                    published.append((target, backup))
+                    os.replace(source, target)
+            except OSError as e:
+                self._rollback(published)
+                raise FileWriteError(changed[target][0], e)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _write_bytes(self, staged_path: str, path: str, data: bytes):
+        try:
+            with open(staged_path, "wb") as f:
+                f.write(data)
+        except OSError as e:
+            raise FileWriteError(path, e)
+
+    def _run_all(self, func, items: list):
+        if len(items) <= 1:
+            for item in items:
+                func(item)
+            return
+        # Alle Futures abwarten, dann den ersten Fehler weiterreichen
+        futures = [self._pool.submit(func, item) for item in items]
+        errors = [f.exception() for f in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+
+    def _rollback(self, published: list):
+        for target, backup in reversed(published):
+            try:
+                if backup is not None:
+                    os.replace(backup, target)
+                elif os.path.exists(target):
+                    os.remove(target)
+            except OSError as e:
+                logger.error(f"Rollback failed for {target}: {e}")
+
+    def close(self):
+        self._pool.shutdown(wait=False)
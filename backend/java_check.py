@@ -0,0 +1,211 @@
+# backend/java_check.py
+
+import os
+import re
+
+from backend.workspace import safe_relative_path
+
+# Packages aus dem JDK bzw. Namensräume, die ohne Index nicht prüfbar sind
+JDK_PREFIXES = ("java.", "javax.", "jdk.", "sun.", "com.sun.", "org.w3c.", "org.xml.", "org.ietf.", "org.omg.")
+
+# Nur Packages der Mirth-Artefakte (xml_check.LOCAL_ONLY_GROUP_PREFIXES) liegen vollständig im
+# DependencyIndex; Drittbibliotheken lädt Maven, ihre Packages sind dort nicht verlässlich
+INDEX_CHECKED_PREFIXES = ("com.mirth.",)
+
+SOURCE_ROOTS = ("src/main/java/", "src/test/java/")
+
+TYPE_KEYWORDS = {"class", "interface", "enum", "record"}
+
+_TOKEN = re.compile(
+    r'(?P<ws>\s+)'
+    r'|(?P<comment>//[^\n]*|/\*.*?\*/)'
+    r'|(?P<bad_comment>/\*)'
+    r'|(?P<string>"""(?:\\.|[^\\])*?"""|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\')'
+    r'|(?P<bad_string>["\'][^\n]*)'
+    r'|(?P<ident>[A-Za-z_$][\w$]*)'
+    r'|(?P<number>\d[\w.]*)'
+    r'|(?P<open>[({\[])'
+    r'|(?P<close>[)}\]])'
+    r'|(?P<op>.)',
+    re.DOTALL,
+)
+
+_PAIRS = {")": "(", "]": "[", "}": "{"}
+
+
+def tokenize(content: str):
+    """
+    Liefert (kind, text, pos) für alle bedeutungstragenden Tokens; Whitespace und
+    Kommentare werden übersprungen. kind ist ident, number, string, open, close, op
+    oder bad_comment/bad_string für nicht abgeschlossene Kommentare/Literale.
+    """
+    for m in _TOKEN.finditer(content):
+        kind = m.lastgroup
+        if kind in ("ws", "comment"):
+            continue
+        yield kind, m.group(), m.start()
+
+
+def _line(content: str, pos: int) -> int:
+    return content.count("\n", 0, pos) + 1
+
+
+def _package_of(qualified: str, wildcard: bool = False) -> str:
+    """
+    Package-Anteil eines importierten Namens: alle Segmente vor dem ersten großgeschriebenen
+    (bei "a.b.*" ohne Typnamen das ganze Präfix).
+    """
+    parts = qualified.split(".")
+    for i, part in enumerate(parts):
+        if part[:1].isupper():
+            return ".".join(parts[:i])
+    return qualified if wildcard else ".".join(parts[:-1])
+
+
+class JavaFileInfo:
+    def __init__(self, path: str):
+        self.path = path
+        self.package = None
+        self.imports = []  # (qualified name, wildcard, pos)
+        self.types = []  # (name, is_public, pos)
+        self.issues = []
+
+
+def parse_java(path: str, content: str) -> JavaFileInfo:
+    """
+    Ein Durchlauf über die Tokens: prüft Klammerbalance und sammelt package,
+    Imports und Top-Level-Typen.
+    """
+    info = JavaFileInfo(path)
+    stack = []
+    modifiers = []
+    statement = None  # "package" / "import" während der Deklaration
+    parts = []
+    expect_type_name = False
+    prev = None
+
+    for kind, text, pos in tokenize(content):
+        if kind == "bad_comment":
+            info.issues.append((pos, "Unterminated block comment"))
+            break
+        if kind == "bad_string":
+            info.issues.append((pos, "Unterminated string or char literal"))
+            continue
+        if kind == "open":
+            stack.append((text, pos))
+        elif kind == "close":
+            if not stack:
+                info.issues.append((pos, f"Unmatched '{text}'"))
+            elif stack[-1][0] != _PAIRS[text]:
+                opener, opened_at = stack[-1]
+                info.issues.append(
+                    (pos, f"'{text}' does not close '{opener}' from line {_line(content, opened_at)}")
+                )
+                stack.pop()
+            else:
+                stack.pop()
+
+        if not stack or (kind == "open" and text == "{" and len(stack) == 1):
+            # Top-Level-Ebene (inkl. der öffnenden Klammer des Typ-Rumpfs)
+            if statement is not None:
+                if text == ";":
+                    name = "".join(parts)
+                    if statement == "package":
+                        info.package = name
+                    else:
+                        wildcard = name.endswith(".*")
+                        info.imports.append((name[:-2] if wildcard else name, wildcard, pos))
+                    statement = None
+                elif not (statement == "import" and not parts and text == "static"):
+                    parts.append(text)
+            elif kind == "ident" and text in ("package", "import") and not stack and prev in (None, ";"):
+                statement = text
+                parts = []
+            elif expect_type_name and kind == "ident":
+                info.types.append((text, "public" in modifiers, pos))
+                expect_type_name = False
+            elif kind == "ident" and text in TYPE_KEYWORDS and not stack and prev != ".":
+                expect_type_name = True
+            elif kind == "ident" and not stack:
+                modifiers.append(text)
+            elif text in (";", "{", "}"):
+                modifiers = []
+        prev = text
+
+    for opener, opened_at in stack:
+        info.issues.append((opened_at, f"Unclosed '{opener}'"))
+    return info
+
+
+def _expected_package(rel_path: str):
+    for root in SOURCE_ROOTS:
+        idx = rel_path.find(root)
+        if idx != -1:
+            directory = rel_path[idx + len(root):].rpartition("/")[0]
+            return directory.replace("/", ".")
+    return None
+
+
+def check_java_files(files: list, index=None) -> list:
+    """
+    Strukturprüfung aller generierten .java-Dateien, ohne Compiler:
+    - balancierte Klammern, abgeschlossene Kommentare und Literale
+    - package-Deklaration passt zum Verzeichnis unter src/main|test/java
+    - öffentlicher Top-Level-Typ heißt wie die Datei (höchstens einer)
+    - Imports lösen auf: Typen aus Projekt-Packages müssen generiert sein, Mirth-Packages
+      (INDEX_CHECKED_PREFIXES) müssen im DependencyIndex existieren
+    Gibt eine Liste von Issues {"path", "line", "message"} zurück.
+    """
+    parsed = []
+    for file in files:
+        path = file.get("path", "")
+        if not path.endswith(".java") or file.get("content_binary") is not None:
+            continue
+        content = file.get("content", "")
+        parsed.append((path, content, parse_java(path, content)))
+
+    project_types = {}
+    for _, _, info in parsed:
+        if info.package is not None:
+            project_types.setdefault(info.package, set()).update(name for name, _, _ in info.types)
+    # Ohne Mirth-JARs im Index (z.B. MIRTH_HOME nicht gesetzt) gibt es nichts zu prüfen
+    check_index = (index is not None and index.ready.is_set()
+                   and any(p.startswith(INDEX_CHECKED_PREFIXES) for p in index.packages))
+
+    issues = []
+    for path, content, info in parsed:
+        def report(pos, message):
+            issues.append({"path": path, "line": _line(content, pos), "message": message})
+
+        for pos, message in info.issues:
+            report(pos, message)
+
+        try:
+            rel_path = safe_relative_path(path)
+        except ValueError:
+            rel_path = path.replace("\\", "/")
+        expected = _expected_package(rel_path)
+        if expected is not None and (info.package or "") != expected:
+            declared = info.package or "(default package)"
+            report(0, f"Package '{declared}' does not match directory (expected '{expected or '(default package)'}')")
+
+        stem = os.path.splitext(os.path.basename(rel_path))[0]
+        public_types = [(name, pos) for name, is_public, pos in info.types if is_public]
+        for name, pos in public_types:
+            if name != stem:
+                report(pos, f"Public type '{name}' must be declared in a file named {name}.java")
+        if len(public_types) > 1:
+            report(public_types[1][1], "More than one public top-level type in file")
+
+        for name, wildcard, pos in info.imports:
+            package = _package_of(name, wildcard)
+            if not package or package.startswith(JDK_PREFIXES):
+                continue
+            if package in project_types:
+                type_name = name[len(package) + 1:].split(".")[0]
+                if type_name and type_name not in project_types[package]:
+                    report(pos, f"Import '{name}': type {type_name} is not part of the generated sources")
+                continue
+            if check_index and package.startswith(INDEX_CHECKED_PREFIXES) and not index.has_package(package):
+                report(pos, f"Import '{name}': package {package} not found in the dependency index")
+    return issues
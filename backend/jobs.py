@@ -0,0 +1,153 @@
+# backend/jobs.py
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+
+
+class Job:
+    """
+    Ein asynchroner Generierungs-Job. Hält Status, alle Events (Stage-Übergänge)
+    und am Ende das Ergebnis der Pipeline. Beliebig viele Subscriber können die
+    Events über stream() live mitlesen.
+    """
+
+    def __init__(self, request):
+        self.id = uuid.uuid4().hex
+        self.request = request
+        self.prompt = request.prompt
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.steps = []
+        self.events = []
+        self.result = None
+        self.status_code = None
+        self._wakeup = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def publish(self, event_type: str, **data):
+        event = {"seq": len(self.events), "type": event_type, "job_id": self.id, "time": time.time(), **data}
+        self.events.append(event)
+        # Alle wartenden Subscriber wecken und ein neues Event für die nächste Runde anlegen
+        self._wakeup.set()
+        self._wakeup = asyncio.Event()
+
+    def add_step(self, step: str):
+        self.steps.append(step)
+        self.publish("step", step=step)
+
+    def add_file(self, path: str, size_bytes: int):
+        self.publish("file", path=path, size_bytes=size_bytes)
+
+    def set_status(self, status: str):
+        self.status = status
+        self.publish("status", status=status)
+
+    async def stream(self):
+        """
+        Liefert alle bisherigen und zukünftigen Events, bis der Job beendet ist.
+        """
+        idx = 0
+        while True:
+            wakeup = self._wakeup
+            while idx < len(self.events):
+                yield self.events[idx]
+                idx += 1
+            if self.done:
+                return
+            await wakeup.wait()
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "steps": list(self.steps),
+            "result": self.result,
+            "status_code": self.status_code,
+        }
+
+
+class JobManager:
+    """
+    Führt Jobs auf einem begrenzten Worker-Pool aus (max_workers gleichzeitige
+    Pipelines, weitere Jobs warten im Status "queued"). Beendete Jobs werden
+    höchstens ttl Sekunden und bis max_finished_jobs aufbewahrt, danach die ältesten verworfen.
+    Aufgeräumt wird beim Anlegen, beim Lesen und ttl Sekunden nach Ende jedes Jobs,
+    also auch auf einem sonst untätigen Server.
+
+    Konfiguration über Umgebungsvariablen:
+      JOB_WORKERS    gleichzeitige Pipelines (Default 2)
+      JOB_RETENTION  max. Anzahl aufbewahrter beendeter Jobs (Default 100)
+      JOB_TTL        Sekunden, die ein beendeter Job abrufbar bleibt (Default 3600)
+    """
+
+    def __init__(self, max_workers: int = None, max_finished_jobs: int = None, ttl: float = None):
+        self.max_workers = max_workers or int(os.getenv("JOB_WORKERS", "2"))
+        self.max_finished_jobs = max_finished_jobs or int(os.getenv("JOB_RETENTION", "100"))
+        self.ttl = ttl or float(os.getenv("JOB_TTL", "3600"))
+        self._slots = asyncio.Semaphore(self.max_workers)
+        self._jobs = OrderedDict()
+        self._tasks = set()
+
+    def submit(self, request, pipeline) -> Job:
+        """
+        Legt einen Job für den PluginRequest an und startet ihn im Hintergrund.
+        pipeline(request, on_step=..., on_file=...) muss eine Coroutine-Function sein,
+        die (payload, status_code) liefert.
+        """
+        job = Job(request)
+        self._jobs[job.id] = job
+        job.publish("status", status=job.status)
+        task = asyncio.create_task(self._run(job, pipeline))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self._evict_finished()
+        return job
+
+    def get(self, job_id: str):
+        self._evict_finished()
+        return self._jobs.get(job_id)
+
+    async def _run(self, job: Job, pipeline):
+        async with self._slots:
+            job.started_at = time.time()
+            job.set_status("running")
+            try:
+                payload, status_code = await pipeline(job.request, on_step=job.add_step, on_file=job.add_file)
+            except Exception as e:
+                payload, status_code = {"error": f"Unexpected pipeline error: {e}", "steps": job.steps}, 500
+            job.result = payload
+            job.status_code = status_code
+            job.finished_at = time.time()
+            job.publish("result", status_code=status_code, result=payload)
+            job.set_status("succeeded" if status_code < 400 else "failed")
+        self._evict_finished()
+        # Ohne weitere Requests würde der Job sonst nie verworfen
+        asyncio.get_running_loop().call_later(self.ttl, self._evict_finished)
+
+    def _evict_finished(self):
+        cutoff = time.time() - self.ttl
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        expired = {job_id for job_id in finished if self._jobs[job_id].finished_at <= cutoff}
+        expired.update(finished[:max(0, len(finished) - self.max_finished_jobs)])
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+def format_ndjson(event: dict) -> str:
+    return json.dumps(event) + "\n"
+
+
+def format_sse(event: dict) -> str:
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
@@ -0,0 +1,172 @@
+# backend/json_extract.py
+
+import json
+import re
+
+# Strukturzeichen außerhalb von Strings bzw. Sonderzeichen innerhalb von Strings
+_STRUCTURAL = re.compile(r'[{}\[\]"]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+_decoder = json.JSONDecoder()
+
+
+def _skip_ws(text: str, pos: int) -> int:
+    return _WHITESPACE.match(text, pos).end()
+
+
+def _decode_elements(text: str, pos: int) -> tuple[list, bool, json.JSONDecodeError]:
+    """
+    Dekodiert die Elemente eines Arrays ab pos (direkt hinter '[') einzeln mit raw_decode.
+    Gibt (elemente, vollständig, fehler) zurück; bei einem Fehler enthält elemente alle
+    Elemente davor.
+    """
+    items = []
+    pos = _skip_ws(text, pos)
+    if text.startswith("]", pos):
+        return items, True, None
+    while True:
+        try:
+            item, pos = _decoder.raw_decode(text, pos)
+        except json.JSONDecodeError as e:
+            return items, False, e
+        items.append(item)
+        pos = _skip_ws(text, pos)
+        if text.startswith(",", pos):
+            pos = _skip_ws(text, pos + 1)
+        elif text.startswith("]", pos):
+            return items, True, None
+        else:
+            return items, False, json.JSONDecodeError("Expecting ',' delimiter", text, pos)
+
+
+def extract_json_array(text: str) -> tuple[list, bool]:
+    """
+    Sucht das JSON-Array in einer LLM-Antwort und dekodiert es in einem Durchlauf mit dem
+    C-Decoder (raw_decode ab dem '['). Prosa und ```json-Fences davor und danach werden
+    ignoriert; ein '[' in der Prosa, auf das kein JSON-Wert folgt, wird übersprungen.
+
+    Gibt (elemente, vollständig) zurück. Ist die Antwort abgeschnitten oder ab einer Stelle
+    ungültig, enthält elemente alle vollständigen Elemente davor und vollständig ist False.
+    Wirft ValueError, wenn kein Array mit mindestens einem vollständigen Element gefunden wird.
+    """
+    start = text.find("[")
+    first_error = None
+    while start != -1:
+        try:
+            value, _ = _decoder.raw_decode(text, start)
+            if isinstance(value, list):
+                return value, True
+        except json.JSONDecodeError as e:
+            first_value = _skip_ws(text, start + 1)
+            if e.pos > first_value:
+                # Das Array beginnt hier, bricht aber später ab: vollständige Elemente behalten
+                items, complete, error = _decode_elements(text, first_value)
+                if items or complete:
+                    return items, complete
+                raise ValueError(f"Invalid JSON array: {error}")
+            first_error = first_error or e
+        start = text.find("[", start + 1)
+    raise ValueError(f"No JSON array found: {first_error}" if first_error else "No JSON array found")
+
+
+class IncrementalArrayParser:
+    """
+    Parst ein JSON-Array aus Objekten, das stückweise (z.B. Token für Token) eintrifft.
+    feed() liefert jedes Objekt auf oberster Array-Ebene, sobald seine schließende
+    Klammer angekommen ist. Text vor dem ersten '[' (Prosa, ```json-Fences) wird ignoriert.
+
+    Im Puffer bleibt nur das gerade offene Objekt, der Speicherbedarf richtet sich
+    also nach dem größten einzelnen Objekt und nicht nach der ganzen Antwort.
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._obj_start = None
+        self.objects_emitted = 0
+
+    @property
+    def finished(self) -> bool:
+        """True, sobald die schließende Klammer des Arrays gesehen wurde."""
+        return self._finished
+
+    @property
+    def pending(self) -> str:
+        """Der noch nicht abgeschlossene Rest (z.B. ein abgeschnittenes Objekt)."""
+        return self._buf
+
+    def feed(self, chunk: str) -> list:
+        if self._finished or not chunk:
+            return []
+        buf = self._buf + chunk
+        i = self._pos
+        if not self._started:
+            start = buf.find("[", i)
+            if start == -1:
+                # Nur Prosa bisher – nichts davon wird noch gebraucht
+                self._buf, self._pos = "", 0
+                return []
+            self._started = True
+            i = start + 1
+
+        objects = []
+        depth = self._depth
+        in_string = self._in_string
+        obj_start = self._obj_start
+        end = len(buf)
+        while i < end:
+            if in_string:
+                m = _STRING_SPECIAL.search(buf, i)
+                if not m:
+                    i = end
+                    break
+                if m.group() == "\\":
+                    if m.end() >= end:
+                        # Escape-Sequenz über die Chunk-Grenze: Backslash beim nächsten feed() neu lesen
+                        i = m.start()
+                        break
+                    i = m.end() + 1
+                    continue
+                in_string = False
+                i = m.end()
+                continue
+
+            m = _STRUCTURAL.search(buf, i)
+            if not m:
+                i = end
+                break
+            c = m.group()
+            i = m.end()
+            if c == '"':
+                in_string = True
+            elif c == "{" or c == "[":
+                if depth == 0 and c == "{":
+                    obj_start = m.start()
+                depth += 1
+            elif depth == 0:
+                # ']' auf Array-Ebene: das Array ist vollständig
+                self._finished = True
+                break
+            else:
+                depth -= 1
+                if depth == 0 and c == "}" and obj_start is not None:
+                    try:
+                        objects.append(json.loads(buf[obj_start:i]))
+                    except json.JSONDecodeError as e:
+                        raise ValueError(f"Invalid JSON object #{self.objects_emitted + len(objects)}: {e}")
+                    obj_start = None
+
+        # Bereits verarbeiteten Text verwerfen, nur das offene Objekt behalten
+        keep_from = obj_start if obj_start is not None else i
+        self._buf = "" if self._finished else buf[keep_from:]
+        self._pos = i - keep_from
+        self._obj_start = 0 if obj_start is not None else None
+        self._depth = depth
+        self._in_string = in_string
+        self.objects_emitted += len(objects)
+        return objects
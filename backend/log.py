@@ -0,0 +1,177 @@
+# backend/log.py
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+
+ROOT_LOGGER = "mirth_ai"
+
+# Rich-Styles der bisherigen Panels → Log-Level
+_STYLE_LEVELS = {"red": logging.ERROR, "bold red": logging.ERROR, "yellow": logging.WARNING}
+
+_setup_lock = threading.Lock()
+_listener = None
+_config = {}
+
+
+def _env_config() -> dict:
+    log_format = os.getenv("LOG_FORMAT") or ("dev" if sys.stderr.isatty() else "json")
+    default_level = "DEBUG" if log_format == "dev" else "INFO"
+    return {
+        "format": log_format,
+        "level": os.getenv("LOG_LEVEL", default_level).upper(),
+        "preview_chars": int(os.getenv("LOG_PREVIEW_CHARS", "500")),
+    }
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Eine JSON-Zeile pro Record: ts, level, logger, msg sowie content/files/fields, falls gesetzt.
+    Lange Inhalte werden auf preview_chars gekürzt. Tracebacks stehen bereits in msg
+    (QueueHandler.prepare formatiert sie im aufrufenden Thread).
+    """
+
+    def __init__(self, preview_chars: int = 500):
+        super().__init__()
+        self.preview_chars = preview_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        content = getattr(record, "content", None)
+        if content:
+            if len(content) > self.preview_chars:
+                content = content[:self.preview_chars] + f"... ({len(content)} chars)"
+            entry["content"] = content
+        files = getattr(record, "files", None)
+        if files is not None:
+            entry["files"] = files
+        entry.update(getattr(record, "fields", None) or {})
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RichDevHandler(logging.Handler):
+    """
+    Dev-Modus: rendert Panels und Trees wie bisher mit rich – im Thread des QueueListener,
+    nicht im Request.
+    """
+
+    def __init__(self, stream=None):
+        super().__init__()
+        from rich.console import Console
+        self.console = Console(file=stream) if stream is not None else Console(stderr=True)
+
+    def emit(self, record: logging.LogRecord):
+        from rich.panel import Panel
+        from rich.tree import Tree
+        try:
+            files = getattr(record, "files", None)
+            content = getattr(record, "content", None)
+            if files is not None:
+                tree = Tree(record.getMessage())
+                for label in files:
+                    tree.add(label)
+                self.console.print(tree)
+            elif content is not None:
+                style = getattr(record, "style", None) or "cyan"
+                self.console.print(Panel(content, title=record.getMessage(), style=style))
+            else:
+                self.console.print(f"[dim]{record.levelname}[/dim] {record.name}: {record.getMessage()}")
+        except Exception:
+            self.handleError(record)
+
+
+class PanelLogger(logging.LoggerAdapter):
+    """
+    Logger mit den bisherigen Panel-/Tree-Aufrufen. Inhalte werden nur erzeugt, wenn das
+    Level aktiv ist (content darf ein Callable sein), und nie im Request gerendert.
+    """
+
+    def process(self, msg, kwargs):
+        return msg, kwargs
+
+    def panel(self, title, content="", style="cyan", level: int = None):
+        level = level if level is not None else _STYLE_LEVELS.get(style, logging.INFO)
+        if not self.logger.isEnabledFor(level):
+            return
+        if callable(content):
+            content = content()
+        self.logger.log(level, title, extra={"content": str(content), "style": style})
+
+    def tree(self, title, labels, level: int = logging.DEBUG):
+        if not self.logger.isEnabledFor(level):
+            return
+        self.logger.log(level, title, extra={"files": [str(label) for label in labels]})
+
+    def event(self, msg, level: int = logging.INFO, **fields):
+        """
+        Strukturierter Record ohne Panel: fields landen im JSON als eigene Schlüssel.
+        """
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, msg, extra={"fields": fields})
+
+
+def setup_logging(force: bool = False, stream=None) -> dict:
+    """
+    Konfiguriert den gemeinsamen Logger einmalig: Aufrufer schreiben nur in eine Queue,
+    ein QueueListener-Thread formatiert und gibt aus.
+
+    Konfiguration über Umgebungsvariablen:
+      LOG_FORMAT         "json" (eine Zeile pro Record) oder "dev" (rich Panels/Trees);
+                         Default "dev" bei interaktivem Terminal, sonst "json"
+      LOG_LEVEL          Default DEBUG im Dev-Modus, sonst INFO (Previews und Trees sind DEBUG)
+      LOG_PREVIEW_CHARS  maximale Länge von Inhalten im JSON-Format (Default 500)
+    stream ersetzt stderr als Ausgabe (z.B. für Benchmarks).
+    """
+    global _listener, _config
+    with _setup_lock:
+        if _listener is not None and not force:
+            return _config
+        if _listener is not None:
+            _listener.stop()
+        _config = _env_config()
+        if _config["format"] == "dev":
+            handler = RichDevHandler(stream)
+            from rich.traceback import install
+            install(show_locals=False)
+        else:
+            handler = logging.StreamHandler(stream or sys.stderr)
+            handler.setFormatter(JsonFormatter(_config["preview_chars"]))
+
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger(ROOT_LOGGER)
+        root.handlers = [logging.handlers.QueueHandler(log_queue)]
+        root.setLevel(_config["level"])
+        root.propagate = False
+        _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=False)
+        _listener.start()
+        return _config
+
+
+def shutdown_logging():
+    """
+    Leert die Queue und beendet den Listener-Thread (beim Herunterfahren der App).
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def get_logger(name: str) -> PanelLogger:
+    setup_logging()
+    return PanelLogger(logging.getLogger(f"{ROOT_LOGGER}.{name}"), {})
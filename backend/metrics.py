@@ -0,0 +1,248 @@
+# backend/metrics.py
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from backend import tracing
+
+# Sekunden: von schnellen lokalen Schritten (Precheck, Parsing) bis zu langen LLM-Calls und Maven-Builds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000)
+
+# USD pro 1 Mio. Tokens (prompt, completion); ergänzbar/überschreibbar über LLM_PRICES
+DEFAULT_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+}
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra: str = "") -> str:
+    parts = [f'{name}="{_escape_label(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [counts pro Bucket..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(round(series[-2], 6))}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Minimaler, thread-sicherer Ersatz für prometheus_client: Counter und Histogramme
+    im Prometheus-Textformat (version 0.0.4), ohne zusätzliche Abhängigkeit.
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+REQUEST_SECONDS = REGISTRY.histogram(
+    "mirth_ai_request_duration_seconds", "End-to-end duration of /generate pipelines.", ["mode", "status"]
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "mirth_ai_stage_duration_seconds", "Duration of individual pipeline stages (stages may nest).", ["stage"]
+)
+LLM_TOKENS = REGISTRY.histogram(
+    "mirth_ai_llm_tokens", "Tokens per LLM call.", ["agent", "model", "kind"], buckets=TOKEN_BUCKETS
+)
+LLM_COST = REGISTRY.counter(
+    "mirth_ai_llm_cost_usd_total", "Estimated LLM cost in USD (see LLM_PRICES).", ["agent", "model"]
+)
+
+
+def load_prices() -> dict:
+    """
+    Preistabelle USD pro 1 Mio. Tokens. LLM_PRICES (JSON) ergänzt/überschreibt die Defaults:
+    {"<model>": {"prompt": 2.5, "completion": 10.0}}
+    """
+    prices = dict(DEFAULT_PRICES)
+    if os.getenv("LLM_PRICES"):
+        for model, price in json.loads(os.getenv("LLM_PRICES")).items():
+            prices[model] = (float(price.get("prompt", 0)), float(price.get("completion", 0)))
+    return prices
+
+
+PRICES = load_prices()
+
+
+class RequestMetrics:
+    """
+    Sammelt Stage-Zeiten und LLM-Verbrauch eines Requests für den timings-Block der Antwort.
+    Stages, die mehrfach laufen (z.B. parallele Datei-Calls), werden aufsummiert.
+    """
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.llm = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+        self._lock = threading.Lock()
+
+    def add_stage(self, name: str, seconds: float):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def add_llm(self, prompt_tokens: int, completion_tokens: int, cost: float):
+        with self._lock:
+            self.llm["calls"] += 1
+            self.llm["prompt_tokens"] += prompt_tokens
+            self.llm["completion_tokens"] += completion_tokens
+            self.llm["cost_usd"] += cost
+
+    def finish(self, status: int) -> dict:
+        total = time.perf_counter() - self.started
+        REQUEST_SECONDS.observe(total, mode=self.mode, status=status)
+        with self._lock:
+            return {
+                "total": round(total, 4),
+                "stages": {name: round(seconds, 4) for name, seconds in self.stages.items()},
+                "llm": {**self.llm, "cost_usd": round(self.llm["cost_usd"], 6)},
+            }
+
+
+_current = ContextVar("request_metrics", default=None)
+
+
+@contextmanager
+def request_scope(mode: str):
+    """
+    Macht einen RequestMetrics für alle stage()- und record_llm_usage()-Aufrufe im selben
+    asyncio-Kontext (inkl. daraus gestarteter Tasks und run_blocking-Threads) sichtbar.
+    """
+    metrics = RequestMetrics(mode)
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Misst einen Pipeline-Schritt: Histogramm für /metrics plus Eintrag im aktuellen Request
+    und, falls der Request getraced wird, ein gleichnamiger Span.
+    """
+    start = time.perf_counter()
+    try:
+        with tracing.span(name):
+            yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.add_stage(name, elapsed)
+
+
+def token_usage(message) -> tuple[int, int]:
+    """
+    (prompt_tokens, completion_tokens) aus einer LangChain-Antwort; (0, 0), wenn das Backend
+    keine Usage liefert.
+    """
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        return int(usage.get("input_tokens") or 0), int(usage.get("output_tokens") or 0)
+    token_usage_meta = (getattr(message, "response_metadata", None) or {}).get("token_usage") or {}
+    return int(token_usage_meta.get("prompt_tokens") or 0), int(token_usage_meta.get("completion_tokens") or 0)
+
+
+def record_llm_usage(agent: str, model: str, message):
+    prompt_tokens, completion_tokens = token_usage(message)
+    prompt_price, completion_price = PRICES.get(model, (0.0, 0.0))
+    cost = (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+    LLM_TOKENS.observe(prompt_tokens, agent=agent, model=model, kind="prompt")
+    LLM_TOKENS.observe(completion_tokens, agent=agent, model=model, kind="completion")
+    LLM_COST.inc(cost, agent=agent, model=model)
+    tracing.set_attributes(**{
+        "gen_ai.request.model": model,
+        "gen_ai.usage.input_tokens": prompt_tokens,
+        "gen_ai.usage.output_tokens": completion_tokens,
+    })
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add_llm(prompt_tokens, completion_tokens, cost)
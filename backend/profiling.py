@@ -0,0 +1,172 @@
+# backend/profiling.py
+
+import cProfile
+import marshal
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+PROFILE_MODES = ("sample", "cprofile")
+
+
+class SamplingProfiler:
+    """
+    Stack-Sampler: nimmt alle interval Sekunden die Stacks des Event-Loop-Threads und der
+    Worker-Threads (run_blocking, BulkFileWriter) auf. Ergebnis im "folded"-Format
+    (eine Zeile "thread;frame;frame count"), lesbar mit speedscope oder flamegraph.pl.
+    Gesampelt wird der ganze Prozess: gleichzeitige Requests erscheinen mit im Profil.
+    """
+
+    def __init__(self, interval: float, thread_prefixes=("agent-worker", "file-writer")):
+        self.interval = interval
+        self.thread_prefixes = thread_prefixes
+        self.samples = Counter()
+        self._main_ident = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _wanted_threads(self) -> dict:
+        names = {self._main_ident: "event-loop"}
+        for thread in threading.enumerate():
+            if thread.name.startswith(self.thread_prefixes):
+                names[thread.ident] = thread.name
+        return names
+
+    def _run(self):
+        names = self._wanted_threads()
+        next_refresh = time.monotonic() + 0.5
+        while not self._stop.wait(self.interval):
+            if time.monotonic() >= next_refresh:
+                names = self._wanted_threads()
+                next_refresh = time.monotonic() + 0.5
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident)
+                if name is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(name)
+                self.samples[";".join(reversed(stack))] += 1
+
+    def dump(self) -> bytes:
+        lines = [f"{stack} {count}" for stack, count in self.samples.most_common()]
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class ProfileStore:
+    """
+    Die letzten fertigen Profile im Speicher, abrufbar über GET /profiles/{profile_id}.
+    """
+
+    def __init__(self, keep: int):
+        self.keep = keep
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: dict):
+        with self._lock:
+            self._profiles[profile["id"]] = profile
+            while len(self._profiles) > self.keep:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str):
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+
+class RequestProfiler:
+    """
+    Profiling eines einzelnen Requests, per Header angefordert.
+
+    Konfiguration über Umgebungsvariablen:
+      PROFILING                   "0" schaltet Profiling per Header ab (Default "1")
+      PROFILE_TOKEN               falls gesetzt, muss der Request es in X-Profile-Token mitschicken
+      PROFILE_SAMPLE_INTERVAL_MS  Sampling-Intervall im Modus "sample" (Default 5)
+      PROFILE_KEEP                Anzahl Profile im Speicher (Default 20)
+    Es läuft immer höchstens ein Profil gleichzeitig; weitere Anfragen bekommen einen Fehler
+    im profile-Block statt eines Profils.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("PROFILING", "1") == "1"
+        self.token = os.getenv("PROFILE_TOKEN") or None
+        self.interval = int(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5")) / 1000
+        self.store = ProfileStore(int(os.getenv("PROFILE_KEEP", "20")))
+        self._active = threading.Lock()
+
+    def check(self, mode: str, token: str = None):
+        """
+        Normalisierter Modus oder Fehlertext für den Header-Wert.
+        """
+        mode = (mode or "").strip().lower()
+        if mode in ("1", "true", "yes"):
+            mode = "sample"
+        if not self.enabled:
+            return None, "profiling disabled (PROFILING=0)"
+        if self.token and token != self.token:
+            return None, "invalid or missing X-Profile-Token"
+        if mode not in PROFILE_MODES:
+            return None, f"unknown profile mode {mode!r}, expected one of {', '.join(PROFILE_MODES)}"
+        return mode, None
+
+    @contextmanager
+    def profile(self, mode: str, token: str = None, trace_id: str = None):
+        """
+        Profiliert den umschlossenen Block. Liefert den profile-Block für die Antwort
+        ({"id", "mode", "url"} bzw. {"error"}); id und url sind erst nach dem Block abrufbar.
+        "cprofile" misst nur den Event-Loop-Thread (pstats-Datei), "sample" auch die Worker-Threads.
+        """
+        mode, error = self.check(mode, token)
+        if error is None and not self._active.acquire(blocking=False):
+            error = "another profile is running, try again later"
+        if error is not None:
+            yield {"error": error}
+            return
+        profile_id = uuid.uuid4().hex
+        info = {"id": profile_id, "mode": mode, "url": f"/profiles/{profile_id}"}
+        started = time.perf_counter()
+        try:
+            if mode == "cprofile":
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    yield info
+                finally:
+                    profiler.disable()
+                profiler.create_stats()
+                data, filename, media_type = marshal.dumps(profiler.stats), f"profile-{profile_id}.prof", "application/octet-stream"
+            else:
+                sampler = SamplingProfiler(self.interval)
+                sampler.start()
+                try:
+                    yield info
+                finally:
+                    sampler.stop()
+                data, filename, media_type = sampler.dump(), f"profile-{profile_id}.folded", "text/plain; charset=utf-8"
+        finally:
+            self._active.release()
+        self.store.add({
+            **info,
+            "trace_id": trace_id,
+            "seconds": round(time.perf_counter() - started, 4),
+            "data": data,
+            "filename": filename,
+            "media_type": media_type,
+        })
+
+
+PROFILER = RequestProfiler()
@@ -0,0 +1,120 @@
+# backend/registry.py
+
+import asyncio
+import os
+
+import httpx
+from langchain_openai import ChatOpenAI
+
+from backend.agents.PromptAnalyzerAgent import PromptAnalyzerAgent
+from backend.agents.CodeAgent import CodeAgent
+from backend.agents.TestingAgent import TestingAgent
+from backend.agents.DependencyAgent import DependencyAgent
+from backend.cache import MetadataCache, GenerationCache
+from backend.build_executor import BuildExecutor
+from backend.dependency_index import DependencyIndex
+from backend.scaffold import ScaffoldLibrary
+from backend.log import get_logger
+
+logger = get_logger("AgentRegistry")
+
+
+class AgentRegistry:
+    """
+    Hält alle Agents und LLM-Clients für die gesamte Laufzeit der App.
+    Alle ChatOpenAI-Instanzen teilen sich einen Keep-Alive-Connection-Pool
+    (sync + async), statt pro Request neue Verbindungen und TLS-Handshakes aufzubauen.
+
+    Pool-Größen über Umgebungsvariablen:
+      LLM_MAX_CONNECTIONS   max. gleichzeitige Verbindungen (Default 20)
+      LLM_MAX_KEEPALIVE     max. offene Keep-Alive-Verbindungen (Default 10)
+      LLM_KEEPALIVE_EXPIRY  Sekunden bis eine freie Verbindung geschlossen wird (Default 120)
+    """
+
+    def __init__(self, model_name: str = None, temperature: float = 0.0,
+                 max_connections: int = None, max_keepalive: int = None, keepalive_expiry: float = None):
+        self.model_name = model_name or os.getenv("LLM_MODEL", "gpt-4o")
+        self.temperature = temperature
+        self.limits = httpx.Limits(
+            max_connections=max_connections or int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=max_keepalive or int(os.getenv("LLM_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=keepalive_expiry or float(os.getenv("LLM_KEEPALIVE_EXPIRY", "120")),
+        )
+        self.http_client = httpx.Client(limits=self.limits)
+        self.http_async_client = httpx.AsyncClient(limits=self.limits)
+        self._llms = {}
+
+        self.metadata_cache = MetadataCache() if os.getenv("METADATA_CACHE", "1") == "1" else None
+        self.analyzer = PromptAnalyzerAgent(llm=self.llm(), cache=self.metadata_cache)
+        self.generation_cache = GenerationCache() if os.getenv("GENERATION_CACHE", "1") == "1" else None
+        self.code_agent = CodeAgent(llm=self.llm(), generation_cache=self.generation_cache)
+        self.build_executor = BuildExecutor() if os.getenv("BUILD_EXECUTOR", "1") == "1" else None
+        self.testing_agent = TestingAgent(build_executor=self.build_executor)
+        self.dependency_index = DependencyIndex() if os.getenv("DEPENDENCY_INDEX", "1") == "1" else None
+        self.dependency_agent = DependencyAgent(index=self.dependency_index)
+        # Lokale Templates für pom.xml, plugin.xml und Assembly-Deskriptor (Modus "scaffold")
+        self.scaffolds = ScaffoldLibrary()
+        self._index_task = None
+
+    def llm(self, model_name: str = None, temperature: float = None) -> ChatOpenAI:
+        """
+        Liefert den geteilten ChatOpenAI-Client für (model, temperature).
+        """
+        key = (model_name or self.model_name, self.temperature if temperature is None else temperature)
+        if key not in self._llms:
+            self._llms[key] = ChatOpenAI(
+                model=key[0],
+                temperature=key[1],
+                http_client=self.http_client,
+                http_async_client=self.http_async_client,
+                # Token-Usage auch bei Streaming-Calls (für backend/metrics.py)
+                stream_usage=True,
+            )
+        return self._llms[key]
+
+    async def warm_up(self, timeout: float = 10.0) -> bool:
+        """
+        Baut beim Start eine Verbindung zum LLM-Endpoint auf (DNS, TCP, TLS),
+        damit der erste echte Request sie bereits im Pool vorfindet.
+        """
+        try:
+            await asyncio.wait_for(self.llm().root_async_client.models.list(), timeout=timeout)
+            return True
+        except Exception as e:
+            logger.warning(f"Warm-up failed: {e}")
+            return False
+
+    def start_dependency_index(self):
+        """
+        Indexiert und installiert die JARs aus MIRTH_HOME/server-lib im Hintergrund.
+        """
+        if self.dependency_index is not None and self.dependency_index.jar_dirs:
+            self._index_task = asyncio.create_task(asyncio.to_thread(self.dependency_index.build))
+            self._index_task.add_done_callback(_log_index_failure)
+
+    def cache_stats(self) -> dict:
+        return {
+            "metadata": self.metadata_cache.get_stats() if self.metadata_cache else None,
+            "generation": self.generation_cache.get_stats() if self.generation_cache else None,
+            "dependencies": self.dependency_agent.get_stats(),
+            "dependency_index": self.dependency_index.get_stats() if self.dependency_index else None,
+        }
+
+    async def aclose(self):
+        if self._index_task is not None:
+            # Der Build-Thread selbst läuft weiter; nur nicht mehr auf ihn warten
+            self._index_task.cancel()
+            try:
+                await self._index_task
+            except (asyncio.CancelledError, Exception):
+                pass  # Fehler hat _log_index_failure bereits protokolliert
+            self._index_task = None
+        await self.http_async_client.aclose()
+        self.http_client.close()
+        if self.metadata_cache:
+            self.metadata_cache.close()
+
+
+def _log_index_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Dependency index build failed: {task.exception()!r}", exc_info=task.exception())
@@ -0,0 +1,195 @@
+# backend/rules.py
+
+import bisect
+import json
+import os
+import re
+
+# Dateiarten, für die Regeln definiert werden können
+JAVA = "java"
+POM = "pom"
+PLUGIN_XML = "plugin_xml"
+
+# dcm4che-Netzwerk-APIs, die es in der von Mirth ausgelieferten dcm4che-Version nicht gibt
+DICOM_FORBIDDEN_NAMES = [
+    "org.dcm4che3.net.service.ServiceClassProvider",
+    "org.dcm4che3.net.service.FindSCU",
+    "org.dcm4che3.net.service.FindSCP",
+    "org.dcm4che3.net.Association",
+    "org.dcm4che3.net.PDVInputStream",
+    "org.dcm4che3.net.Dimse",
+    "org.dcm4che3.net.PresentationContext",
+    "ServiceClassProvider",
+    "FindSCU",
+    "FindSCP",
+    "Association",
+    "PDVInputStream",
+    "Dimse",
+    "PresentationContext",
+    "Commands",
+]
+
+# Eingebaute Regelsätze: Name -> Dateiart -> verbotene Bezeichner
+DEFAULT_RULE_SETS = {
+    "dicom": {
+        JAVA: DICOM_FORBIDDEN_NAMES,
+        PLUGIN_XML: DICOM_FORBIDDEN_NAMES,
+    },
+}
+
+# Bereiche, in denen nicht gesucht wird: Kommentare und String-/Char-Literale bzw. XML-Kommentare
+_SKIP = {
+    JAVA: r'//[^\n]*|/\*.*?\*/|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'',
+    POM: r"<!--.*?-->",
+    PLUGIN_XML: r"<!--.*?-->",
+}
+
+
+def file_kind(path: str):
+    """
+    Dateiart für die Regelauswahl, None für Dateien ohne Regeln.
+    """
+    name = path.replace("\\", "/").rsplit("/", 1)[-1]
+    if name.endswith(".java"):
+        return JAVA
+    if name == "pom.xml":
+        return POM
+    if name == "plugin.xml":
+        return PLUGIN_XML
+    return None
+
+
+def trie_regex(words) -> str:
+    """
+    Regex-Alternation über einen Präfixbaum der Wörter (z.B. "FindSC(?:P|U)"): die Regex-Engine
+    verfolgt gemeinsame Präfixe nur einmal, ähnlich einem Aho-Corasick-Automaten.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class RuleSet:
+    """
+    Alle verbotenen Bezeichner einer Dateiart, einmal zu einer Trie-Regex kompiliert.
+    Ein Treffer zählt nur an Token-Grenzen (nicht in "MyAssociation") und außerhalb von
+    Kommentaren und String-Literalen. Beide Scans sind linear; Kommentar-/String-Bereiche
+    werden nur bestimmt, wenn es überhaupt Kandidaten gibt (der Normalfall hat keine).
+    """
+
+    def __init__(self, names_by_kind: dict):
+        self.names_by_kind = {kind: list(names) for kind, names in names_by_kind.items() if names}
+        self._patterns = {}
+        for kind, names in self.names_by_kind.items():
+            # Ohne Lookbehind am Anfang kann die Regex-Engine per Anfangszeichen vorfiltern;
+            # die linke Token-Grenze wird deshalb erst bei den (seltenen) Kandidaten geprüft
+            self._patterns[kind] = (
+                re.compile(rf"{trie_regex(set(names))}(?![\w$])"),
+                re.compile(_SKIP[kind], re.DOTALL),
+            )
+
+    def find(self, content: str, kind: str) -> list:
+        """
+        Alle Treffer als Liste von (zeilennummer_0_basiert, bezeichner).
+        """
+        patterns = self._patterns.get(kind)
+        if patterns is None:
+            return []
+        hit_pattern, skip_pattern = patterns
+        candidates = [
+            (m.start(), m.group()) for m in hit_pattern.finditer(content)
+            if m.start() == 0 or not _is_ident_char(content[m.start() - 1])
+        ]
+        if not candidates:
+            return []
+
+        skip_starts = []
+        skip_ends = []
+        for m in skip_pattern.finditer(content):
+            skip_starts.append(m.start())
+            skip_ends.append(m.end())
+
+        hits = []
+        line = 0
+        last = 0
+        for pos, name in candidates:
+            i = bisect.bisect_right(skip_starts, pos) - 1
+            if i >= 0 and pos < skip_ends[i]:
+                continue
+            line += content.count("\n", last, pos)
+            last = pos
+            hits.append((line, name))
+        return hits
+
+    def scrub(self, content: str, kind: str) -> tuple[str, list]:
+        """
+        Entfernt in Java-Dateien alle Zeilen mit Treffern. Gibt (bereinigter Inhalt, Treffer) zurück.
+        XML (pom, plugin_xml) bleibt unverändert: eine gelöschte Zeile könnte ein öffnendes Tag
+        ohne sein schließendes entfernen; die Treffer werden nur gemeldet.
+        Zeilen werden wie in find() nur an "\n" getrennt, "\r\n" und andere Steuerzeichen bleiben erhalten.
+        """
+        hits = self.find(content, kind)
+        if not hits or kind != JAVA:
+            return content, hits
+        drop = {line for line, _ in hits}
+        lines = content.split("\n")
+        return "\n".join(line for i, line in enumerate(lines) if i not in drop), hits
+
+
+def _is_ident_char(ch: str) -> bool:
+    return ch.isalnum() or ch in "_$"
+
+
+def load_rule_sets(path: str = None) -> dict:
+    """
+    Eingebaute Regelsätze, ergänzt bzw. überschrieben durch eine JSON-Datei
+    (FORBIDDEN_RULES_FILE) der Form {"<plugin_type>": {"java": [...], "pom": [...], "plugin_xml": [...]}}.
+    Schlüssel sind "dicom" oder ein plugin_type in Kleinbuchstaben. Unbekannte Dateiarten
+    oder falsch geformte Einträge ergeben einen ValueError mit Datei und Schlüssel.
+    """
+    definitions = {name: dict(kinds) for name, kinds in DEFAULT_RULE_SETS.items()}
+    path = path or os.getenv("FORBIDDEN_RULES_FILE")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for name, kinds in json.load(f).items():
+                definitions[name.lower()] = _validate_kinds(path, name, kinds)
+    return {name: RuleSet(kinds) for name, kinds in definitions.items()}
+
+
+def _validate_kinds(path: str, name: str, kinds) -> dict:
+    if not isinstance(kinds, dict):
+        raise ValueError(f"{path}: rule set {name!r} must be an object of kind -> list of names")
+    for kind, names in kinds.items():
+        if kind not in _SKIP:
+            raise ValueError(
+                f"{path}: unknown kind {kind!r} in rule set {name!r}, expected one of {', '.join(sorted(_SKIP))}"
+            )
+        if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+            raise ValueError(f"{path}: {name}.{kind} must be a list of strings")
+    return kinds
+
+
+RULE_SETS = load_rule_sets()
+
+
+def rule_set_for(is_dicom: bool = False, plugin_type: str = None):
+    """
+    Regelsatz für ein Plugin: "dicom" für DICOM-Plugins, sonst der des plugin_type (falls definiert).
+    """
+    if is_dicom:
+        return RULE_SETS.get("dicom")
+    if plugin_type:
+        return RULE_SETS.get(str(plugin_type).lower())
+    return None
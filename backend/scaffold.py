@@ -0,0 +1,168 @@
+# backend/scaffold.py
+
+import json
+import os
+import re
+import string
+from xml.sax.saxutils import escape
+
+from backend.workspace import GENERATED_PREFIX
+
+BUILTIN_SCAFFOLD_DIR = os.path.join(os.path.dirname(__file__), "scaffolds")
+
+
+class ScaffoldTemplate(string.Template):
+    # "@{name}" statt "${name}", damit Maven-Properties wie ${project.basedir} unverändert bleiben
+    delimiter = "@"
+
+
+def _version_key(version: str) -> tuple:
+    return tuple(int(part) for part in re.findall(r"\d+", str(version))[:3])
+
+
+class Scaffold:
+    """
+    Ein Satz vorkompilierter Templates für (plugin_type, ab Mirth-Version).
+
+    scaffold.json im Verzeichnis beschreibt:
+      files           Zielpfad (relativ zu GENERATED_PLUGIN/) → Template-Datei, immer gerendert
+      assembly_files  wie files, nur bei use_assembly
+      fragments       Platzhalter → Template-Datei, nur bei use_assembly gerendert, sonst leer
+      dependencies    Name aus provided_dependencies → {"groupId", "artifactId"} (Version = mirth_version)
+      dicom           {"dependencies": [...], "repositories": [...]} für DICOM-Plugins
+      values          zusätzliche feste Platzhalter (z.B. java_version)
+    """
+
+    def __init__(self, plugin_type: str, version: str, directory: str):
+        self.plugin_type = plugin_type
+        self.version = version
+        self.name = f"{plugin_type}/{version}"
+        with open(os.path.join(directory, "scaffold.json"), encoding="utf-8") as f:
+            self.config = json.load(f)
+        self.templates = {}
+        for section in ("files", "assembly_files", "fragments"):
+            for target, template_name in self.config.get(section, {}).items():
+                with open(os.path.join(directory, template_name), encoding="utf-8") as f:
+                    text = f.read()
+                self.templates[(section, target)] = ScaffoldTemplate(text)
+
+    def values(self, meta: dict) -> dict:
+        """
+        Platzhalterwerte aus den Metadaten des PromptAnalyzerAgent, XML-escaped.
+        """
+        package = meta.get("package") or "com.example.plugin"
+        values = {key: escape(str(value)) for key, value in self.config.get("values", {}).items()}
+        values.update({
+            "plugin_name": escape(str(meta.get("plugin_name") or meta.get("main_class_name") or "MyPlugin")),
+            "plugin_description": escape(str(meta.get("plugin_description") or "")),
+            "main_class_name": escape(str(meta.get("main_class_name") or "MyPlugin")),
+            "package": escape(package),
+            "plugin_id": escape(str(meta.get("plugin_id") or "my-plugin")),
+            "mirth_version": escape(str(meta.get("mirth_version") or self.version)),
+            "dependencies": self._dependencies_xml(meta),
+            "repositories": self._repositories_xml(meta),
+        })
+        return values
+
+    def _dependencies_xml(self, meta: dict) -> str:
+        known = self.config.get("dependencies", {})
+        mirth_version = str(meta.get("mirth_version") or self.version)
+        deps = []
+        for name in meta.get("provided_dependencies") or []:
+            coords = known.get(name)
+            if coords is not None:
+                deps.append({**coords, "version": mirth_version, "scope": "provided"})
+        if meta.get("dicom_enabled"):
+            deps += self.config.get("dicom", {}).get("dependencies", [])
+        return "".join(
+            "\n        <dependency>"
+            f"\n            <groupId>{escape(d['groupId'])}</groupId>"
+            f"\n            <artifactId>{escape(d['artifactId'])}</artifactId>"
+            f"\n            <version>{escape(d['version'])}</version>"
+            + (f"\n            <scope>{escape(d['scope'])}</scope>" if d.get("scope") else "")
+            + "\n        </dependency>"
+            for d in deps
+        )
+
+    def _repositories_xml(self, meta: dict) -> str:
+        if not meta.get("dicom_enabled"):
+            return ""
+        repos = self.config.get("dicom", {}).get("repositories", [])
+        if not repos:
+            return ""
+        return "\n    <repositories>" + "".join(
+            "\n        <repository>"
+            f"\n            <id>{escape(r['id'])}</id>"
+            f"\n            <url>{escape(r['url'])}</url>"
+            "\n        </repository>"
+            for r in repos
+        ) + "\n    </repositories>"
+
+    def render(self, meta: dict) -> list:
+        """
+        Rendert alle Dateien des Scaffolds als Liste von {"path", "content"} unter GENERATED_PLUGIN/.
+        """
+        values = self.values(meta)
+        use_assembly = bool(meta.get("use_assembly"))
+        for (section, target), template in self.templates.items():
+            if section == "fragments":
+                values[target] = template.substitute(values) if use_assembly else ""
+        files = []
+        for (section, target), template in self.templates.items():
+            if section == "files" or (section == "assembly_files" and use_assembly):
+                files.append({"path": GENERATED_PREFIX + target, "content": template.substitute(values)})
+        return files
+
+
+class ScaffoldLibrary:
+    """
+    Alle Scaffolds unter <root>/<plugin_type>/<mirth_version>/, beim Start einmal geladen.
+    Ausgewählt wird die höchste Scaffold-Version ≤ der angefragten Mirth-Version
+    (sonst die niedrigste vorhandene); ohne Scaffold für den plugin_type gibt es None.
+
+    Konfiguration über Umgebungsvariablen:
+      SCAFFOLD_DIRS  weitere Scaffold-Verzeichnisse, getrennt durch os.pathsep; sie überschreiben
+                     die eingebauten aus backend/scaffolds bei gleichem Typ und gleicher Version
+    """
+
+    def __init__(self, roots: list = None):
+        if roots is None:
+            roots = [BUILTIN_SCAFFOLD_DIR] + [d for d in os.getenv("SCAFFOLD_DIRS", "").split(os.pathsep) if d]
+        self.roots = roots
+        self._scaffolds = {}  # plugin_type -> {version_key: Scaffold}
+        for root in roots:
+            if not os.path.isdir(root):
+                continue
+            for plugin_type in sorted(os.listdir(root)):
+                type_dir = os.path.join(root, plugin_type)
+                if not os.path.isdir(type_dir):
+                    continue
+                for version in sorted(os.listdir(type_dir)):
+                    directory = os.path.join(type_dir, version)
+                    if os.path.isfile(os.path.join(directory, "scaffold.json")):
+                        self._scaffolds.setdefault(plugin_type.lower(), {})[_version_key(version)] = Scaffold(
+                            plugin_type.lower(), version, directory
+                        )
+
+    def select(self, plugin_type: str, mirth_version: str):
+        versions = self._scaffolds.get(str(plugin_type or "").lower())
+        if not versions:
+            return None
+        wanted = _version_key(mirth_version or "")
+        candidates = [key for key in versions if key <= wanted]
+        return versions[max(candidates) if candidates else min(versions)]
+
+    def render(self, meta: dict):
+        """
+        Gibt (scaffold, files) für die Metadaten zurück, (None, None) ohne passendes Scaffold.
+        """
+        scaffold = self.select(meta.get("plugin_type"), meta.get("mirth_version"))
+        if scaffold is None:
+            return None, None
+        return scaffold, scaffold.render(meta)
+
+    def get_stats(self) -> dict:
+        return {
+            plugin_type: sorted(s.version for s in versions.values())
+            for plugin_type, versions in self._scaffolds.items()
+        }
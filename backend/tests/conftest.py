@@ -0,0 +1,10 @@
+# backend/tests/conftest.py
+#
+# Tests laufen aus dem Repository-Root: python -m pytest backend/tests
+
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
@@ -0,0 +1,91 @@
+# backend/tests/test_build_executor.py
+
+import asyncio
+import os
+
+import pytest
+
+from backend.benchmarks.fake_mvn import install_fake_maven
+from backend.build_executor import MANIFEST_NAME, BuildExecutor
+
+
+def write(project, rel, content):
+    path = os.path.join(project, *rel.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+@pytest.fixture
+def project(tmp_path):
+    project = str(tmp_path / "project")
+    write(project, "pom.xml", "<project/>")
+    write(project, "src/main/java/A.java", "class A {}")
+    return project
+
+
+@pytest.fixture
+def executor(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_MVN_SECONDS", "0")
+    monkeypatch.setenv("FAKE_MVN_EXIT_CODE", "0")
+    monkeypatch.setenv("FAKE_MVN_FAIL_RATE", "0")
+    return BuildExecutor(maven_cmd=install_fake_maven(str(tmp_path)), workers=2,
+                         local_repo=str(tmp_path / "m2"))
+
+
+def built(executor, project):
+    # Stand nach einem erfolgreichen Build: target/ und Manifest des aktuellen Snapshots
+    _, _, snapshot = executor.plan(project)
+    os.makedirs(os.path.join(project, "target"), exist_ok=True)
+    executor._write_manifest(project, snapshot)
+
+
+def test_plan_without_previous_build(executor, project):
+    needs_clean, reason, snapshot = executor.plan(project)
+    assert (needs_clean, reason) == (True, "no previous build")
+    assert set(snapshot) == {"pom.xml", "src/main/java/A.java"}
+
+
+def test_plan_incremental_after_source_change(executor, project):
+    built(executor, project)
+    write(project, "src/main/java/A.java", "class A { int x; }")
+    write(project, "src/main/java/B.java", "class B {}")
+    assert executor.plan(project)[:2] == (False, "incremental, 2 files changed")
+
+
+def test_plan_clean_when_pom_changes(executor, project):
+    built(executor, project)
+    write(project, "pom.xml", "<project><x/></project>")
+    assert executor.plan(project)[:2] == (True, "pom.xml changed")
+
+
+def test_plan_clean_when_files_removed(executor, project):
+    built(executor, project)
+    os.remove(os.path.join(project, "src", "main", "java", "A.java"))
+    assert executor.plan(project)[:2] == (True, "1 files removed")
+
+
+def test_plan_ignores_target(executor, project):
+    built(executor, project)
+    write(project, "target/classes/A.class", "bytes")
+    assert executor.plan(project)[:2] == (False, "incremental, 0 files changed")
+
+
+def test_command_passes_local_repo_and_offline(tmp_path):
+    executor = BuildExecutor(maven_cmd="mvn", offline=True, local_repo=str(tmp_path))
+    assert executor.command(["test"]) == ["mvn", "-B", "-o", f"-Dmaven.repo.local={tmp_path}", "test"]
+
+
+def test_run_is_incremental_and_releases_lock(executor, project):
+    async def scenario():
+        first = await executor.run(project, ["test"])
+        second = await executor.run(project, ["test"])
+        forced = await executor.run(project, ["test"], force_clean=True)
+        return first, second, forced
+
+    first, second, forced = asyncio.run(scenario())
+    assert first["returncode"] == 0 and first["goals"] == ["clean", "test"]
+    assert second["goals"] == ["test"] and second["incremental"]
+    assert forced["goals"] == ["clean", "test"] and forced["plan_reason"] == "forced"
+    assert os.path.exists(os.path.join(project, "target", MANIFEST_NAME))
+    assert len(executor._dir_locks) == 0
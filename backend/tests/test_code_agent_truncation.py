@@ -0,0 +1,88 @@
+# backend/tests/test_code_agent_truncation.py
+#
+# Abgeschnittene LLM-Antworten dürfen nicht im GenerationCache landen.
+
+import asyncio
+import json
+
+import pytest
+
+from backend.agents.CodeAgent import CodeAgent, TruncatedResponseError
+from backend.cache import GenerationCache
+
+META = {"plugin_type": "connector", "package": "com.example.plugin", "dicom_enabled": False}
+FILES = [
+    {"path": "GENERATED_PLUGIN/pom.xml", "content": "<project/>"},
+    {"path": "GENERATED_PLUGIN/src/main/java/com/example/plugin/A.java",
+     "content": "package com.example.plugin;\n\npublic class A { int a; }\n"},
+    {"path": "GENERATED_PLUGIN/src/main/java/com/example/plugin/B.java",
+     "content": "package com.example.plugin;\n\npublic class B { int b; }\n"},
+]
+COMPLETE = json.dumps(FILES)
+TRUNCATED = COMPLETE[:COMPLETE.index("public class B")]
+
+
+class Message:
+    def __init__(self, content):
+        self.content = content
+        self.usage_metadata = None
+        self.response_metadata = {}
+
+
+class FakeLLM:
+    model_name = "fake-model"
+    temperature = 0.0
+
+    def __init__(self, response: str):
+        self.response = response
+
+    def invoke(self, _):
+        return Message(self.response)
+
+    async def ainvoke(self, _):
+        return Message(self.response)
+
+    async def astream(self, _):
+        for i in range(0, len(self.response), 16):
+            yield Message(self.response[i:i + 16])
+
+
+def make_agent(tmp_path, response):
+    cache = GenerationCache(directory=str(tmp_path))
+    return CodeAgent(llm=FakeLLM(response), generation_cache=cache), cache
+
+
+def test_complete_response_is_cached(tmp_path):
+    agent, cache = make_agent(tmp_path, COMPLETE)
+    files = agent.generate_files("prompt", META)
+    assert len(files) == 3
+    assert cache.get_stats()["stores"] == 1
+
+
+def test_truncated_response_raises_and_is_not_cached(tmp_path):
+    agent, cache = make_agent(tmp_path, TRUNCATED)
+    with pytest.raises(TruncatedResponseError) as exc:
+        agent.generate_files("prompt", META)
+    assert [f["path"] for f in exc.value.files] == [f["path"] for f in FILES[:2]]
+    assert cache.get_stats()["stores"] == 0
+
+
+def test_async_truncated_response_is_not_cached(tmp_path):
+    agent, cache = make_agent(tmp_path, TRUNCATED)
+    with pytest.raises(TruncatedResponseError):
+        asyncio.run(agent.agenerate_files("prompt", META))
+    assert cache.get_stats()["stores"] == 0
+
+
+def test_streamed_truncated_response_yields_complete_files_then_raises(tmp_path):
+    agent, cache = make_agent(tmp_path, TRUNCATED)
+
+    async def consume():
+        received = []
+        with pytest.raises(TruncatedResponseError):
+            async for file in agent.astream_files("prompt", META):
+                received.append(file["path"])
+        return received
+
+    assert asyncio.run(consume()) == [f["path"] for f in FILES[:2]]
+    assert cache.get_stats()["stores"] == 0
@@ -0,0 +1,91 @@
+# backend/tests/test_file_writer.py
+
+import os
+
+import pytest
+
+from backend.file_writer import BulkFileWriter, FileWriteError
+from backend.workspace import QuotaExceededError, Workspace
+
+
+@pytest.fixture
+def writer():
+    writer = BulkFileWriter(workers=4)
+    yield writer
+    writer.close()
+
+
+def make_workspace(tmp_path, quota=10_000):
+    return Workspace("ws", str(tmp_path), quota)
+
+
+def read(tmp_path, rel):
+    with open(os.path.join(str(tmp_path), *rel.split("/")), "rb") as f:
+        return f.read()
+
+
+def test_writes_new_files_and_skips_unchanged(tmp_path, writer):
+    ws = make_workspace(tmp_path)
+    files = [{"path": "GENERATED_PLUGIN/src/A.java", "content": "a"},
+             {"path": "GENERATED_PLUGIN/pom.xml", "content": "pom"}]
+    report = writer.write(ws, files)
+    assert sorted(report["written"]) == sorted(f["path"] for f in files)
+    assert read(tmp_path, "src/A.java") == b"a"
+
+    report = writer.write(ws, files)
+    assert report["written"] == []
+    assert report["bytes_skipped"] == 4
+
+
+def test_binary_content_is_written_verbatim(tmp_path, writer):
+    ws = make_workspace(tmp_path)
+    writer.write(ws, [{"path": "icon.png", "content": "ignored", "content_binary": b"\x00\xff"}])
+    assert read(tmp_path, "icon.png") == b"\x00\xff"
+
+
+def test_quota_counts_only_size_change_of_overwritten_files(tmp_path, writer):
+    ws = make_workspace(tmp_path, quota=1500)
+    for i in range(5):
+        writer.write(ws, [{"path": "a.txt", "content": "x" * (1000 + i)}])
+    assert ws.bytes_used == 1004
+
+    writer.write(ws, [{"path": "a.txt", "content": "x" * 10}])
+    assert ws.bytes_used == 10
+
+
+def test_quota_exceeded_writes_nothing(tmp_path, writer):
+    ws = make_workspace(tmp_path, quota=100)
+    with pytest.raises(FileWriteError) as exc:
+        writer.write(ws, [{"path": "a.txt", "content": "x" * 60}, {"path": "b.txt", "content": "y" * 60}])
+    assert isinstance(exc.value.error, QuotaExceededError)
+    assert ws.bytes_used == 0
+    assert not os.path.exists(os.path.join(str(tmp_path), "a.txt"))
+
+
+def test_unsafe_path_is_rejected(tmp_path, writer):
+    with pytest.raises(FileWriteError):
+        writer.write(make_workspace(tmp_path), [{"path": "../escape.txt", "content": "x"}])
+
+
+def test_failed_publish_rolls_back_and_releases_quota(tmp_path, writer, monkeypatch):
+    ws = make_workspace(tmp_path)
+    writer.write(ws, [{"path": "a.txt", "content": "old"}])
+    used = ws.bytes_used
+
+    real_replace = os.replace
+
+    def failing_replace(src, dst):
+        if dst.endswith("b.txt"):
+            raise OSError("disk full")
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", failing_replace)
+    with pytest.raises(FileWriteError) as exc:
+        writer.write(ws, [{"path": "a.txt", "content": "new content"}, {"path": "b.txt", "content": "b"}])
+    monkeypatch.undo()
+
+    assert exc.value.path == "b.txt"
+    assert read(tmp_path, "a.txt") == b"old"
+    assert not os.path.exists(os.path.join(str(tmp_path), "b.txt"))
+    assert ws.bytes_used == used
+    assert not [name for name in os.listdir(str(tmp_path)) if name.startswith(".staging-")]
@@ -0,0 +1,68 @@
+# backend/tests/test_generation_cache.py
+
+import base64
+import os
+
+from backend.cache import GenerationCache
+
+BINARY = bytes(range(256)) * 4
+
+
+def make_files(tag: str) -> list:
+    return [
+        {"path": f"GENERATED_PLUGIN/src/{tag}.java", "content": f"class {tag} {{}}\n", "content_binary": None},
+        {"path": "GENERATED_PLUGIN/icon.png", "content": base64.b64encode(BINARY).decode("ascii"),
+         "content_binary": BINARY},
+    ]
+
+
+def test_round_trip_with_binary(tmp_path):
+    cache = GenerationCache(directory=str(tmp_path))
+    key = cache.key("system prompt", "gpt-4o", 0)
+    cache.set(key, make_files("A"), response_bytes=1234)
+
+    assert cache.get(key) == make_files("A")
+    stats = cache.get_stats()
+    assert stats["hits"] == 1 and stats["stores"] == 1 and stats["bytes_saved"] == 1234
+
+
+def test_key_depends_on_prompt_model_and_temperature(tmp_path):
+    cache = GenerationCache(directory=str(tmp_path))
+    keys = {cache.key("p", "gpt-4o", 0), cache.key("q", "gpt-4o", 0),
+            cache.key("p", "gpt-4o-mini", 0), cache.key("p", "gpt-4o", 0.2)}
+    assert len(keys) == 4
+    assert cache.key("p", "gpt-4o", 0) == cache.key("p", "gpt-4o", 0.0)
+
+
+def test_miss_and_survives_restart(tmp_path):
+    cache = GenerationCache(directory=str(tmp_path))
+    assert cache.get("missing") is None
+    cache.set("k", make_files("A"))
+
+    reopened = GenerationCache(directory=str(tmp_path))
+    assert reopened.get("k") == make_files("A")
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = GenerationCache(directory=str(tmp_path), max_bytes=10**9)
+    cache.set("a", make_files("A"))
+    entry_size = cache.total_bytes
+    cache.max_bytes = entry_size * 2 + entry_size // 2
+    cache.set("b", make_files("B"))
+    assert cache.get("a") is not None  # a zuletzt benutzt, b ist jetzt der älteste Eintrag
+    cache.set("c", make_files("C"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") == make_files("A")
+    assert cache.get("c") == make_files("C")
+    assert cache.get_stats()["evictions"] == 1
+    assert not os.path.exists(os.path.join(str(tmp_path), "b" + GenerationCache.SUFFIX))
+
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = GenerationCache(directory=str(tmp_path))
+    cache.set("k", make_files("A"))
+    with open(os.path.join(str(tmp_path), "k" + GenerationCache.SUFFIX), "wb") as f:
+        f.write(b"not zlib")
+    assert cache.get("k") is None
+    assert cache.get_stats()["entries"] == 0
@@ -0,0 +1,97 @@
+# backend/tests/test_json_extract.py
+
+import json
+
+import pytest
+
+from backend.json_extract import IncrementalArrayParser, extract_json_array
+
+FILES = [
+    {"path": "GENERATED_PLUGIN/pom.xml", "content": "<project>[x]</project>"},
+    {"path": "GENERATED_PLUGIN/src/A.java", "content": "class A { String s = \"{\\\"]\"; }"},
+    {"path": "GENERATED_PLUGIN/src/B.java", "content": "class B {}\n"},
+]
+
+
+def test_extract_plain_array():
+    assert extract_json_array(json.dumps(FILES)) == (FILES, True)
+
+
+def test_extract_ignores_prose_and_fences():
+    text = "Here are [the] files:\n```json\n" + json.dumps(FILES, indent=2) + "\n```\nDone [1]."
+    assert extract_json_array(text) == (FILES, True)
+
+
+def test_extract_truncated_keeps_complete_elements():
+    text = json.dumps(FILES)
+    truncated = text[:text.index('{"path": "GENERATED_PLUGIN/src/B.java"') + 20]
+    assert extract_json_array(truncated) == (FILES[:2], False)
+
+
+def test_extract_invalid_tail_keeps_complete_elements():
+    text = json.dumps(FILES[:1])[:-1] + ", {broken}]"
+    assert extract_json_array(text) == (FILES[:1], False)
+
+
+def test_extract_empty_array():
+    assert extract_json_array("[]") == ([], True)
+
+
+@pytest.mark.parametrize("text", ["no array here", "[", '[{"path": "a"', "prose [ not json"])
+def test_extract_without_complete_element_raises(text):
+    with pytest.raises(ValueError):
+        extract_json_array(text)
+
+
+def feed_all(parser, chunks):
+    objects = []
+    for chunk in chunks:
+        objects += parser.feed(chunk)
+    return objects
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 64, 10_000])
+def test_incremental_parser_any_chunk_size(size):
+    text = "Sure!\n```json\n" + json.dumps(FILES, indent=2) + "\n```"
+    parser = IncrementalArrayParser()
+    objects = feed_all(parser, [text[i:i + size] for i in range(0, len(text), size)])
+    assert objects == FILES
+    assert parser.finished
+    assert parser.objects_emitted == len(FILES)
+
+
+def test_incremental_parser_emits_objects_as_soon_as_closed():
+    parser = IncrementalArrayParser()
+    first = json.dumps(FILES[0])
+    assert parser.feed("[" + first[:-1]) == []
+    assert parser.feed("}, ") == [FILES[0]]
+    assert not parser.finished
+
+
+def test_incremental_parser_escape_across_chunks():
+    text = json.dumps([{"path": "a", "content": 'x\\"}]'}])
+    split = text.index("\\\\") + 1
+    parser = IncrementalArrayParser()
+    assert feed_all(parser, [text[:split], text[split:]]) == [{"path": "a", "content": 'x\\"}]'}]
+
+
+def test_incremental_parser_truncated_stream():
+    text = json.dumps(FILES)
+    parser = IncrementalArrayParser()
+    objects = parser.feed(text[:-30])
+    assert objects == FILES[:2]
+    assert not parser.finished
+    assert parser.pending.startswith('{"path": "GENERATED_PLUGIN/src/B')
+
+
+def test_incremental_parser_ignores_input_after_array():
+    parser = IncrementalArrayParser()
+    assert parser.feed('[{"a": 1}] trailing {"b": 2}') == [{"a": 1}]
+    assert parser.finished
+    assert parser.feed('{"c": 3}') == []
+
+
+def test_incremental_parser_invalid_object_raises():
+    parser = IncrementalArrayParser()
+    with pytest.raises(ValueError, match="Invalid JSON object #0"):
+        parser.feed('[{"a": }]')
@@ -0,0 +1,84 @@
+# backend/tests/test_rules.py
+
+import json
+import re
+
+import pytest
+
+from backend.rules import JAVA, PLUGIN_XML, POM, RuleSet, file_kind, load_rule_sets, trie_regex
+
+
+@pytest.fixture
+def rule_set():
+    return RuleSet({JAVA: ["Association", "FindSCU", "FindSCP"], PLUGIN_XML: ["Association"]})
+
+
+def test_trie_regex_matches_exactly_the_words():
+    pattern = re.compile(rf"^{trie_regex({'FindSCU', 'FindSCP', 'Find'})}$")
+    assert all(pattern.match(w) for w in ("FindSCU", "FindSCP", "Find"))
+    assert not pattern.match("FindSC")
+
+
+def test_find_respects_token_boundaries(rule_set):
+    content = "class MyAssociation {}\nAssociationX a;\nAssociation b;\nfoo.Association c;\n"
+    assert rule_set.find(content, JAVA) == [(2, "Association"), (3, "Association")]
+
+
+def test_find_skips_comments_and_literals(rule_set):
+    content = '// Association\n/* FindSCU\n FindSCP */\nString s = "Association";\nchar c = \'x\';\nFindSCU f;\n'
+    assert rule_set.find(content, JAVA) == [(5, "FindSCU")]
+
+
+def test_find_unknown_kind_returns_nothing(rule_set):
+    assert rule_set.find("Association a;", POM) == []
+
+
+def test_scrub_removes_only_hit_lines(rule_set):
+    cleaned, hits = rule_set.scrub("int a;\nAssociation x;\nkeep;", JAVA)
+    assert cleaned == "int a;\nkeep;"
+    assert hits == [(1, "Association")]
+
+
+def test_scrub_line_numbers_match_find_with_form_feed(rule_set):
+    # splitlines() würde am \x0c trennen und die falsche Zeile löschen
+    cleaned, _ = rule_set.scrub("int a;\x0c int b;\nAssociation x;\nkeep;", JAVA)
+    assert cleaned == "int a;\x0c int b;\nkeep;"
+
+
+def test_scrub_keeps_crlf_line_endings(rule_set):
+    cleaned, _ = rule_set.scrub("a;\r\nAssociation x;\r\nb;\r\n", JAVA)
+    assert cleaned == "a;\r\nb;\r\n"
+
+
+def test_scrub_without_hits_returns_content_unchanged(rule_set):
+    content = "a; b;\n"
+    assert rule_set.scrub(content, JAVA) == (content, [])
+
+
+def test_scrub_reports_but_does_not_rewrite_xml(rule_set):
+    content = "<plugin>\n  <Association>\n  </Association>\n</plugin>"
+    cleaned, hits = rule_set.scrub(content, PLUGIN_XML)
+    assert cleaned == content
+    assert [line for line, _ in hits] == [1, 2]
+
+
+def test_file_kind():
+    assert file_kind("GENERATED_PLUGIN/src/main/java/A.java") == JAVA
+    assert file_kind("GENERATED_PLUGIN\\pom.xml") == POM
+    assert file_kind("plugin.xml") == PLUGIN_XML
+    assert file_kind("README.md") is None
+
+
+def test_load_rule_sets_merges_file(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"HL7": {"java": ["Forbidden"]}}), encoding="utf-8")
+    rule_sets = load_rule_sets(str(path))
+    assert "dicom" in rule_sets
+    assert rule_sets["hl7"].find("Forbidden f;", JAVA) == [(0, "Forbidden")]
+
+
+def test_load_rule_sets_rejects_unknown_kind(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"hl7": {"yaml": ["x"]}}), encoding="utf-8")
+    with pytest.raises(ValueError, match="unknown kind 'yaml' in rule set 'hl7'"):
+        load_rule_sets(str(path))
@@ -0,0 +1,49 @@
+# backend/tests/test_workspace.py
+
+import os
+import time
+
+import pytest
+
+from backend.workspace import QuotaExceededError, Workspace, WorkspaceManager, safe_relative_path
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("GENERATED_PLUGIN/src/A.java", "src/A.java"),
+    ("GENERATED_PLUGIN\\src\\A.java", "src/A.java"),
+    ("src/./main/../A.java", "src/A.java"),
+])
+def test_safe_relative_path(path, expected):
+    assert safe_relative_path(path) == expected
+
+
+@pytest.mark.parametrize("path", ["", "/etc/passwd", "../x", "GENERATED_PLUGIN/../../x", "./"])
+def test_safe_relative_path_rejects(path):
+    with pytest.raises(ValueError):
+        safe_relative_path(path)
+
+
+def test_reserve_and_release(tmp_path):
+    ws = Workspace("ws", str(tmp_path), 100)
+    ws.reserve(80)
+    with pytest.raises(QuotaExceededError):
+        ws.reserve(30)
+    ws.reserve(-50)
+    assert ws.bytes_used == 30
+
+
+def test_gc_removes_only_expired_allocated_workspaces(tmp_path):
+    manager = WorkspaceManager(root=str(tmp_path), ttl=60)
+    expired = manager.allocate()
+    manager.release(expired)
+    active = manager.allocate()
+    fresh = manager.allocate()
+    manager.release(fresh)
+    foreign = tmp_path / "src"
+    foreign.mkdir()
+    old = time.time() - 3600
+    for path in (expired.path, active.path, str(foreign)):
+        os.utime(path, (old, old))
+
+    assert manager.gc() == 1
+    assert sorted(os.listdir(str(tmp_path))) == sorted([active.id, fresh.id, "src"])
@@ -0,0 +1,284 @@
+# backend/tracing.py
+
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from backend.log import get_logger
+
+logger = get_logger("Tracing")
+
+# OTLP-Enums (opentelemetry/proto/trace/v1/trace.proto)
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+STATUS_CODE_ERROR = 2
+
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current_span = ContextVar("trace_span", default=None)
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: dict) -> list:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+class Span:
+    __slots__ = ("trace", "name", "span_id", "parent_id", "kind", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, trace, name: str, parent_id: str = "", kind: int = SPAN_KIND_INTERNAL, attributes: dict = None):
+        self.trace = trace
+        self.name = name
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.error = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def record_error(self, e: BaseException):
+        self.error = f"{type(e).__name__}: {e}"
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": _otlp_attributes(self.attributes),
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.error:
+            span["status"] = {"code": STATUS_CODE_ERROR, "message": self.error}
+        return span
+
+
+class Trace:
+    """
+    Alle Spans eines Requests. Spans aus parallelen Tasks und run_blocking-Threads
+    landen über den kopierten Kontext im selben Trace.
+    """
+
+    def __init__(self, name: str, trace_id: str = None, parent_span_id: str = "", attributes: dict = None):
+        self.trace_id = trace_id or _new_id(128)
+        self.spans = []
+        self._lock = threading.Lock()
+        self.root = self.start_span(name, parent_span_id, SPAN_KIND_SERVER, attributes)
+
+    def start_span(self, name: str, parent_id: str = "", kind: int = SPAN_KIND_INTERNAL, attributes: dict = None) -> Span:
+        span = Span(self, name, parent_id, kind, attributes)
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def to_otlp(self, service_name: str) -> dict:
+        """
+        ExportTraceServiceRequest im OTLP/JSON-Format (wie von OTLP/HTTP unter /v1/traces erwartet).
+        """
+        with self._lock:
+            spans = [span.to_otlp() for span in self.spans]
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": service_name})},
+                "scopeSpans": [{"scope": {"name": "backend.tracing"}, "spans": spans}],
+            }]
+        }
+
+
+class TraceExporter:
+    """
+    Exportiert abgeschlossene Traces in einem Hintergrund-Thread und hält die letzten
+    für GET /traces/{trace_id} im Speicher.
+
+    Konfiguration über Umgebungsvariablen:
+      TRACE_EXPORT_FILE    Datei, an die jeder Trace als eine OTLP/JSON-Zeile angehängt wird
+      TRACE_OTLP_ENDPOINT  OTLP/HTTP-Collector, z.B. http://localhost:4318/v1/traces
+      TRACE_SERVICE_NAME   service.name der Resource (Default "mirth-ai-backend")
+      TRACE_SAMPLE_RATE    Anteil getraceter Requests, wenn ein Export konfiguriert ist (Default 1.0)
+      TRACE_KEEP           Anzahl Traces im Speicher (Default 100)
+    Ohne Export wird nur getraced, wenn der Request es verlangt (traceparent mit sampled-Flag
+    oder Profiling).
+    """
+
+    def __init__(self):
+        self.export_file = os.getenv("TRACE_EXPORT_FILE") or None
+        self.endpoint = os.getenv("TRACE_OTLP_ENDPOINT") or None
+        self.service_name = os.getenv("TRACE_SERVICE_NAME", "mirth-ai-backend")
+        self.sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+        self.keep = int(os.getenv("TRACE_KEEP", "100"))
+        self._recent = OrderedDict()
+        self._recent_lock = threading.Lock()
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._client = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.export_file or self.endpoint)
+
+    def should_sample(self) -> bool:
+        return self.enabled and random.random() < self.sample_rate
+
+    def export(self, trace: Trace):
+        document = trace.to_otlp(self.service_name)
+        with self._recent_lock:
+            self._recent[trace.trace_id] = document
+            while len(self._recent) > self.keep:
+                self._recent.popitem(last=False)
+        if self.enabled:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+            self._queue.put(document)
+
+    def get(self, trace_id: str):
+        with self._recent_lock:
+            return self._recent.get(trace_id)
+
+    def _run(self):
+        while True:
+            document = self._queue.get()
+            try:
+                if self.export_file:
+                    with open(self.export_file, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(document, separators=(",", ":")) + "\n")
+                if self.endpoint:
+                    if self._client is None:
+                        import httpx
+                        self._client = httpx.Client(timeout=5.0)
+                    self._client.post(self.endpoint, json=document).raise_for_status()
+            except Exception as e:
+                logger.event("Trace export failed", level=logging.WARNING, error=str(e))
+
+
+EXPORTER = TraceExporter()
+
+
+def parse_traceparent(header: str):
+    """
+    (trace_id, parent_span_id, sampled) aus einem W3C-traceparent-Header, sonst None.
+    """
+    match = _TRACEPARENT.match((header or "").strip().lower())
+    if match is None or match.group(1) == "0" * 32:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+@contextmanager
+def request_trace(name: str, traceparent: str = None, force: bool = False, **attributes):
+    """
+    Startet den Trace eines Requests (Root-Span) und exportiert ihn am Ende.
+    Liefert None, wenn der Request nicht getraced wird; alle span()-Aufrufe kosten dann
+    nur einen ContextVar-Zugriff.
+    """
+    parent = parse_traceparent(traceparent)
+    sampled = force or (parent[2] if parent else False) or EXPORTER.should_sample()
+    if not sampled:
+        yield None
+        return
+    trace = Trace(name, parent[0] if parent else None, parent[1] if parent else "", attributes)
+    token = _current_span.set(trace.root)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.root.record_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        trace.root.end()
+        EXPORTER.export(trace)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Kind-Span des aktuellen Spans; ohne aktiven Trace ein No-op (liefert None).
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = parent.trace.start_span(name, parent.span_id, attributes=attributes)
+    # set() statt reset(): async Generatoren können über yield hinweg in einem anderen Kontext enden
+    _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.record_error(e)
+        raise
+    finally:
+        child.end()
+        _current_span.set(parent)
+
+
+def current_span():
+    return _current_span.get()
+
+
+def set_attributes(**attributes):
+    """
+    Ergänzt Attribute am aktuellen Span (z.B. Token-Verbrauch eines LLM-Calls).
+    """
+    current = _current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def traced(func=None, *, name: str = None):
+    """
+    Decorator: jeder Aufruf einer (async) Funktion wird zum Span "<Klasse>.<Methode>".
+    """
+    if func is None:
+        return functools.partial(traced, name=name)
+    span_name = name or func.__qualname__
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return await func(*args, **kwargs)
+            with span(span_name):
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _current_span.get() is None:
+            return func(*args, **kwargs)
+        with span(span_name):
+            return func(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,191 @@
+# backend/workspace.py
+
+import asyncio
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+
+from backend.log import get_logger
+
+logger = get_logger("WorkspaceManager")
+
+# Präfix, unter dem das LLM alle Dateien liefert (siehe CodeAgent._create_system_prompt)
+GENERATED_PREFIX = "GENERATED_PLUGIN/"
+
+# Verzeichnisnamen, die WorkspaceManager.allocate() vergibt; gc() löscht nur diese
+WORKSPACE_ID_RE = re.compile(r"\d{8}-\d{6}-[0-9a-f]{8}")
+
+
+class QuotaExceededError(Exception):
+    pass
+
+
+def safe_relative_path(file_path: str) -> str:
+    """
+    Generierter Pfad ohne GENERATED_PLUGIN/-Präfix, mit "/" als Trenner.
+    Absolute Pfade und Pfade, die aus dem Projekt herausführen, werden abgelehnt.
+    """
+    rel = file_path.replace("\\", "/")
+    if rel.startswith(GENERATED_PREFIX):
+        rel = rel[len(GENERATED_PREFIX):]
+    if not rel or rel.startswith("/") or os.path.isabs(rel) or os.path.splitdrive(rel)[0]:
+        raise ValueError(f"Unsafe file path: {file_path!r}")
+    parts = []
+    for part in rel.split("/"):
+        if part in ("", "."):
+            continue
+        if part == "..":
+            if not parts:
+                raise ValueError(f"File path escapes workspace: {file_path!r}")
+            parts.pop()
+        else:
+            parts.append(part)
+    if not parts:
+        raise ValueError(f"Unsafe file path: {file_path!r}")
+    return "/".join(parts)
+
+
+class Workspace:
+    """
+    Eigenes Verzeichnis für genau einen Generierungs-Job. Dateipfade aus dem LLM
+    ("GENERATED_PLUGIN/...") werden in dieses Verzeichnis umgeschrieben.
+    """
+
+    def __init__(self, ws_id: str, path: str, quota_bytes: int):
+        self.id = ws_id
+        self.path = path
+        self.quota_bytes = quota_bytes
+        self.bytes_used = 0
+        self._lock = threading.Lock()
+
+    def resolve(self, file_path: str) -> str:
+        """
+        Bildet einen generierten Pfad sicher auf eine Datei im Workspace ab
+        (siehe safe_relative_path).
+        """
+        return os.path.join(self.path, *safe_relative_path(file_path).split("/"))
+
+    def reserve(self, nbytes: int):
+        """
+        Bucht nbytes gegen die Quota; wirft QuotaExceededError, wenn sie überschritten würde.
+        Negative Werte geben Platz frei (verkleinerte Dateien, zurückgenommene Reservierung).
+        """
+        with self._lock:
+            if self.bytes_used + nbytes > self.quota_bytes:
+                raise QuotaExceededError(
+                    f"Workspace quota exceeded: {self.bytes_used + nbytes} > {self.quota_bytes} bytes"
+                )
+            self.bytes_used = max(0, self.bytes_used + nbytes)
+
+
+class WorkspaceManager:
+    """
+    Vergibt pro Job ein eigenes Verzeichnis unter root, damit parallele Generierungen
+    weder Quellen noch target/ teilen. Ein Hintergrund-Task räumt alte Workspaces auf.
+
+    Konfiguration über Umgebungsvariablen:
+      WORKSPACE_ROOT         Basisverzeichnis, nur für Workspaces (Default: <CWD>/.workspaces)
+      WORKSPACE_QUOTA_BYTES  max. Bytes generierter Dateien pro Workspace (Default 50 MiB)
+      WORKSPACE_TOTAL_BYTES  max. Bytes aller Workspaces zusammen, inkl. target/ (Default 5 GiB)
+      WORKSPACE_TTL          Sekunden, nach denen ein inaktiver Workspace gelöscht wird (Default 86400)
+      WORKSPACE_GC_INTERVAL  Sekunden zwischen zwei Aufräumläufen (Default 600)
+    """
+
+    def __init__(self, root: str = None, quota_bytes: int = None, total_bytes: int = None,
+                 ttl: float = None, gc_interval: float = None):
+        self.root = os.path.abspath(root or os.getenv("WORKSPACE_ROOT", os.path.join(os.getcwd(), ".workspaces")))
+        self.quota_bytes = quota_bytes or int(os.getenv("WORKSPACE_QUOTA_BYTES", str(50 * 1024 * 1024)))
+        self.total_bytes = total_bytes or int(os.getenv("WORKSPACE_TOTAL_BYTES", str(5 * 1024 * 1024 * 1024)))
+        self.ttl = ttl or float(os.getenv("WORKSPACE_TTL", "86400"))
+        self.gc_interval = gc_interval or float(os.getenv("WORKSPACE_GC_INTERVAL", "600"))
+        self._active = set()
+        self._lock = threading.Lock()
+        self._gc_task = None
+        os.makedirs(self.root, exist_ok=True)
+
+    def allocate(self) -> Workspace:
+        ws_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        path = os.path.join(self.root, ws_id)
+        os.makedirs(path)
+        with self._lock:
+            self._active.add(ws_id)
+        return Workspace(ws_id, path, self.quota_bytes)
+
+    def release(self, workspace: Workspace):
+        """
+        Markiert den Workspace als inaktiv; er bleibt bis zum Ablauf der TTL erhalten.
+        """
+        with self._lock:
+            self._active.discard(workspace.id)
+
+    def gc(self) -> int:
+        """
+        Löscht abgelaufene inaktive Workspaces und, falls das Gesamtbudget überschritten
+        ist, zusätzlich die ältesten inaktiven. Gibt die Anzahl gelöschter Workspaces zurück.
+        Andere Einträge unter root (nicht im Format von allocate()) bleiben unangetastet.
+        """
+        now = time.time()
+        with self._lock:
+            active = set(self._active)
+        candidates = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name in active or not WORKSPACE_ID_RE.fullmatch(name) or not os.path.isdir(path):
+                continue
+            candidates.append((os.path.getmtime(path), name, path))
+        candidates.sort()
+
+        removed = 0
+        remaining = []
+        for mtime, name, path in candidates:
+            if now - mtime > self.ttl:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+            else:
+                remaining.append(path)
+
+        total = _dir_size(self.root)
+        for path in remaining:
+            if total <= self.total_bytes:
+                break
+            size = _dir_size(path)
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        if removed:
+            logger.event("Old workspaces removed", removed=removed)
+        return removed
+
+    def start_gc(self):
+        self._gc_task = asyncio.create_task(self._gc_loop())
+
+    async def stop_gc(self):
+        if self._gc_task is not None:
+            self._gc_task.cancel()
+            try:
+                await self._gc_task
+            except asyncio.CancelledError:
+                pass
+            self._gc_task = None
+
+    async def _gc_loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.gc)
+            except Exception as e:
+                logger.error(f"GC failed: {e}")
+            await asyncio.sleep(self.gc_interval)
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
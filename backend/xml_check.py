@@ -0,0 +1,212 @@
+# backend/xml_check.py
+
+import re
+import xml.etree.ElementTree as ET
+
+from backend.java_check import parse_java
+
+# Artefakte dieser Gruppen gibt es in keinem öffentlichen Repository – sie müssen lokal installiert sein
+LOCAL_ONLY_GROUP_PREFIXES = ("com.mirth",)
+
+_PROPERTY_REF = re.compile(r"\$\{([^}]+)\}")
+
+
+class XmlScan:
+    def __init__(self):
+        self.dependencies = []  # dicts: groupId, artifactId, version, scope, section, line
+        self.repositories = []  # dicts: id, url, line
+        self.class_refs = []  # (class name, line)
+        self.properties = {}
+        self.error = None  # (line, message) bei ungültigem XML
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _scan(content: str, on_end):
+    """
+    Parst content zeilenweise mit XMLPullParser und ruft on_end(path, elem, line) für jedes
+    schließende Element auf (path = Tupel der lokalen Tag-Namen bis einschließlich elem,
+    line = Zeile des schließenden Tags).
+    Gibt (line, message) bei ungültigem XML zurück, sonst None.
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    path = []
+    line = 0
+    try:
+        for line, text in enumerate(content.splitlines(keepends=True), 1):
+            parser.feed(text)
+            for event, elem in parser.read_events():
+                if event == "start":
+                    path.append(_local(elem.tag))
+                else:
+                    on_end(tuple(path), elem, line)
+                    path.pop()
+        parser.close()
+        for event, elem in parser.read_events():
+            if event == "end":
+                on_end(tuple(path), elem, line)
+                path.pop()
+    except ET.ParseError as e:
+        return e.position[0], f"Malformed XML: {e}"
+    return None
+
+
+def scan_pom(content: str) -> XmlScan:
+    """
+    Abhängigkeiten (inkl. dependencyManagement), Repositories und Properties eines pom.xml.
+    ${...}-Referenzen werden am Ende gegen <properties> und project.version aufgelöst.
+    """
+    result = XmlScan()
+    project_version = []
+
+    def text(elem, name):
+        for child in elem:
+            if _local(child.tag) == name:
+                return child.text.strip() if child.text else None
+        return None
+
+    def on_end(path, elem, line):
+        tag = path[-1]
+        if tag == "dependency" and len(path) >= 3 and path[-2] == "dependencies":
+            section = "dependencyManagement" if "dependencyManagement" in path else (
+                "plugin" if "plugin" in path else "dependencies"
+            )
+            result.dependencies.append({
+                "groupId": text(elem, "groupId"),
+                "artifactId": text(elem, "artifactId"),
+                "version": text(elem, "version"),
+                "scope": text(elem, "scope") or "compile",
+                "section": section,
+                "line": line,
+            })
+        elif tag in ("repository", "pluginRepository") and len(path) >= 2:
+            result.repositories.append({"id": text(elem, "id"), "url": text(elem, "url"), "line": line})
+        elif len(path) == 3 and path[1] == "properties":
+            result.properties[tag] = (elem.text or "").strip()
+        elif path == ("project", "version"):
+            project_version.append((elem.text or "").strip())
+        if len(path) <= 2:
+            # Top-Level-Elemente freigeben, damit der Baum nicht im Speicher wächst
+            elem.clear()
+
+    result.error = _scan(content, on_end)
+    if project_version:
+        result.properties.setdefault("project.version", project_version[0])
+
+    def resolve(value):
+        if value is None:
+            return None
+        return _PROPERTY_REF.sub(lambda m: result.properties.get(m.group(1), m.group(0)), value)
+
+    for dep in result.dependencies:
+        for key in ("groupId", "artifactId", "version"):
+            dep[key] = resolve(dep[key])
+    return result
+
+
+def parse_pom_dependencies(pom_content: str) -> list:
+    """
+    Alle Abhängigkeiten eines pom.xml als Liste von Dicts (groupId, artifactId, version, scope, ...).
+    Wirft ValueError bei ungültigem XML.
+    """
+    scan = scan_pom(pom_content)
+    if scan.error is not None:
+        raise ValueError(scan.error[1])
+    return scan.dependencies
+
+
+def scan_plugin_xml(content: str) -> XmlScan:
+    """
+    Klassenreferenzen eines Mirth-plugin.xml: <string>-Einträge unter *Classes-Elementen
+    (serverClasses, clientClasses, ...) sowie class/className-Attribute.
+    """
+    result = XmlScan()
+
+    def on_end(path, elem, line):
+        tag = path[-1]
+        if tag == "string" and len(path) >= 2 and path[-2].endswith("Classes") and elem.text:
+            result.class_refs.append((elem.text.strip(), line))
+        for attr in ("class", "className"):
+            if elem.get(attr):
+                result.class_refs.append((elem.get(attr).strip(), line))
+
+    result.error = _scan(content, on_end)
+    return result
+
+
+def check_xml_files(files: list, index=None) -> list:
+    """
+    Prüft pom.xml und plugin.xml vor dem Build:
+    - wohlgeformtes XML
+    - doppelte Abhängigkeiten (gleiche groupId:artifactId im selben Abschnitt)
+    - Abhängigkeiten aus LOCAL_ONLY_GROUP_PREFIXES, die weder im DependencyIndex noch
+      im lokalen Repository liegen
+    - Repositories mit http:// (Maven ≥ 3.8.1 blockiert sie)
+    - Klassen aus plugin.xml, die in den generierten Java-Quellen nicht existieren
+    Gibt eine Liste von Issues {"path", "line", "message"} zurück.
+    """
+    issues = []
+    java_types = None
+
+    def report(path, line, message):
+        issues.append({"path": path, "line": line, "message": message})
+
+    for file in files:
+        path = file.get("path", "")
+        name = path.replace("\\", "/").rsplit("/", 1)[-1]
+        if name not in ("pom.xml", "plugin.xml") or file.get("content_binary") is not None:
+            continue
+        content = file.get("content", "")
+
+        if name == "pom.xml":
+            scan = scan_pom(content)
+            if scan.error is not None:
+                report(path, *scan.error)
+                continue
+            seen = {}
+            for dep in scan.dependencies:
+                coords = f"{dep['groupId']}:{dep['artifactId']}"
+                key = (coords, dep["section"])
+                if key in seen:
+                    report(path, dep["line"], f"Duplicate dependency {coords} (first declared at line {seen[key]})")
+                    continue
+                seen[key] = dep["line"]
+                if dep["section"] != "dependencies" or not dep["groupId"] or not dep["version"]:
+                    continue
+                if dep["groupId"].startswith(LOCAL_ONLY_GROUP_PREFIXES) and "${" not in dep["version"]:
+                    if index is not None and index.ready.is_set() and not index.is_available(
+                        dep["groupId"], dep["artifactId"], dep["version"]
+                    ):
+                        report(path, dep["line"],
+                               f"Dependency {coords}:{dep['version']} is not in the local repository or dependency index")
+            for repo in scan.repositories:
+                if repo["url"] and repo["url"].startswith("http://"):
+                    report(path, repo["line"],
+                           f"Repository '{repo['id']}' uses http:// which Maven 3.8.1+ blocks; use https://")
+        else:
+            scan = scan_plugin_xml(content)
+            if scan.error is not None:
+                report(path, *scan.error)
+                continue
+            if java_types is None:
+                java_types = _generated_java_types(files)
+            if not java_types:
+                continue
+            for class_name, line in scan.class_refs:
+                if class_name not in java_types:
+                    report(path, line, f"Class {class_name} is not part of the generated sources")
+    return issues
+
+
+def _generated_java_types(files: list) -> set:
+    types = set()
+    for file in files:
+        path = file.get("path", "")
+        if not path.endswith(".java") or file.get("content_binary") is not None:
+            continue
+        info = parse_java(path, file.get("content", ""))
+        prefix = f"{info.package}." if info.package else ""
+        types.update(prefix + name for name, _, _ in info.types)
+    return types